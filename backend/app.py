@@ -1,29 +1,163 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import os
-from werkzeug.utils import secure_filename
+import io
+import time
+import atexit
+import hashlib
+import logging
+import threading
 from pdf_parser import PitchDeckParser
 from fund_matcher import FundMatcher
+from jobs import JobManager, JobQueueFull, JobStore
+from bulk_matching import detect_format, match_profiles, read_profiles
+from pdf_extraction import shutdown_extraction_pool
+from llm_scheduler import shutdown_llm_scheduler
+from metrics import (HTTP_REQUESTS, HTTP_REQUEST_SECONDS, HTTP_REJECTED, TraceIdFilter, cache_stats_collector,
+                     current_trace_id, new_trace_id, register_collector, render_prometheus, timed)
 from config import Config
 import json
 
-app = Flask(__name__)
-app.config.from_object(Config)
-Config.init_app(app)
+api = Blueprint('api', __name__)
 
-# Enable CORS for all domains on all routes
-CORS(app)
+# Per-process services, created once by init_services(); every worker process gets its own
+pdf_parser = None
+fund_matcher = None
+job_manager = None
+_services_lock = threading.Lock()
+_draining = threading.Event()
 
-# Initialize the PDF parser and fund matcher
-pdf_parser = PitchDeckParser()
-fund_matcher = FundMatcher()
+# Bounds requests doing real work in this process; excess requests get an immediate 503
+request_slots = threading.BoundedSemaphore(max(1, Config.MAX_CONCURRENT_REQUESTS))
+# Job event streams are cheap but hold a server thread each for as long as they are open
+event_stream_slots = threading.BoundedSemaphore(max(1, Config.MAX_EVENT_STREAMS))
+
+# Cheap endpoints that must keep answering while the worker is saturated
+UNLIMITED_ENDPOINTS = {
+    'api.health_check', 'api.readiness_check', 'api.metrics',
+    'api.get_analysis_job', 'api.stream_analysis_job',
+}
+
+def configure_logging():
+    logging.basicConfig(
+        level=Config.LOG_LEVEL,
+        format='%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s'
+    )
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(TraceIdFilter())
+    # One INFO line per OpenAI request from httpx is noise at production volume
+    logging.getLogger('httpx').setLevel(max(logging.WARNING, logging.getLogger().level))
+
+def init_services():
+    """Create the parser, matcher, job manager and their caches once per process"""
+    global pdf_parser, fund_matcher, job_manager
+    with _services_lock:
+        if pdf_parser is not None:
+            return
+        pdf_parser = PitchDeckParser()
+        fund_matcher = FundMatcher()
+        fund_matcher.start_background_sync()
+        job_manager = JobManager(
+            max_workers=Config.JOB_WORKERS,
+            max_pending=Config.JOB_MAX_PENDING,
+            retention=Config.JOB_RETENTION_SECONDS,
+            store=JobStore(Config.JOB_STORE_PATH),
+            poll_interval=Config.JOB_STORE_POLL_INTERVAL
+        )
+        register_collector(cache_stats_collector({
+            'deck_results': pdf_parser.result_cache,
+            'page_analysis': pdf_parser.page_cache,
+            'semantic_verdicts': fund_matcher.semantic_cache,
+        }))
+        if Config.WARM_UP_ON_START:
+            # Build the fund snapshot before traffic arrives; /api/ready reports when it is done
+            threading.Thread(target=fund_matcher.warm_up, name='fund-warm-up', daemon=True).start()
+        atexit.register(shutdown_services)
+
+def shutdown_services(wait: bool = True):
+    """
+    Graceful shutdown: report not-ready, let running jobs finish (queued jobs are
+    failed), stop the background fund sync, the PDF extraction pool and the LLM scheduler.
+    """
+    if _draining.is_set():
+        return
+    _draining.set()
+    print("🛑 Shutting down: draining jobs and background workers")
+    if job_manager is not None:
+        job_manager.shutdown(wait=wait)
+    if fund_matcher is not None:
+        fund_matcher.stop_background_sync()
+    shutdown_extraction_pool(wait=wait)
+    shutdown_llm_scheduler(wait=wait)
+
+def create_app():
+    """Application factory: python app.py for development, gunicorn (see gunicorn.conf.py) in production"""
+    configure_logging()
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    Config.init_app(app)
+    
+    # Enable CORS for all domains on all routes
+    CORS(app)
+    
+    init_services()
+    app.register_blueprint(api)
+    return app
+
+@api.before_app_request
+def start_trace():
+    """Give every request a trace id (honouring an incoming X-Request-ID)"""
+    new_trace_id(request.headers.get('X-Request-ID'))
+    g.request_started = time.perf_counter()
+
+@api.before_app_request
+def limit_concurrency():
+    """Refuse work beyond MAX_CONCURRENT_REQUESTS right away instead of queueing it behind slow decks"""
+    if request.endpoint in UNLIMITED_ENDPOINTS:
+        return None
+    if _draining.is_set() or not request_slots.acquire(blocking=False):
+        return busy_response()
+    g.request_slot = True
+    return None
+
+def busy_response():
+    HTTP_REJECTED.inc(endpoint=request.endpoint or 'unknown')
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.headers['Retry-After'] = str(Config.BUSY_RETRY_AFTER)
+    return response, 503
+
+@api.teardown_app_request
+def release_request_slot(exc):
+    # Streamed responses keep their slot until the stream ends
+    if g.pop('request_slot', False):
+        request_slots.release()
+
+@api.after_app_request
+def finish_trace(response):
+    endpoint = request.endpoint or 'unknown'
+    response.headers['X-Trace-Id'] = current_trace_id()
+    HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    if 'request_started' in g:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    return response
+
+def read_upload(file, chunk_size=1024 * 1024):
+    """Read an uploaded file into memory, returning its bytes and SHA-256 hex digest"""
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    while True:
+        chunk = file.stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        buffer.write(chunk)
+    return buffer.getvalue(), digest.hexdigest()
 
 def allowed_file(filename):
     """Check if the uploaded file is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -31,122 +165,305 @@ def health_check():
         'message': 'Pitch Deck Parser API is running'
     })
 
-@app.route('/api/upload-pitch-deck', methods=['POST'])
+@api.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once this worker can serve matches, 503 while warming up or draining"""
+    checks = {
+        'services': fund_matcher is not None,
+        'fund_snapshot': fund_matcher is not None and fund_matcher.is_ready(),
+        'accepting_requests': not _draining.is_set(),
+    }
+    ready = all(checks.values())
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'checks': checks
+    }), 200 if ready else 503
+
+@api.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Stage timings, LLM usage, cache and HTTP counters in the Prometheus text format.
+    Counters are per worker process: with several gunicorn workers, each scrape sees
+    only the worker that answered (scrape every worker, or run one).
+    """
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/funds/sync', methods=['POST'])
+def sync_funds():
+    """Sync the local fund store with Airtable on demand"""
+    try:
+        full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
+        summary = fund_matcher.sync_funds(full=full)
+        return jsonify({
+            'success': True,
+            'data': summary
+        })
+    except Exception as e:
+        return jsonify({
+            'error': f'Fund sync failed: {str(e)}'
+        }), 500
+
+def parse_form_data():
+    """Read the form fields sent alongside the pitch deck"""
+    continents = request.form.get('continents', '[]')
+    countries = request.form.get('countries', '[]')
+    
+    # Parse JSON strings
+    try:
+        continents = json.loads(continents) if continents else []
+        countries = json.loads(countries) if countries else []
+    except json.JSONDecodeError:
+        continents = []
+        countries = []
+    
+    return {
+        'company_name': request.form.get('companyName', ''),
+        'stage': request.form.get('stage', ''),
+        'funding_goal': request.form.get('fundingGoal', ''),
+        'continents': continents,
+        'countries': countries
+    }
+
+def validate_upload():
+    """Return (file, None) for a valid PDF upload, or (None, error response)"""
+    # Check if the post request has the file part
+    if 'pitchDeck' not in request.files:
+        return None, (jsonify({'error': 'No file provided'}), 400)
+    
+    file = request.files['pitchDeck']
+    
+    # Check if user selected a file
+    if file.filename == '':
+        return None, (jsonify({'error': 'No file selected'}), 400)
+    
+    # Check file type
+    if not allowed_file(file.filename):
+        return None, (jsonify({'error': 'Only PDF files are allowed'}), 400)
+    
+    return file, None
+
+def analyze_deck(pdf_bytes, content_hash, form_data, progress=None, on_parsed=None):
+    """
+    Parse a pitch deck and match it against the funds.
+    progress receives stage/page/fund counters; on_parsed receives the parsing
+    result as soon as it is available, before fund matching starts.
+    """
+    print(f"📝 Form data: company={form_data['company_name']}, stage={form_data['stage']}, funding={form_data['funding_goal']}")
+    
+    # Parse the PDF (a repeat upload of the same deck is served from the result cache)
+    with timed('parse'):
+        parsing_result = pdf_parser.parse_pitch_deck(pdf_bytes, content_hash=content_hash, progress=progress)
+    logging.getLogger(__name__).debug(f"🔍 Parsing result: {parsing_result}")
+    
+    # Add form data to the result
+    parsing_result['form_data'] = form_data
+    if on_parsed:
+        on_parsed(dict(parsing_result))
+    
+    # Find matching funds if parsing was successful and no error
+    if 'error' not in parsing_result:
+        print("🔍 Finding matching funds...")
+        try:
+            with timed('fund_matching'):
+                matching_funds = fund_matcher.find_matching_funds(parsing_result, top_n=10, progress=progress)
+            parsing_result['matching_funds'] = matching_funds
+            parsing_result['funds_processed'] = len(matching_funds)
+            print(f"✅ Found {len(matching_funds)} matching funds")
+        except Exception as e:
+            print(f"⚠️ Fund matching failed: {e}")
+            parsing_result['matching_funds'] = []
+            parsing_result['matching_error'] = str(e)
+    
+    return parsing_result
+
+def run_analysis_job(job, trace_id, pdf_bytes, content_hash, form_data):
+    """Job body: same analysis as the synchronous endpoint, reporting progress on the job"""
+    # Keep the submitting request's trace id on everything the job logs
+    new_trace_id(trace_id)
+    job.update_progress(stage='extracting')
+    result = analyze_deck(pdf_bytes, content_hash, form_data,
+                          progress=job.update_progress, on_parsed=job.set_partial_result)
+    job.update_progress(stage='done')
+    return result
+
+@api.route('/api/upload-pitch-deck', methods=['POST'])
 def upload_pitch_deck():
     """Upload and parse pitch deck PDF"""
     
     try:
-        # Check if the post request has the file part
-        if 'pitchDeck' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
+        file, error_response = validate_upload()
+        if error_response:
+            return error_response
         
-        file = request.files['pitchDeck']
+        # Get additional form data
+        form_data = parse_form_data()
         
-        # Check if user selected a file
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+        # Process the upload from memory, hashing it as it is read
+        with timed('save'):
+            pdf_bytes, content_hash = read_upload(file)
         
-        # Check file type
-        if not allowed_file(file.filename):
-            return jsonify({'error': 'Only PDF files are allowed'}), 400
+        try:
+            print(f"📄 Processing PDF: {file.filename} ({len(pdf_bytes)} bytes, sha256={content_hash[:12]})")
+            parsing_result = analyze_deck(pdf_bytes, content_hash, form_data)
+            
+            return jsonify({
+                'success': True,
+                'message': 'Pitch deck analyzed successfully',
+                'trace_id': current_trace_id(),
+                'data': parsing_result
+            })
+            
+        except Exception as e:
+            return jsonify({
+                'error': f'Failed to parse PDF: {str(e)}'
+            }), 500
+                
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@api.route('/api/jobs', methods=['POST'])
+def create_analysis_job():
+    """Queue a pitch deck for background analysis and return its job id right away"""
+    
+    try:
+        file, error_response = validate_upload()
+        if error_response:
+            return error_response
         
-        # Get additional form data
-        company_name = request.form.get('companyName', '')
-        stage = request.form.get('stage', '')
-        funding_goal = request.form.get('fundingGoal', '')
-        continents = request.form.get('continents', '[]')
-        countries = request.form.get('countries', '[]')
+        form_data = parse_form_data()
+        with timed('save'):
+            pdf_bytes, content_hash = read_upload(file)
+        print(f"📄 Queueing PDF: {file.filename} ({len(pdf_bytes)} bytes, sha256={content_hash[:12]})")
         
-        # Parse JSON strings
         try:
-            continents = json.loads(continents) if continents else []
-            countries = json.loads(countries) if countries else []
-        except json.JSONDecodeError:
-            continents = []
-            countries = []
+            job = job_manager.submit(run_analysis_job, current_trace_id(), pdf_bytes, content_hash, form_data)
+        except JobQueueFull:
+            return jsonify({
+                'error': 'Too many pitch decks are being analyzed, please retry shortly'
+            }), 503
         
-        if file and allowed_file(file.filename):
-            # Secure the filename
-            filename = secure_filename(file.filename)
-            
-            # Create a unique filename to avoid conflicts
-            import uuid
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            
-            # Save the file
-            file.save(filepath)
-            
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'trace_id': current_trace_id(),
+            'status': job.status,
+            'status_url': f'/api/jobs/{job.id}',
+            'events_url': f'/api/jobs/{job.id}/events'
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Poll a job's status, progress and (partial) result"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@api.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_analysis_job(job_id):
+    """
+    Server-Sent Events stream of a job: 'progress' on every change, then one 'done' event.
+    At most MAX_EVENT_STREAMS are open per worker; clients can poll status_url instead of a 503.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not event_stream_slots.acquire(blocking=False):
+        return busy_response()
+    
+    def generate():
+        version = -1
+        while True:
+            current = job.wait_for_change(version, timeout=Config.JOB_EVENTS_HEARTBEAT)
+            if current == version:
+                # Keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            version = current
+            snapshot = job.to_dict()
+            if snapshot['status'] in ('completed', 'failed'):
+                yield f"event: done\ndata: {json.dumps(snapshot)}\n\n"
+                return
+            # Progress events carry no result so they stay small
+            snapshot.pop('result', None)
+            yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the stream ends or the client goes away, even if it never started
+    response.call_on_close(event_stream_slots.release)
+    return response
+
+
+@api.route('/api/match/bulk', methods=['POST'])
+def bulk_match_profiles():
+    """
+    Match many pitch profiles in one request.
+    Accepts a JSONL or CSV file in 'profiles' (or a JSONL request body) and
+    streams one JSON result per line, in input order.
+    """
+    try:
+        if 'profiles' in request.files:
+            upload = request.files['profiles']
+            fmt = request.args.get('format') or detect_format(upload.filename)
+            text = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+        else:
+            fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'jsonl')
+            text = io.StringIO(request.get_data(as_text=True), newline='')
+        # Read lazily: match_profiles only looks a few rows ahead
+        rows = read_profiles(text, fmt)
+        
+        top_n = request.args.get('top_n', Config.BULK_MATCH_TOP_N, type=int)
+        workers = request.args.get('workers', Config.BULK_MATCH_WORKERS, type=int)
+        workers = max(1, min(workers, Config.BULK_MATCH_MAX_WORKERS))
+        
+        # Load the snapshot before the 200 goes out, so a failure is still a JSON error
+        snapshot = fund_matcher.snapshot()
+        if snapshot is None:
+            response = jsonify({'error': 'Fund data is not available, please retry shortly'})
+            response.headers['Retry-After'] = str(Config.BUSY_RETRY_AFTER)
+            return response, 503
+        print(f"📦 Bulk match request ({fmt}), top_n={top_n}, workers={workers}")
+        
+        def generate():
             try:
-                print(f"📄 Processing PDF: {filepath}")
-                print(f"📝 Form data: company={company_name}, stage={stage}, funding={funding_goal}")
-                
-                # Parse the PDF
-                parsing_result = pdf_parser.parse_pitch_deck(filepath)
-                print(f"🔍 Parsing result: {parsing_result}")
-                
-                # Add form data to the result
-                parsing_result['form_data'] = {
-                    'company_name': company_name,
-                    'stage': stage,
-                    'funding_goal': funding_goal,
-                    'continents': continents,
-                    'countries': countries
-                }
-                
-                # Find matching funds if parsing was successful and no error
-                if 'error' not in parsing_result:
-                    print("🔍 Finding matching funds...")
-                    try:
-                        matching_funds = fund_matcher.find_matching_funds(parsing_result, top_n=10)
-                        parsing_result['matching_funds'] = matching_funds
-                        parsing_result['funds_processed'] = len(matching_funds)
-                        print(f"✅ Found {len(matching_funds)} matching funds")
-                    except Exception as e:
-                        print(f"⚠️ Fund matching failed: {e}")
-                        parsing_result['matching_funds'] = []
-                        parsing_result['matching_error'] = str(e)
-                
-                # Clean up - remove the uploaded file
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                
-                return jsonify({
-                    'success': True,
-                    'message': 'Pitch deck analyzed successfully',
-                    'data': parsing_result
-                })
-                
+                for result in match_profiles(fund_matcher, rows, top_n=top_n, workers=workers, snapshot=snapshot):
+                    yield json.dumps(result) + '\n'
             except Exception as e:
-                # Clean up file if parsing fails
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                
-                return jsonify({
-                    'error': f'Failed to parse PDF: {str(e)}'
-                }), 500
-                
+                # Headers are already sent: end the stream with an error line the client can detect
+                print(f"❌ Bulk matching stopped: {e}")
+                yield json.dumps({'error': f'Bulk matching stopped: {str(e)}'}) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
     except Exception as e:
         return jsonify({
-            'error': f'Server error: {str(e)}'
+            'error': f'Bulk matching failed: {str(e)}'
         }), 500
 
 
-@app.errorhandler(413)
+@api.app_errorhandler(413)
 def too_large(e):
     """Handle file too large error"""
     return jsonify({
         'error': 'File too large. Maximum size is 25MB.'
     }), 413
 
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(e):
     """Handle not found error"""
     return jsonify({
         'error': 'Endpoint not found'
     }), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(e):
     """Handle internal server error"""
     return jsonify({
@@ -165,4 +482,6 @@ if __name__ == '__main__':
         print("Fund matching will not work without Airtable API key.")
         print("Get your API key from: https://airtable.com/account")
     
-    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
+    # Development server; production runs the factory under gunicorn: gunicorn 'app:create_app()'
+    app = create_app()
+    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False, threaded=True)
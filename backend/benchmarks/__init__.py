@@ -0,0 +1,5 @@
+"""
+Benchmark suite: synthetic funds and decks, local stand-ins for Airtable and
+OpenAI, and a runner reporting throughput, latency percentiles and LLM calls.
+Run from backend/:  python -m benchmarks.run --help
+"""
@@ -0,0 +1,241 @@
+"""
+Benchmark Runner
+Starts the Airtable and OpenAI stand-ins, points the app at them, and measures
+parse_pitch_deck, find_matching_funds and the full upload endpoint.
+
+Usage (from backend/):
+    python -m benchmarks.run --funds 10000 --pages 5,15,30 --iterations 20
+    python -m benchmarks.run --funds 100000 --scenarios match --concurrency 4 --openai-latency-ms 300
+    python -m benchmarks.run --openai-error-rate 0.05 --json results.json
+    python -m benchmarks.run --prompt-mode compact --scenarios parse,match
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence
+
+from benchmarks.standins import AirtableStandIn, OpenAIStandIn
+from benchmarks.synthetic import pitch_profile, synthetic_deck
+
+SCENARIOS = ['parse', 'match', 'upload']
+LLM_KINDS = ['page', 'packed_pages', 'semantic', 'semantic_batch']
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(fraction * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def measure(name: str, operations: List[Callable[[], Any]], concurrency: int,
+            openai_standin: OpenAIStandIn) -> Dict[str, Any]:
+    """Run the operations `concurrency` at a time and summarize latency, throughput and LLM calls"""
+    openai_standin.reset_counts()
+    latencies: List[float] = []
+
+    def run(operation: Callable[[], Any]) -> bool:
+        started = time.perf_counter()
+        try:
+            result = operation()
+            ok = not (isinstance(result, dict) and result.get('error'))
+        except Exception as e:
+            print(f"⚠️ {name} operation failed: {e}")
+            ok = False
+        latencies.append(time.perf_counter() - started)
+        return ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        outcomes = list(executor.map(run, operations))
+    wall = time.perf_counter() - started
+    failures = outcomes.count(False)
+
+    counts = openai_standin.reset_counts()
+    llm_calls = {kind: counts.get(kind, 0) for kind in LLM_KINDS}
+    total_calls = sum(llm_calls.values())
+    operations_count = len(operations) or 1
+    return {
+        'scenario': name,
+        'operations': len(operations),
+        'failures': failures,
+        'concurrency': concurrency,
+        'wall_seconds': round(wall, 3),
+        'throughput_per_second': round(len(operations) / wall, 3) if wall else 0.0,
+        'p50_seconds': round(percentile(latencies, 0.50), 4),
+        'p95_seconds': round(percentile(latencies, 0.95), 4),
+        'max_seconds': round(max(latencies, default=0.0), 4),
+        'llm_calls': total_calls,
+        'llm_calls_per_operation': round(total_calls / operations_count, 2),
+        'llm_calls_by_kind': llm_calls,
+        'llm_errors_injected': counts.get('errors', 0),
+        'prompt_tokens': counts.get('prompt_tokens', 0),
+        'cached_prompt_tokens': counts.get('cached_prompt_tokens', 0),
+        'completion_tokens': counts.get('completion_tokens', 0),
+        'tokens_per_operation': round(
+            (counts.get('prompt_tokens', 0) + counts.get('completion_tokens', 0)) / operations_count, 1),
+    }
+
+
+def configure_environment(args, airtable: AirtableStandIn, openai_standin: OpenAIStandIn, workdir: str):
+    """Point Config at the stand-ins and a scratch data directory (must run before the app modules import)"""
+    os.environ.update({
+        'OPENAI_API_KEY': 'benchmark',
+        'OPENAI_BASE_URL': openai_standin.base_url,
+        'AIRTABLE_API_KEY': 'benchmark',
+        'AIRTABLE_ENDPOINT_URL': airtable.url,
+        'AIRTABLE_BASE_ID': 'appBenchmark00000',
+        'AIRTABLE_TABLE_NAME': 'Fund',
+        'FUND_STORE_PATH': os.path.join(workdir, 'funds.sqlite3'),
+        'FUND_SYNC_INTERVAL': '0',
+        'PAGE_CACHE_PATH': os.path.join(workdir, 'page_cache.sqlite3'),
+        'DECK_CACHE_PATH': os.path.join(workdir, 'deck_cache.sqlite3'),
+        'SEMANTIC_CACHE_PATH': os.path.join(workdir, 'semantic_cache.sqlite3'),
+        'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'),
+    })
+    if args.extraction_mode:
+        os.environ['PAGE_EXTRACTION_MODE'] = args.extraction_mode
+    if args.prompt_mode:
+        os.environ['PROMPT_MODE'] = args.prompt_mode
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    header = (f"{'scenario':<24}{'ops':>6}{'fail':>6}{'ops/s':>9}{'p50 s':>9}{'p95 s':>9}{'LLM/op':>8}{'tok/op':>9}"
+              f"  LLM calls by kind")
+    lines = [header, '-' * len(header)]
+    for result in results:
+        by_kind = ', '.join(f"{kind}={count}" for kind, count in result['llm_calls_by_kind'].items() if count)
+        lines.append(
+            f"{result['scenario']:<24}{result['operations']:>6}{result['failures']:>6}"
+            f"{result['throughput_per_second']:>9.2f}{result['p50_seconds']:>9.3f}{result['p95_seconds']:>9.3f}"
+            f"{result['llm_calls_per_operation']:>8.1f}{result['tokens_per_operation']:>9.0f}  {by_kind or '-'}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark deck parsing and fund matching against local stand-ins')
+    parser.add_argument('--funds', type=int, default=10000, help='synthetic fund table size')
+    parser.add_argument('--pages', default='5,15,30', help='comma-separated deck page counts')
+    parser.add_argument('--iterations', type=int, default=10, help='operations per scenario and deck size')
+    parser.add_argument('--concurrency', type=int, default=1, help='operations in flight at once')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"comma-separated subset of {SCENARIOS}")
+    parser.add_argument('--repeat-decks', action='store_true',
+                        help='reuse one deck per size, so page/deck caches are exercised (default: a fresh deck per operation)')
+    parser.add_argument('--extraction-mode', choices=['per_page', 'packed'], help='override PAGE_EXTRACTION_MODE')
+    parser.add_argument('--prompt-mode', choices=['full', 'compact'], help='override PROMPT_MODE')
+    parser.add_argument('--openai-latency-ms', type=float, default=200)
+    parser.add_argument('--openai-error-rate', type=float, default=0.0)
+    parser.add_argument('--airtable-latency-ms', type=float, default=50)
+    parser.add_argument('--airtable-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {sorted(unknown)}")
+    page_counts = [int(count) for count in args.pages.split(',') if count.strip()]
+
+    workdir = tempfile.mkdtemp(prefix='pitchdeck-bench-')
+    airtable = AirtableStandIn(args.funds, data_seed=args.seed, latency=args.airtable_latency_ms / 1000,
+                               error_rate=args.airtable_error_rate, seed=args.seed).start()
+    openai_standin = OpenAIStandIn(latency=args.openai_latency_ms / 1000,
+                                   error_rate=args.openai_error_rate, seed=args.seed).start()
+    configure_environment(args, airtable, openai_standin, workdir)
+    # The app's progress output goes to stderr so stdout carries only the report
+    report_stream, sys.stdout = sys.stdout, sys.stderr
+    print(f"🧪 Benchmarking with {args.funds} funds, data in {workdir}")
+
+    # Imported only now so Config picks up the stand-in endpoints
+    from fund_matcher import FundMatcher
+    from pdf_parser import PitchDeckParser
+
+    results = []
+    try:
+        matcher = FundMatcher()
+        started = time.perf_counter()
+        summary = matcher.fund_store.sync(full=True)
+        sync_seconds = time.perf_counter() - started
+        print(f"✅ Initial fund sync: {summary['total']} funds in {sync_seconds:.2f}s "
+              f"({airtable.reset_counts().get('requests', 0)} Airtable requests)")
+        results.append({
+            'scenario': 'fund_sync', 'operations': 1, 'failures': 0, 'concurrency': 1,
+            'wall_seconds': round(sync_seconds, 3), 'throughput_per_second': round(1 / sync_seconds, 3),
+            'p50_seconds': round(sync_seconds, 4), 'p95_seconds': round(sync_seconds, 4),
+            'max_seconds': round(sync_seconds, 4), 'llm_calls': 0, 'llm_calls_per_operation': 0,
+            'llm_calls_by_kind': {kind: 0 for kind in LLM_KINDS}, 'llm_errors_injected': 0,
+            'prompt_tokens': 0, 'cached_prompt_tokens': 0, 'completion_tokens': 0, 'tokens_per_operation': 0,
+        })
+
+        def decks_for(page_count: int, offset: int) -> List[bytes]:
+            seeds = [args.seed * 100_000 + offset + page_count * 1000 + (0 if args.repeat_decks else i)
+                     for i in range(args.iterations)]
+            return [synthetic_deck(page_count, seed)[0] for seed in seeds]
+
+        if 'parse' in scenarios:
+            parser_instance = PitchDeckParser()
+            for page_count in page_counts:
+                decks = decks_for(page_count, 0)
+                results.append(measure(
+                    f'parse_pitch_deck[{page_count}p]',
+                    [lambda deck=deck: parser_instance.parse_pitch_deck(deck) for deck in decks],
+                    args.concurrency, openai_standin
+                ))
+
+        if 'match' in scenarios:
+            profiles = [pitch_profile(args.seed * 100_000 + 50_000 + i) for i in range(args.iterations)]
+            results.append(measure(
+                'find_matching_funds',
+                [lambda profile=profile: matcher.find_matching_funds(profile, top_n=10) for profile in profiles],
+                args.concurrency, openai_standin
+            ))
+
+        if 'upload' in scenarios:
+            import io
+            from app import create_app
+            client = create_app().test_client()
+
+            def upload(deck: bytes, profile: Dict[str, Any]) -> Dict[str, Any]:
+                response = client.post('/api/upload-pitch-deck', content_type='multipart/form-data', data={
+                    'pitchDeck': (io.BytesIO(deck), 'deck.pdf'),
+                    'companyName': profile['company_name'],
+                    'stage': profile['stage'],
+                    'fundingGoal': profile['check_size'],
+                    'continents': json.dumps(profile['form_data']['continents']),
+                    'countries': json.dumps(profile['form_data']['countries']),
+                })
+                body = response.get_json(silent=True) or {}
+                return body if response.status_code == 200 else {'error': body.get('error', response.status_code)}
+
+            for page_count in page_counts:
+                seeds = [args.seed * 100_000 + 70_000 + page_count * 1000 + (0 if args.repeat_decks else i)
+                         for i in range(args.iterations)]
+                decks = [synthetic_deck(page_count, seed) for seed in seeds]
+                results.append(measure(
+                    f'upload_endpoint[{page_count}p]',
+                    [lambda deck=deck, profile=profile: upload(deck, profile) for deck, profile in decks],
+                    args.concurrency, openai_standin
+                ))
+    finally:
+        sys.stdout = report_stream
+        airtable.stop()
+        openai_standin.stop()
+
+    print(format_report(results))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump({'arguments': vars(args), 'results': results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Local Service Stand-ins
+Minimal HTTP servers speaking the Airtable list-records API and the OpenAI
+chat-completions API, with configurable latency and error injection, so the
+real clients (pyairtable, openai) can be exercised without network access.
+Both servers count what they served for the benchmark report.
+"""
+
+import re
+import json
+import time
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from benchmarks.synthetic import DECK_LABELS, fund_record
+
+PAGE_FIELDS = [
+    "company_name", "company_website", "company_email", "sector", "location",
+    "stage", "check_size", "lead", "investment_theme"
+]
+
+# Values that match any location, as the semantic matching rules describe
+ANY_LOCATION = {'global', 'worldwide', 'international'}
+STOP_WORDS = {'and', 'in', 'the', 'of', '&', 'stage', 'series', 'up', 'to'}
+
+# Smallest prompt prefix OpenAI's prompt caching applies to
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StandInServer:
+    """
+    Base for the stand-ins: a threaded HTTP server on an ephemeral local port.
+    latency: mean seconds added to every request (uniformly jittered by +/-50%)
+    error_rate: fraction of requests answered with an injected error
+    """
+
+    handler_class = _Handler
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self.counts: Counter = Counter()
+
+        server = self
+
+        class Handler(self.handler_class):
+            standin = server
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, key: str, amount: int = 1):
+        with self._counts_lock:
+            self.counts[key] += amount
+
+    def reset_counts(self) -> Dict[str, int]:
+        """Return the counts so far and start again from zero"""
+        with self._counts_lock:
+            counts = dict(self.counts)
+            self.counts.clear()
+        return counts
+
+    def simulate(self) -> bool:
+        """Sleep for the configured latency; True when this request should fail"""
+        with self._rng_lock:
+            delay = self.latency * self._rng.uniform(0.5, 1.5) if self.latency else 0.0
+            fail = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return fail
+
+
+# --- Airtable ---------------------------------------------------------------
+
+AIRTABLE_PAGE_SIZE = 100
+MODIFIED_AFTER_PATTERN = re.compile(r"IS_AFTER\(LAST_MODIFIED_TIME\(\),\s*DATETIME_PARSE\('([^']+)'\)\)")
+
+
+class _AirtableHandler(_Handler):
+    """GET /v0/{base}/{table} and POST /v0/{base}/{table}/listRecords"""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        self._list_records(parsed.path, params)
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if not parsed.path.endswith('/listRecords'):
+            self._send_json(404, {'error': 'NOT_FOUND'})
+            return
+        self._list_records(parsed.path[:-len('/listRecords')], self._read_json())
+
+    def _list_records(self, path: str, params: Dict[str, Any]):
+        standin: AirtableStandIn = self.standin
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if len(parts) != 3 or parts[0] != 'v0':
+            self._send_json(404, {'error': 'NOT_FOUND'})
+            return
+        if standin.simulate():
+            standin.count('errors')
+            self._send_json(429, {'errors': [{'error': 'RATE_LIMIT_REACHED', 'message': 'Injected rate limit'}]})
+            return
+
+        start = int(params.get('offset') or 0)
+        page_size = min(int(params.get('pageSize') or AIRTABLE_PAGE_SIZE), AIRTABLE_PAGE_SIZE)
+        records, next_offset = standin.list_page(start, page_size, params.get('filterByFormula'))
+        standin.count('requests')
+        standin.count('records', len(records))
+        body = {'records': records}
+        if next_offset is not None:
+            body['offset'] = str(next_offset)
+        self._send_json(200, body)
+
+
+class AirtableStandIn(StandInServer):
+    """
+    Serves `record_count` synthetic funds (generated on demand, never stored).
+    The incremental-sync formula is honoured: records are "modified" at server
+    start, so later incremental syncs return nothing, as they would for an
+    unchanged table.
+    """
+
+    handler_class = _AirtableHandler
+
+    def __init__(self, record_count: int, data_seed: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.record_count = record_count
+        self.data_seed = data_seed
+        self.modified_at = datetime.now(timezone.utc)
+        self._created_time = self.modified_at.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+    def list_page(self, start: int, page_size: int, formula: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        if formula:
+            match = MODIFIED_AFTER_PATTERN.search(formula)
+            if match:
+                since = datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S.000Z').replace(tzinfo=timezone.utc)
+                if since >= self.modified_at:
+                    return [], None
+        end = min(start + page_size, self.record_count)
+        records = [fund_record(index, self.data_seed, created_time=self._created_time) for index in range(start, end)]
+        return records, (end if end < self.record_count else None)
+
+
+# --- OpenAI -----------------------------------------------------------------
+
+LABEL_PATTERN = re.compile(
+    r'^\s*(' + '|'.join(re.escape(label) for label in DECK_LABELS) + r'):\s*(.+?)\s*$', re.MULTILINE
+)
+PAGE_MARKER_PATTERN = re.compile(r'^\s*=== Page (\d+) ===\s*$', re.MULTILINE)
+PITCH_VALUE_PATTERN = re.compile(r'Pitch deck \w+: "(.*)"')
+FUND_VALUE_PATTERN = re.compile(r'Fund \w+: "(.*)"')
+NUMBERED_VALUE_PATTERN = re.compile(r'^\s*(\d+)\. "(.*)"$', re.MULTILINE)
+
+
+def extract_page_fields(text: str) -> Dict[str, Any]:
+    """What a model would extract from a synthetic deck page: the labelled facts, null elsewhere"""
+    fields = {field: None for field in PAGE_FIELDS}
+    for label, value in LABEL_PATTERN.findall(text):
+        fields[DECK_LABELS[label]] = value
+    return fields
+
+
+def _tokens(value: str) -> set:
+    return {token for token in re.split(r'[^a-z0-9]+', value.lower()) if token and token not in STOP_WORDS}
+
+
+def semantic_verdict(pitch_value: str, fund_value: str) -> bool:
+    """Cheap stand-in for the model's judgement: shared words, or a location that matches anywhere"""
+    pitch_tokens, fund_tokens = _tokens(pitch_value), _tokens(fund_value)
+    if fund_tokens & ANY_LOCATION:
+        return True
+    return bool(pitch_tokens & fund_tokens)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class _OpenAIHandler(_Handler):
+    """POST /v1/chat/completions"""
+
+    def do_POST(self):
+        standin: OpenAIStandIn = self.standin
+        if not urlparse(self.path).path.endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Unknown endpoint', 'type': 'invalid_request_error'}})
+            return
+        request = self._read_json()
+        messages = request.get('messages', [])
+        if standin.simulate():
+            standin.count('errors')
+            self._send_json(
+                429, {'error': {'message': 'Injected rate limit', 'type': 'rate_limit_error', 'code': 'rate_limit_exceeded'}},
+                headers={'retry-after-ms': str(standin.retry_after_ms)}
+            )
+            return
+
+        kind, content = standin.respond(messages)
+        prompt_tokens = sum(estimate_tokens(str(message.get('content', ''))) for message in messages)
+        cached_tokens = standin.cached_prefix_tokens(messages)
+        completion_tokens = estimate_tokens(content)
+        standin.count(kind)
+        standin.count('prompt_tokens', prompt_tokens)
+        standin.count('cached_prompt_tokens', cached_tokens)
+        standin.count('completion_tokens', completion_tokens)
+        self._send_json(200, {
+            'id': f'chatcmpl-bench-{time.time_ns()}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'gpt-4o-mini'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'logprobs': None,
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'prompt_tokens_details': {'cached_tokens': cached_tokens},
+            },
+        })
+
+
+class OpenAIStandIn(StandInServer):
+    """
+    Answers the app's four prompt shapes deterministically (full or compact prompts):
+    page analysis, packed multi-page analysis, single and batched semantic comparison.
+    Injected errors are 429s with a short retry-after-ms, like a rate-limited account.
+    Prompt caching is imitated: a repeated system message of at least
+    PROMPT_CACHE_MIN_TOKENS is reported as cached, in 128-token steps.
+    """
+
+    handler_class = _OpenAIHandler
+
+    def __init__(self, retry_after_ms: int = 100, **kwargs):
+        super().__init__(**kwargs)
+        self.retry_after_ms = retry_after_ms
+        self._seen_prefixes = set()
+        self._prefix_lock = threading.Lock()
+
+    def cached_prefix_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        system = next((str(m.get('content', '')) for m in messages if m.get('role') == 'system'), '')
+        tokens = estimate_tokens(system) if system else 0
+        if tokens < PROMPT_CACHE_MIN_TOKENS:
+            return 0
+        with self._prefix_lock:
+            seen = system in self._seen_prefixes
+            self._seen_prefixes.add(system)
+        return tokens // 128 * 128 if seen else 0
+
+    @property
+    def base_url(self) -> str:
+        return f'{self.url}/v1'
+
+    def respond(self, messages: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """(request kind, assistant message content) for a chat request"""
+        user = '\n'.join(str(m.get('content', '')) for m in messages if m.get('role') == 'user')
+
+        markers = list(PAGE_MARKER_PATTERN.finditer(user))
+        if markers:
+            pages = []
+            for i, marker in enumerate(markers):
+                end = markers[i + 1].start() if i + 1 < len(markers) else len(user)
+                pages.append({'page_number': int(marker.group(1)), **extract_page_fields(user[marker.end():end])})
+            return 'packed_pages', json.dumps({'pages': pages})
+        pitch_match = PITCH_VALUE_PATTERN.search(user)
+        if pitch_match is None:
+            return 'page', json.dumps(extract_page_fields(user))
+
+        pitch_value = pitch_match.group(1)
+        numbered = NUMBERED_VALUE_PATTERN.findall(user)
+        if numbered:
+            matches = [int(number) for number, value in numbered if semantic_verdict(pitch_value, value)]
+            return 'semantic_batch', json.dumps({'matches': matches})
+        fund_match = FUND_VALUE_PATTERN.search(user)
+        fund_value = fund_match.group(1) if fund_match else ''
+        return 'semantic', 'MATCH' if semantic_verdict(pitch_value, fund_value) else 'NO_MATCH'
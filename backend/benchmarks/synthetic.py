@@ -0,0 +1,259 @@
+"""
+Synthetic Data
+Deterministic fund tables (as Airtable records) and pitch deck PDFs, shaped
+like production data: skewed value distributions, multi-valued cells, and a
+per-column rate of empty and placeholder ("Unknown", "N/A", ...) values
+"""
+
+import random
+import textwrap
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# (value, weight); weights roughly follow how often values appear in the real table
+STAGES = [
+    ('Seed', 14), ('Pre-Seed, Seed', 12), ('Seed, Series A', 12), ('Series A', 10),
+    ('Series A, Series B', 7), ('Early stage', 6), ('Series B, Series C', 4),
+    ('Growth', 3), ('Late stage', 2), ('Pre-Seed', 3),
+]
+SECTORS = [
+    ('FinTech', 10), ('HealthTech', 9), ('B2B SaaS', 9), ('AI/ML', 8), ('Digital Health', 6),
+    ('CleanTech', 5), ('EdTech', 4), ('Consumer', 4), ('Biotech', 4), ('Cybersecurity', 3),
+    ('E-commerce', 3), ('Deep Tech', 2), ('AgTech', 2), ('InsurTech', 2), ('PropTech', 1),
+]
+THEMES = [
+    ('FinTech', 8), ('Digital Health', 8), ('B2B SaaS', 7), ('AI/ML', 6), ('MedTech', 5),
+    ('Climate Tech', 5), ('Biotech & Pharma', 4), ('Healthcare IT & Infrastructure', 3),
+    ('EdTech', 3), ('Web3', 2), ('Robotics', 2), ('Longevity & Emerging Trends', 1),
+]
+# (location text, continent, country) so decks can carry matching form selections
+LOCATIONS = [
+    ('United States', 'North America', 'United States'), ('San Francisco, CA', 'North America', 'United States'),
+    ('New York, NY', 'North America', 'United States'), ('Boston, MA', 'North America', 'United States'),
+    ('Canada', 'North America', 'Canada'), ('United Kingdom', 'Europe', 'United Kingdom'),
+    ('London, UK', 'Europe', 'United Kingdom'), ('Germany', 'Europe', 'Germany'),
+    ('Berlin, Germany', 'Europe', 'Germany'), ('France', 'Europe', 'France'),
+    ('Israel', 'Asia', 'Israel'), ('Singapore', 'Asia', 'Singapore'), ('India', 'Asia', 'India'),
+]
+LOCATION_WEIGHTS = [12, 6, 5, 3, 3, 5, 3, 4, 2, 3, 3, 2, 2]
+BROAD_LOCATIONS = [('Global', 6), ('Worldwide', 2), ('Europe', 4), ('North America', 3), ('Nordics', 1)]
+CHECK_AMOUNTS = ['$100K', '$250K', '$500K', '$1M', '$2M', '$3M', '$5M', '$10M', '$20M']
+LEADS = [('Lead Investor', 5), ('Co-Investor', 4), ('Both (Lead & Co-Investor)', 6)]
+CONFIDENCE_LEVELS = [('Very High', 2), ('High', 5), ('Medium', 4), ('Low', 2), ('Very Low', 1), ('', 2)]
+
+# Column -> placeholder values that production data uses for "we don't know"
+PLACEHOLDERS = {
+    'stage': ['Stage agnostic', 'Unknown', 'Not identified'],
+    'sector': ['Unknown', 'Not available', 'N/A'],
+    'location': ['Unknown', 'Not identified'],
+    'check size': ['Not available', 'Unknown', 'TBD', 'No reliable data'],
+    'lead': ['Unknown', 'Not identified'],
+    'investment theme': ['No themes found', 'Unknown', 'Not a fit'],
+}
+
+# Column -> (empty rate, placeholder rate)
+DEFAULT_QUALITY_RATES = {
+    'stage': (0.03, 0.08),
+    'sector': (0.04, 0.06),
+    'location': (0.03, 0.05),
+    'check size': (0.10, 0.15),
+    'lead': (0.12, 0.18),
+    'investment theme': (0.05, 0.12),
+}
+
+FIRM_WORDS = ['North', 'Harbor', 'Summit', 'Atlas', 'Granite', 'Beacon', 'Cedar', 'Lumen', 'Orbit', 'Vertex',
+              'Pioneer', 'Signal', 'Meridian', 'Foundry', 'Elm', 'Helix', 'Keystone', 'Polar', 'Sequoia', 'Tidal']
+FIRM_SUFFIXES = ['Ventures', 'Capital', 'Partners', 'Fund', 'Investments', 'VC']
+COMPANY_WORDS = ['Nova', 'Pulse', 'Quanta', 'Medi', 'Fin', 'Loop', 'Bright', 'Cura', 'Ledger', 'Grid',
+                 'Sense', 'Flow', 'Thera', 'Vita', 'Stack', 'Forge', 'Mint', 'Spark', 'Bio', 'Terra']
+FILLER_WORDS = (
+    'customers teams workflow platform market growth revenue product pilot hospitals clinics banks '
+    'retention onboarding pipeline partners adoption costs data insights automation compliance '
+    'scale users regional traction enterprise contracts launch roadmap engineering hiring margin '
+    'distribution channel pricing subscription annual recurring expansion integration network'
+).split()
+
+# Airtable record ids are "rec" + 14 characters
+RECORD_ID_WIDTH = 14
+
+
+def _weighted(rng: random.Random, options: Sequence[Tuple[str, int]]) -> str:
+    values, weights = zip(*options)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def _multi(rng: random.Random, options: Sequence[Tuple[str, int]], max_values: int) -> str:
+    count = rng.choices(range(1, max_values + 1), weights=[6, 3, 1][:max_values], k=1)[0]
+    picked: List[str] = []
+    while len(picked) < count:
+        value = _weighted(rng, options)
+        if value not in picked:
+            picked.append(value)
+    return ', '.join(picked)
+
+
+def _check_size(rng: random.Random) -> str:
+    low = rng.randrange(len(CHECK_AMOUNTS) - 1)
+    high = rng.randrange(low + 1, min(low + 4, len(CHECK_AMOUNTS)))
+    return rng.choice([f'{CHECK_AMOUNTS[low]} - {CHECK_AMOUNTS[high]}', f'{CHECK_AMOUNTS[low]}-{CHECK_AMOUNTS[high]}',
+                       f'Up to {CHECK_AMOUNTS[high]}'])
+
+
+def _fund_location(rng: random.Random) -> str:
+    if rng.random() < 0.35:
+        return _weighted(rng, BROAD_LOCATIONS)
+    picked = {rng.choices(LOCATIONS, weights=LOCATION_WEIGHTS, k=1)[0][0] for _ in range(rng.randint(1, 2))}
+    return ', '.join(sorted(picked))
+
+
+def fund_record(index: int, seed: int = 0,
+                quality_rates: Optional[Dict[str, Tuple[float, float]]] = None,
+                created_time: str = '2024-01-01T00:00:00.000Z') -> Dict[str, Any]:
+    """
+    The index-th synthetic fund as an Airtable list-records entry.
+    Deterministic per (seed, index), so a table of any size can be served without storing it.
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+    rates = quality_rates or DEFAULT_QUALITY_RATES
+    name = f"{rng.choice(FIRM_WORDS)} {rng.choice(FIRM_WORDS)} {rng.choice(FIRM_SUFFIXES)}"
+    domain = name.lower().replace(' ', '')
+    fields = {
+        'website': f'https://{domain}.com',
+        'Email': f'deals@{domain}.com',
+        'stage': _multi(rng, STAGES, 2),
+        'sector': _multi(rng, SECTORS, 3),
+        'location': _fund_location(rng),
+        'check size': _check_size(rng),
+        'lead': _weighted(rng, LEADS),
+        'investment theme': _multi(rng, THEMES, 2),
+    }
+    for column, (empty_rate, placeholder_rate) in rates.items():
+        roll = rng.random()
+        if roll < empty_rate:
+            fields[column] = ''
+        elif roll < empty_rate + placeholder_rate:
+            fields[column] = rng.choice(PLACEHOLDERS[column])
+    for column in ('stage', 'check size', 'investment theme', 'location', 'lead', 'sector'):
+        fields[f'{column} confidence'] = _weighted(rng, CONFIDENCE_LEVELS)
+    # Airtable omits empty cells from the response
+    fields = {column: value for column, value in fields.items() if value}
+    return {'id': f'rec{index:0{RECORD_ID_WIDTH}d}', 'createdTime': created_time, 'fields': fields}
+
+
+def record_index(record_id: str) -> int:
+    return int(record_id[3:])
+
+
+def iter_fund_records(count: int, seed: int = 0, start: int = 0, **kwargs) -> Iterator[Dict[str, Any]]:
+    for index in range(start, count):
+        yield fund_record(index, seed, **kwargs)
+
+
+def pitch_profile(seed: int) -> Dict[str, Any]:
+    """Ground truth for one synthetic company, shaped like the parser's consolidated output"""
+    rng = random.Random(seed)
+    company = f"{rng.choice(COMPANY_WORDS)}{rng.choice(COMPANY_WORDS).lower()} {seed}"
+    slug = company.lower().replace(' ', '')
+    location, continent, country = rng.choices(LOCATIONS, weights=LOCATION_WEIGHTS, k=1)[0]
+    return {
+        'company_name': company,
+        'company_website': f'www.{slug}.com',
+        'company_email': f'founders@{slug}.com',
+        'sector': _weighted(rng, SECTORS),
+        'location': location,
+        'stage': _weighted(rng, [(value, weight) for value, weight in STAGES if ',' not in value]),
+        'check_size': rng.choice(CHECK_AMOUNTS[2:7]),
+        'lead': _weighted(rng, LEADS),
+        'investment_theme': _weighted(rng, THEMES),
+        'form_data': {'continents': [continent], 'countries': [country]},
+    }
+
+
+# Deck labels the OpenAI stand-in reads back out of page text (see standins.extract_page_fields)
+DECK_LABELS = {
+    'Company': 'company_name',
+    'Website': 'company_website',
+    'Email': 'company_email',
+    'Sector': 'sector',
+    'Headquarters': 'location',
+    'Stage': 'stage',
+    'Raising': 'check_size',
+    'Lead': 'lead',
+    'Theme': 'investment_theme',
+}
+
+
+def deck_pages(profile: Dict[str, Any], page_count: int, seed: int) -> List[str]:
+    """Page texts for a deck: title, an overview page with the facts, filler, and a closing page"""
+    rng = random.Random(seed)
+    footer = f"{profile['company_name']} | Confidential"
+    pages = [
+        f"{profile['company_name']}\nBuilding the future of {profile['sector']}\n"
+        f"Website: {profile['company_website']}\nEmail: {profile['company_email']}"
+    ]
+    overview = "\n".join(
+        [f"Company: {profile['company_name']}"] +
+        [f"{label}: {profile[field]}" for label, field in DECK_LABELS.items()
+         if field not in ('company_name', 'company_website', 'company_email')]
+    )
+    overview_index = rng.randint(1, max(1, page_count - 2))
+    for page_number in range(1, page_count):
+        if page_number == overview_index:
+            pages.append(f"Investment Overview\n{overview}")
+        elif page_number == page_count - 1 and page_count > 3:
+            pages.append("Thank you")
+        else:
+            words = ' '.join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(50, 140)))
+            pages.append(f"Section {page_number}\n" + "\n".join(textwrap.wrap(words.capitalize() + '.', 90)))
+    return [f"{text}\n{footer}" for text in pages[:page_count]]
+
+
+def _pdf_escape(text: str) -> str:
+    text = text.encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_pdf(pages: Sequence[str]) -> bytes:
+    """Minimal text-only PDF (one Helvetica text block per page) that pdfplumber and PyPDF2 can read"""
+    objects: List[bytes] = [b'', b'', b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    page_refs = []
+    for text in pages:
+        lines = ['BT', '/F1 12 Tf', '14 TL', '60 740 Td']
+        for line in text.split('\n'):
+            lines.append(f'({_pdf_escape(line)}) Tj T*')
+        lines.append('ET')
+        stream = '\n'.join(lines).encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        content_ref = len(objects)
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_ref
+        )
+        page_refs.append(len(objects))
+    objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % ref for ref in page_refs), len(page_refs)
+    )
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref_offset = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+def synthetic_deck(page_count: int, seed: int) -> Tuple[bytes, Dict[str, Any]]:
+    """A PDF deck with `page_count` pages and the profile it should parse to"""
+    profile = pitch_profile(seed)
+    return build_pdf(deck_pages(profile, page_count, seed)), profile
+
+
+def airtable_timestamp(moment: Optional[datetime] = None) -> str:
+    moment = moment or datetime.now(timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
@@ -0,0 +1,160 @@
+"""
+Bulk Fund Matching
+Matches many already-extracted pitch profiles (JSONL or CSV) against the fund
+table in one pass, sharing one fund snapshot, the indexes and the semantic
+verdict cache across all profiles
+
+Usage:
+    python bulk_matching.py profiles.jsonl -o results.jsonl --workers 8 --top-n 10
+    python bulk_matching.py profiles.csv > results.jsonl
+
+Results are written as JSONL; progress is logged to stderr.
+"""
+
+import csv
+import sys
+import json
+import logging
+import argparse
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+from config import Config
+from fund_matcher import FundMatcher
+from fund_snapshot import FundSnapshot
+from llm_scheduler import llm_priority
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ['stage', 'sector', 'investment_theme', 'location', 'lead', 'check_size']
+FORM_LIST_FIELDS = ['continents', 'countries']
+
+
+def _parse_list(value: Any) -> list:
+    """Form selections arrive as lists (JSONL), JSON arrays or ';'-separated text (CSV)"""
+    if isinstance(value, list):
+        return value
+    text = str(value or '').strip()
+    if not text:
+        return []
+    if text.startswith('['):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+    return [item.strip() for item in text.split(';') if item.strip()]
+
+
+def normalize_profile(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape one input row like the parser's output: pitch fields plus form_data"""
+    profile = {field: raw.get(field) or '' for field in PROFILE_FIELDS}
+    profile['company_name'] = raw.get('company_name') or ''
+    form_data = raw.get('form_data') if isinstance(raw.get('form_data'), dict) else {}
+    profile['form_data'] = {
+        field: _parse_list(form_data.get(field, raw.get(field))) for field in FORM_LIST_FIELDS
+    }
+    return profile
+
+
+def read_profiles(stream: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield raw profile rows from a JSONL or CSV text stream"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {'_error': f'Invalid JSON on line {line_number}: {e}'}
+
+
+def detect_format(filename: Optional[str], default: str = 'jsonl') -> str:
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def match_profiles(matcher: FundMatcher, rows: Iterable[Dict[str, Any]],
+                   top_n: int = 10, workers: Optional[int] = None,
+                   priority: str = 'batch', snapshot: Optional[FundSnapshot] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Match every profile and yield one result per input row, in input order.
+    The fund snapshot is loaded once for the whole batch; up to `workers`
+    profiles are matched at a time, reading the input lazily.
+    priority: LLM scheduler class for the comparisons ('batch' or 'background')
+    snapshot: fund snapshot to match against (loaded from the matcher when omitted)
+    """
+    workers = max(1, workers or Config.BULK_MATCH_WORKERS)
+    if snapshot is None:
+        snapshot = matcher.snapshot()
+    if snapshot is None:
+        raise RuntimeError("Fund snapshot could not be loaded")
+    logger.info("📦 Bulk matching against %s funds with %s workers", len(snapshot), workers)
+
+    def match_one(index: int, row: Dict[str, Any]) -> Dict[str, Any]:
+        profile_id = row.get('id') or row.get('profile_id') or index
+        if '_error' in row:
+            return {'index': index, 'profile_id': profile_id, 'error': row['_error']}
+        try:
+            profile = normalize_profile(row)
+            # Bulk work yields the LLM to interactive uploads (see llm_scheduler)
+            with llm_priority(priority):
+                matching_funds = matcher.find_matching_funds(profile, top_n=top_n, snapshot=snapshot)
+            return {
+                'index': index,
+                'profile_id': profile_id,
+                'company_name': profile['company_name'],
+                'matching_funds': matching_funds,
+                'funds_processed': len(matching_funds)
+            }
+        except Exception as e:
+            return {'index': index, 'profile_id': profile_id, 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-match') as executor:
+        # Bounded look-ahead keeps memory flat for large inputs while keeping every worker busy
+        pending = deque()
+        for index, row in enumerate(rows):
+            pending.append(executor.submit(contextvars.copy_context().run, match_one, index, row))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_jsonl(results: Iterable[Dict[str, Any]], output: TextIO):
+    for result in results:
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Match pitch profiles (JSONL or CSV) against the fund table')
+    parser.add_argument('input', help="profiles file, or '-' for stdin")
+    parser.add_argument('-o', '--output', help='JSONL results file (default: stdout)')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='input format (default: from file extension)')
+    parser.add_argument('--top-n', type=int, default=Config.BULK_MATCH_TOP_N)
+    parser.add_argument('--workers', type=int, default=Config.BULK_MATCH_WORKERS)
+    args = parser.parse_args(argv)
+
+    # Progress is logged to stderr, so stdout carries only the JSONL results
+    logging.basicConfig(level=Config.LOG_LEVEL, stream=sys.stderr)
+    fmt = args.format or detect_format(args.input)
+    input_stream = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    output_stream = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    try:
+        matcher = FundMatcher()
+        write_jsonl(match_profiles(matcher, read_profiles(input_stream, fmt), args.top_n, args.workers), output_stream)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Two-Level Cache
+In-process LRU in front of a persistent SQLite key/value store
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def connect_sqlite(db_path: str) -> sqlite3.Connection:
+    """
+    Connection for a SQLite file that several worker processes read and write:
+    waits up to SQLITE_BUSY_TIMEOUT for another writer and uses WAL so readers
+    never block on a write
+    """
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=Config.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a stable cache key from JSON-serialisable parts"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TwoLevelCache:
+    """
+    Memory LRU (level 1) backed by an on-disk SQLite table (level 2).
+
+    Values must be JSON-serialisable. Entries expire after `ttl` seconds on
+    both levels; the disk level is trimmed to `max_disk_entries` oldest-first.
+    """
+
+    # Purge expired / excess disk rows every N writes
+    PURGE_EVERY = 500
+    # At most one disk error warning per cache in this many seconds (all are counted in stats)
+    DISK_WARNING_INTERVAL = 10.0
+
+    def __init__(self, name: str, db_path: Optional[str] = None,
+                 max_entries: int = 10000, ttl: Optional[int] = None,
+                 max_disk_entries: Optional[int] = None):
+        self.name = name
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.max_disk_entries = max_disk_entries
+
+        self._lock = threading.RLock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._writes = 0
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'disk_errors': 0}
+        self._disk_warned_at = 0.0
+
+        self._conn = None
+        if db_path:
+            self._conn = connect_sqlite(db_path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, value: Any, expires_at: Optional[float]):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                        (self.name, key)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    # A busy or broken disk level is a miss, never a failed request
+                    self._disk_error("read failed", e)
+                    row = None
+                if row and (row[1] is None or row[1] > now):
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self._stats['disk_hits'] += 1
+                    return value
+
+            self._stats['misses'] += 1
+            return default
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._stats['writes'] += 1
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT INTO cache_entries (namespace, key, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, "
+                        "created_at = excluded.created_at, expires_at = excluded.expires_at",
+                        (self.name, key, json.dumps(value), now, expires_at)
+                    )
+                    self._writes += 1
+                    if self._writes % self.PURGE_EVERY == 0:
+                        self._purge(now)
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    # Skip the disk write; the value stays in the memory level
+                    self._disk_error("write skipped", e)
+                    self._conn.rollback()
+
+    def _disk_error(self, what: str, error: sqlite3.Error):
+        """Count a disk level failure; warn about it unless one was reported recently"""
+        self._stats['disk_errors'] += 1
+        now = time.monotonic()
+        if now - self._disk_warned_at >= self.DISK_WARNING_INTERVAL:
+            self._disk_warned_at = now
+            logger.warning("%s cache %s: %s (%d disk errors so far)", self.name, what, error, self._stats['disk_errors'])
+
+    def _purge(self, now: float):
+        """Drop expired disk rows and trim the namespace to max_disk_entries"""
+        self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (self.name, now)
+        )
+        if self.max_disk_entries:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache_entries WHERE namespace = ?"
+                " ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.name, self.name, self.max_disk_entries)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.name,))
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['hits'] = stats['memory_hits'] + stats['disk_hits']
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+            stats['memory_entries'] = len(self._memory)
+            return stats
@@ -0,0 +1,148 @@
+"""
+Check Size Parsing
+Turns free-text check sizes ("$2M", "1-5M", "$500K–$3M") into USD intervals
+and indexes fund intervals for fast overlap queries
+"""
+
+import re
+import bisect
+import threading
+from typing import Dict, List, Any, Iterable, Optional, Set, Tuple
+
+INFINITY = float('inf')
+
+SUFFIX_MULTIPLIERS = {
+    'k': 1e3, 'thousand': 1e3,
+    'm': 1e6, 'mm': 1e6, 'mn': 1e6, 'million': 1e6, 'millions': 1e6,
+    'b': 1e9, 'bn': 1e9, 'billion': 1e9, 'billions': 1e9,
+}
+
+# Approximate conversion rates; check sizes are coarse, so static rates are good enough
+CURRENCY_TO_USD = {
+    'usd': 1.0, '$': 1.0, 'us$': 1.0,
+    'eur': 1.08, '€': 1.08,
+    'gbp': 1.27, '£': 1.27,
+    'cad': 0.74, 'c$': 0.74,
+    'aud': 0.66, 'a$': 0.66,
+    'chf': 1.12,
+    'sgd': 0.74, 's$': 0.74,
+    'inr': 0.012, '₹': 0.012,
+    'jpy': 0.0067, '¥': 0.0067,
+}
+
+UPPER_BOUND_MARKERS = ('up to', 'upto', 'under', 'less than', 'below', 'max', '<')
+LOWER_BOUND_MARKERS = ('+', 'over', 'above', 'more than', 'at least', 'min', '>')
+
+AMOUNT_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(thousand|millions?|billions?|mm|mn|bn|k|m|b)?(?![a-z])'
+)
+# Codes only as whole words, so "eur" in "Europe" or "cad" in "decade" is not a currency
+CURRENCY_PATTERN = re.compile(
+    r'((?<![a-z])(?:us\$|c\$|a\$|s\$|usd|eur|gbp|cad|aud|chf|sgd|inr|jpy)(?![a-z])|[$€£₹¥])'
+)
+
+
+def parse_check_size(value: Any) -> Optional[Tuple[float, float]]:
+    """
+    Parse a check size into a (low, high) USD interval.
+    Returns None when the text cannot be interpreted confidently.
+    """
+    if value is None:
+        return None
+    text = str(value).lower().strip()
+    if not text:
+        return None
+
+    text = re.sub(r'[‒-―−]', '-', text)  # en/em dashes
+    text = re.sub(r'(?<=\d),(?=\d{3})', '', text)  # 1,000,000 -> 1000000
+
+    currency_match = CURRENCY_PATTERN.search(text)
+    rate = CURRENCY_TO_USD[currency_match.group(1)] if currency_match else 1.0
+
+    matches = AMOUNT_PATTERN.findall(text)
+    if not matches or len(matches) > 2:
+        return None
+
+    # "1-5M": a missing suffix on the low end inherits the high end's suffix
+    suffixes = [suffix for _, suffix in matches]
+    if len(matches) == 2 and not suffixes[0] and suffixes[1]:
+        suffixes[0] = suffixes[1]
+
+    amounts = []
+    for (number, _), suffix in zip(matches, suffixes):
+        amount = float(number)
+        if suffix:
+            amount *= SUFFIX_MULTIPLIERS[suffix]
+        elif amount < 1000:
+            # A bare small number ("5") is ambiguous
+            return None
+        amounts.append(amount * rate)
+
+    if len(amounts) == 2:
+        return (min(amounts), max(amounts))
+
+    amount = amounts[0]
+    if any(marker in text for marker in UPPER_BOUND_MARKERS):
+        return (0.0, amount)
+    if any(marker in text for marker in LOWER_BOUND_MARKERS):
+        return (amount, INFINITY)
+    return (amount, amount)
+
+
+class CheckSizeIndex:
+    """
+    Parsed check-size interval per fund, kept sorted by lower bound so an
+    overlap query only touches funds whose range starts below the query's end.
+    Funds whose check size could not be parsed are left out of the index.
+    """
+
+    def __init__(self, field: str = 'check_size'):
+        self.field = field
+        self._lock = threading.RLock()
+        self._intervals: Dict[str, Tuple[float, float]] = {}
+        self._sorted_lows: List[float] = []
+        self._sorted_entries: List[Tuple[float, float, str]] = []
+        self._dirty = True
+        self.is_built = False
+
+    def build(self, funds: Iterable[Dict[str, Any]]):
+        with self._lock:
+            self._intervals = {}
+            for fund in funds:
+                self._add(fund)
+            self._dirty = True
+            self.is_built = True
+
+    def update(self, updated_funds: Iterable[Dict[str, Any]], removed_ids: Iterable[str] = ()):
+        with self._lock:
+            if not self.is_built:
+                return
+            for fund_id in removed_ids:
+                self._intervals.pop(fund_id, None)
+            for fund in updated_funds:
+                self._intervals.pop(fund['id'], None)
+                self._add(fund)
+            self._dirty = True
+
+    def _add(self, fund: Dict[str, Any]):
+        interval = parse_check_size(fund.get(self.field))
+        if interval is not None:
+            self._intervals[fund['id']] = interval
+
+    def _ensure_sorted(self):
+        if self._dirty:
+            self._sorted_entries = sorted((low, high, fund_id) for fund_id, (low, high) in self._intervals.items())
+            self._sorted_lows = [entry[0] for entry in self._sorted_entries]
+            self._dirty = False
+
+    def overlapping(self, interval: Tuple[float, float]) -> Set[str]:
+        """Ids of funds whose parsed interval overlaps the query interval"""
+        low, high = interval
+        with self._lock:
+            self._ensure_sorted()
+            end = bisect.bisect_right(self._sorted_lows, high)
+            return {fund_id for _, fund_high, fund_id in self._sorted_entries[:end] if fund_high >= low}
+
+    def parsed_ids(self) -> Set[str]:
+        with self._lock:
+            return set(self._intervals)
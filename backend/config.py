@@ -5,16 +5,125 @@ load_dotenv()
 
 class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # None uses the OpenAI API; benchmarks point this at a local stand-in
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 26214400))  # 25MB default
     ALLOWED_EXTENSIONS = {'pdf'}
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()  # DEBUG shows per-field/per-fund matching detail
+    
+    # Serving (per worker process; see gunicorn.conf.py)
+    MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', 8))  # in-flight heavy requests before 503s
+    BUSY_RETRY_AFTER = int(os.getenv('BUSY_RETRY_AFTER', 5))  # Retry-After seconds on a 503
+    WARM_UP_ON_START = os.getenv('WARM_UP_ON_START', 'true').lower() == 'true'  # load the fund snapshot at startup
+    
+    # Shared OpenAI client (one per process, used by deck parsing and fund matching)
+    OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', 64))  # pooled connections
+    OPENAI_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_KEEPALIVE_CONNECTIONS', 32))  # idle connections kept open
+    OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 30))  # seconds an idle connection is kept
+    OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', 'true').lower() == 'true'  # used when the h2 package is installed
+    OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 60))  # default seconds per request
+    LLM_CONCURRENCY_INITIAL = int(os.getenv('LLM_CONCURRENCY_INITIAL', 8))  # adaptive in-flight limit at start
+    LLM_CONCURRENCY_MIN = int(os.getenv('LLM_CONCURRENCY_MIN', 1))
+    LLM_CONCURRENCY_MAX = int(os.getenv('LLM_CONCURRENCY_MAX', 32))
+    LLM_LATENCY_TARGET = float(os.getenv('LLM_LATENCY_TARGET', 20))  # seconds; slower responses shrink the limit (0 disables)
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv('LLM_REQUESTS_PER_MINUTE', 0))  # process-wide budget, 0 = unlimited
+    LLM_TOKENS_PER_MINUTE = float(os.getenv('LLM_TOKENS_PER_MINUTE', 0))  # process-wide budget, 0 = unlimited
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 4))  # on 429, 408, 409, 5xx and connection errors
+    LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))  # seconds, doubled per attempt with full jitter
+    LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 20))  # seconds
+    # Fair-share scheduling of LLM tasks: relative share of the client's capacity per priority class
+    LLM_WEIGHT_INTERACTIVE = float(os.getenv('LLM_WEIGHT_INTERACTIVE', 8))  # uploads and analysis jobs
+    LLM_WEIGHT_BATCH = float(os.getenv('LLM_WEIGHT_BATCH', 2))  # bulk matching
+    LLM_WEIGHT_BACKGROUND = float(os.getenv('LLM_WEIGHT_BACKGROUND', 1))  # re-matching and other background work
+    
+    # Pitch deck page analysis
+    PAGE_ANALYSIS_CONCURRENCY = int(os.getenv('PAGE_ANALYSIS_CONCURRENCY', 5))  # parallel OpenAI requests per deck
+    PAGE_ANALYSIS_TIMEOUT = float(os.getenv('PAGE_ANALYSIS_TIMEOUT', 60))  # seconds per page request
+    PAGE_EXTRACTION_MODE = os.getenv('PAGE_EXTRACTION_MODE', 'per_page')  # 'per_page' or 'packed'
+    PACKED_PAGE_TOKEN_BUDGET = int(os.getenv('PACKED_PAGE_TOKEN_BUDGET', 6000))  # page text tokens per packed request
+    PACKED_MAX_PAGES = int(os.getenv('PACKED_MAX_PAGES', 10))  # pages per packed request
+    PAGE_TRIAGE_ENABLED = os.getenv('PAGE_TRIAGE_ENABLED', 'true').lower() == 'true'  # skip low-information pages
+    PAGE_TRIAGE_MIN_WORDS = int(os.getenv('PAGE_TRIAGE_MIN_WORDS', 40))  # signal-free pages shorter than this are skipped
+    
+    # Prompt construction (see prompts.py)
+    PROMPT_MODE = os.getenv('PROMPT_MODE', 'full')  # 'full' (original prompts) or 'compact' (shared cacheable prefix, budgeted page text)
+    PAGE_TEXT_TOKEN_BUDGET = int(os.getenv('PAGE_TEXT_TOKEN_BUDGET', 1500))  # compact mode: max page text tokens per page (0 = no limit)
+    TOKENIZER_ENCODING = os.getenv('TOKENIZER_ENCODING', 'o200k_base')  # tiktoken encoding for local token counts, when installed
+    
+    # SQLite files (caches, fund store) are shared by every worker process
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 10))  # seconds to wait for another writer's lock
+    
+    # Page analysis cache (keyed on normalized page text)
+    PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH', os.path.join('data', 'page_cache.sqlite3'))
+    PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', 5000))  # in-process LRU entries
+    PAGE_CACHE_DISK_SIZE = int(os.getenv('PAGE_CACHE_DISK_SIZE', 200000))
+    PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', 30 * 86400))  # seconds, 0 never expires
+    
+    # PDF text extraction process pool (0 workers keeps extraction on the request thread)
+    PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', 0))
+    PDF_PROCESS_POOL_MIN_PAGES = int(os.getenv('PDF_PROCESS_POOL_MIN_PAGES', 8))  # smaller decks stay inline
+    PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 4))
+    PDF_EXTRACTION_PAGE_TIMEOUT = int(os.getenv('PDF_EXTRACTION_PAGE_TIMEOUT', 20))  # seconds before PyPDF2 fallback
+    PDF_EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv('PDF_EXTRACTION_MEMORY_LIMIT_MB', 1024))  # per worker, 0 disables
+    PDF_EXTRACTION_TASKS_PER_CHILD = int(os.getenv('PDF_EXTRACTION_TASKS_PER_CHILD', 100))  # recycle workers
+    
+    # Background deck analysis jobs
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # decks analyzed at the same time
+    JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', 20))  # queued + running jobs before new ones are refused
+    JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', 3600))  # finished jobs kept for polling
+    JOB_EVENTS_HEARTBEAT = int(os.getenv('JOB_EVENTS_HEARTBEAT', 15))  # seconds between SSE keep-alive comments
+    JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', os.path.join('data', 'jobs.sqlite3'))  # shared by all workers
+    JOB_STORE_POLL_INTERVAL = float(os.getenv('JOB_STORE_POLL_INTERVAL', 0.5))  # seconds, streams of another worker's job
+    MAX_EVENT_STREAMS = int(os.getenv('MAX_EVENT_STREAMS', 16))  # open SSE streams per worker before 503s
     
     # Airtable configuration
     AIRTABLE_API_KEY = os.getenv('AIRTABLE_API_KEY')
     AIRTABLE_BASE_ID = os.getenv('AIRTABLE_BASE_ID', 'appZCSJhvllkpX1gV')
     AIRTABLE_TABLE_NAME = os.getenv('AIRTABLE_TABLE_NAME', 'Fund')
+    AIRTABLE_ENDPOINT_URL = os.getenv('AIRTABLE_ENDPOINT_URL', 'https://api.airtable.com')
+    
+    # Record/replay transport under the OpenAI and Airtable clients
+    HTTP_TRANSPORT_MODE = os.getenv('HTTP_TRANSPORT_MODE', 'passthrough')  # 'passthrough', 'record' or 'replay'
+    HTTP_CASSETTE_PATH = os.getenv('HTTP_CASSETTE_PATH', os.path.join('data', 'cassettes.sqlite3'))
+    HTTP_REPLAY_LATENCY = os.getenv('HTTP_REPLAY_LATENCY', 'recorded')  # 'recorded' or fixed seconds per response
+    HTTP_REPLAY_LATENCY_SCALE = float(os.getenv('HTTP_REPLAY_LATENCY_SCALE', 1.0))  # multiplies recorded latency
+    
+    # Content-addressed cache of parsed deck results (keyed on the upload's SHA-256)
+    DECK_CACHE_PATH = os.getenv('DECK_CACHE_PATH', os.path.join('data', 'deck_cache.sqlite3'))
+    DECK_CACHE_SIZE = int(os.getenv('DECK_CACHE_SIZE', 500))  # in-process LRU entries
+    DECK_CACHE_DISK_SIZE = int(os.getenv('DECK_CACHE_DISK_SIZE', 20000))
+    DECK_CACHE_TTL = int(os.getenv('DECK_CACHE_TTL', 30 * 86400))  # seconds, 0 never expires
+    
+    # Local fund store configuration
+    FUND_STORE_PATH = os.getenv('FUND_STORE_PATH', os.path.join('data', 'funds.sqlite3'))
+    FUND_SYNC_INTERVAL = int(os.getenv('FUND_SYNC_INTERVAL', 300))  # seconds, 0 disables background sync
+    FUND_FULL_SYNC_INTERVAL = int(os.getenv('FUND_FULL_SYNC_INTERVAL', 86400))  # full resync drops deleted records
+    
+    # Semantic comparison verdict cache
+    SEMANTIC_CACHE_PATH = os.getenv('SEMANTIC_CACHE_PATH', os.path.join('data', 'semantic_cache.sqlite3'))
+    SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', 50000))  # in-process LRU entries
+    SEMANTIC_CACHE_DISK_SIZE = int(os.getenv('SEMANTIC_CACHE_DISK_SIZE', 1000000))
+    SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', 30 * 86400))  # seconds, 0 never expires
+    SEMANTIC_BATCH_SIZE = int(os.getenv('SEMANTIC_BATCH_SIZE', 50))  # distinct fund values per batched AI request
+    # Field values containing any of these (case-insensitive) are treated as missing, for pitch and fund fields alike
+    POOR_QUALITY_INDICATORS = [
+        indicator.strip() for indicator in os.getenv(
+            'POOR_QUALITY_INDICATORS',
+            'not identified,unknown,not available,no reliable,not a fit,n/a,tbd,stage agnostic,no themes found'
+        ).split(',') if indicator.strip()
+    ]
+    MATCH_CHUNK_SIZE = int(os.getenv('MATCH_CHUNK_SIZE', 50))  # funds per first top-N chunk, doubling after each short chunk
+    
+    # Bulk matching of pre-extracted pitch profiles (API and bulk_matching.py CLI)
+    BULK_MATCH_WORKERS = int(os.getenv('BULK_MATCH_WORKERS', 4))  # profiles matched in parallel
+    BULK_MATCH_MAX_WORKERS = int(os.getenv('BULK_MATCH_MAX_WORKERS', 16))  # cap on the API's workers parameter
+    BULK_MATCH_TOP_N = int(os.getenv('BULK_MATCH_TOP_N', 10))
     
     @staticmethod
     def init_app(app):
         # Create upload directory if it doesn't exist
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+        # Create local fund store directory if it doesn't exist
+        fund_store_dir = os.path.dirname(Config.FUND_STORE_PATH)
+        if fund_store_dir:
+            os.makedirs(fund_store_dir, exist_ok=True)
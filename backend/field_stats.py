@@ -0,0 +1,65 @@
+"""
+Field Selectivity Statistics
+Observed rejection rates per pitch field, shared across requests, used to
+decide which field's expensive AI check should run first
+"""
+
+import threading
+from typing import Dict, Any
+
+# Assumed rejection rate for a field that has not been observed yet
+DEFAULT_REJECTION_RATE = 0.5
+
+# Floor so a field that never rejects still gets a finite ordering key
+MIN_REJECTION_RATE = 0.01
+
+
+class FieldSelectivityStats:
+    """
+    Counts, per field, how many funds were checked and how many were rejected.
+    Counts are halved once a field passes `max_observations`, so the rates
+    follow drift in the fund table and in what decks look like.
+    """
+
+    def __init__(self, max_observations: int = 10000):
+        self.max_observations = max_observations
+        self._lock = threading.Lock()
+        self._checked: Dict[str, float] = {}
+        self._rejected: Dict[str, float] = {}
+
+    def record(self, field: str, checked: int, rejected: int):
+        if checked <= 0:
+            return
+        with self._lock:
+            total_checked = self._checked.get(field, 0.0) + checked
+            total_rejected = self._rejected.get(field, 0.0) + rejected
+            if total_checked > self.max_observations:
+                total_checked /= 2
+                total_rejected /= 2
+            self._checked[field] = total_checked
+            self._rejected[field] = total_rejected
+
+    def rejection_rate(self, field: str) -> float:
+        with self._lock:
+            checked = self._checked.get(field, 0.0)
+            if not checked:
+                return DEFAULT_REJECTION_RATE
+            return max(self._rejected[field] / checked, MIN_REJECTION_RATE)
+
+    def evaluation_key(self, field: str, cost: float) -> float:
+        """
+        Ordering key for running independent filters: cost per expected rejection.
+        The field with the smallest key removes the most funds per unit of work.
+        """
+        return cost / self.rejection_rate(field)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                field: {
+                    'checked': round(self._checked[field]),
+                    'rejected': round(self._rejected[field]),
+                    'rejection_rate': round(self._rejected[field] / self._checked[field], 4),
+                }
+                for field in self._checked
+            }
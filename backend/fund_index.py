@@ -0,0 +1,100 @@
+"""
+Fund Token Index
+Inverted index from normalized word tokens to fund ids for the literal-match tier
+"""
+
+import re
+import threading
+from typing import Dict, List, Any, Iterable, Optional, Set
+
+# Fields that take part in literal matching
+INDEXED_FIELDS = ['stage', 'sector', 'investment_theme', 'location', 'lead', 'check_size']
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize_field(value: Any) -> str:
+    """Same normalization the literal tier has always used"""
+    return str(value).lower().strip()
+
+
+class FundTokenIndex:
+    """
+    Maps each word token of each indexed field to the ids of funds containing it.
+
+    A pitch value resolves to candidate funds by intersecting the postings of its
+    tokens (phrases included); candidates are then confirmed with the same
+    word-boundary regex the literal tier uses, so results are identical to a
+    full scan.
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None):
+        self.fields = fields or INDEXED_FIELDS
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.fields}
+        self._values: Dict[str, Dict[str, str]] = {field: {} for field in self.fields}
+        self.is_built = False
+
+    def build(self, funds: Iterable[Dict[str, Any]]):
+        """Rebuild the index from scratch"""
+        with self._lock:
+            self._postings = {field: {} for field in self.fields}
+            self._values = {field: {} for field in self.fields}
+            for fund in funds:
+                self._add(fund)
+            self.is_built = True
+
+    def update(self, updated_funds: Iterable[Dict[str, Any]], removed_ids: Iterable[str] = ()):
+        """Apply a fund store sync: re-index changed funds and drop removed ones"""
+        with self._lock:
+            if not self.is_built:
+                return
+            for fund_id in removed_ids:
+                self._remove(fund_id)
+            for fund in updated_funds:
+                self._remove(fund['id'])
+                self._add(fund)
+
+    def _add(self, fund: Dict[str, Any]):
+        fund_id = fund['id']
+        for field in self.fields:
+            value = normalize_field(fund.get(field))
+            self._values[field][fund_id] = value
+            postings = self._postings[field]
+            for token in set(TOKEN_PATTERN.findall(value)):
+                postings.setdefault(token, set()).add(fund_id)
+
+    def _remove(self, fund_id: str):
+        for field in self.fields:
+            value = self._values[field].pop(fund_id, None)
+            if value is None:
+                continue
+            postings = self._postings[field]
+            for token in set(TOKEN_PATTERN.findall(value)):
+                fund_ids = postings.get(token)
+                if fund_ids is not None:
+                    fund_ids.discard(fund_id)
+                    if not fund_ids:
+                        del postings[token]
+
+    def literal_matches(self, field: str, pitch_value: Any) -> Set[str]:
+        """Ids of funds whose field literally matches the pitch value"""
+        pitch_str = normalize_field(pitch_value)
+        # Use word boundary matching to avoid partial matches like 'us' in 'must'
+        pattern = re.compile(r'\b' + re.escape(pitch_str) + r'\b')
+
+        with self._lock:
+            values = self._values[field]
+            tokens = set(TOKEN_PATTERN.findall(pitch_str))
+            if tokens:
+                postings = self._postings[field]
+                token_sets = sorted((postings.get(token, set()) for token in tokens), key=len)
+                candidates = set.intersection(*token_sets) if token_sets[0] else set()
+            else:
+                # No word tokens to look up (e.g. punctuation only): scan
+                candidates = values.keys()
+
+            return {
+                fund_id for fund_id in candidates
+                if pattern.search(values[fund_id]) or pitch_str == values[fund_id]
+            }
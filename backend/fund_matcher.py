@@ -3,19 +3,33 @@ Fund Matching Engine
 Compares analyzed pitch deck data with Airtable fund database
 """
 
-import os
 from pyairtable import Api
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
 import re
-from difflib import SequenceMatcher
 from config import Config
+from fund_store import FundStore
+from cache import TwoLevelCache, make_cache_key
+from fund_index import FundTokenIndex
+from check_size import CheckSizeIndex, parse_check_size
+from geo import GeoResolver, GeoIndex
+from field_stats import FieldSelectivityStats
+from fund_snapshot import FundSnapshot, CONFIDENCE_MAPPING, FIELD_WEIGHTS
+from poor_quality import find_poor_quality_indicator, is_poor_quality
+import threading
+import logging
+import numpy as np
+from metrics import LLM_RETRIES, timed
+from transport import install_airtable_transport
+from llm_client import LLMUnavailableError, get_llm_client
+from llm_scheduler import get_llm_scheduler
+import prompts
 import time
-from functools import lru_cache
-import hashlib
 import json
-import openai
-from openai import OpenAI
-import re
+
+logger = logging.getLogger(__name__)
+
+# Bump when the semantic comparison prompt changes so cached verdicts are not reused
+SEMANTIC_PROMPT_VERSION = 'v1'
 
 class FundMatcher:
     """
@@ -26,132 +40,205 @@ class FundMatcher:
         """Initialize the fund matcher with Airtable API and OpenAI"""
         self.api = None
         self.table = None
+        self.fund_store = None
+        self.fund_index = FundTokenIndex()
+        self.check_size_index = CheckSizeIndex()
+        self.geo_index = GeoIndex(GeoResolver())
+        # Rejection rates per field, per tier, kept across requests to order field checks
+        self.local_field_stats = FieldSelectivityStats()
+        self.ai_field_stats = FieldSelectivityStats()
+        # Columnar view of the fund store, rebuilt when the store's version changes
+        self._fund_snapshot: Optional[FundSnapshot] = None
+        self._snapshot_lock = threading.Lock()
         self.openai_client = None
+        self.semantic_cache = TwoLevelCache(
+            'semantic_verdicts',
+            db_path=Config.SEMANTIC_CACHE_PATH,
+            max_entries=Config.SEMANTIC_CACHE_SIZE,
+            ttl=Config.SEMANTIC_CACHE_TTL,
+            max_disk_entries=Config.SEMANTIC_CACHE_DISK_SIZE,
+        )
         # Initialize Airtable
         if Config.AIRTABLE_API_KEY:
             try:
-                self.api = Api(Config.AIRTABLE_API_KEY)
+                self.api = Api(Config.AIRTABLE_API_KEY, endpoint_url=Config.AIRTABLE_ENDPOINT_URL)
+                install_airtable_transport(self.api)
                 self.table = self.api.table(Config.AIRTABLE_BASE_ID, Config.AIRTABLE_TABLE_NAME)
-                print("✅ Airtable connection established")
+                self.fund_store = FundStore(self.table)
+                self.fund_store.add_listener(self.fund_index.update)
+                self.fund_store.add_listener(self.check_size_index.update)
+                self.fund_store.add_listener(self.geo_index.update)
+                logger.info("✅ Airtable connection established")
             except Exception as e:
-                print(f"❌ Failed to connect to Airtable: {e}")
+                logger.error("❌ Failed to connect to Airtable: %s", e)
         else:
-            print("⚠️ AIRTABLE_API_KEY not found in environment variables")
+            logger.warning("⚠️ AIRTABLE_API_KEY not found in environment variables")
         
         # Initialize OpenAI
         if Config.OPENAI_API_KEY:
             try:
-                self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
-                print("✅ OpenAI client initialized for semantic matching")
+                self.openai_client = get_llm_client()
+                logger.info("✅ OpenAI client initialized for semantic matching")
             except Exception as e:
-                print(f"❌ Failed to initialize OpenAI: {e}")
+                logger.error("❌ Failed to initialize OpenAI: %s", e)
         else:
-            print("⚠️ OPENAI_API_KEY not found - semantic matching will be limited")
+            logger.warning("⚠️ OPENAI_API_KEY not found - semantic matching will be limited")
     
     
-    def get_all_funds_with_smart_filtering(self, pitch_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def get_all_funds_with_smart_filtering(self, pitch_data: Dict[str, Any], top_n: Optional[int] = None,
+                                           progress: Optional[Callable[..., None]] = None,
+                                           snapshot: Optional[FundSnapshot] = None) -> List[Dict[str, Any]]:
         """
         Search through ALL fund records using only AI for comparison
         Filters out poor quality fund fields before AI analysis
+        top_n: stop comparing once this many best-scored funds are confirmed (None evaluates all)
+        progress: optional callback receiving funds_total / funds_evaluated updates
+        snapshot: fund snapshot to match against (bulk runs share one); loaded from the store when omitted
         """
         try:
-            if not self.table:
-                print("❌ No Airtable table connection available")
+            if not self.fund_store:
+                logger.error("❌ No Airtable table connection available")
                 return []
             
-            print(f"🔍 Searching through ALL fund records using AI-only comparison...")
+            logger.info("🔍 Searching through ALL fund records using AI-only comparison...")
             
             # Step 1: Filter out poor quality fields from pitch deck data
-            print("🧹 Step 1: Filtering poor quality fields from pitch deck data...")
+            logger.info("🧹 Step 1: Filtering poor quality fields from pitch deck data...")
             filtered_pitch_data = self._filter_poor_quality_fields_from_pitch_data(pitch_data)
-            print(f"✅ Processed pitch deck data with quality field filtering")
-            print(f"🔍 Filtered pitch data: {filtered_pitch_data}")
+            logger.info("✅ Processed pitch deck data with quality field filtering")
+            logger.debug("🔍 Filtered pitch data: %s", filtered_pitch_data)
 
-            # Step 2: Get ALL records from Airtable (in batches to avoid timeouts)
-            all_funds = self._fetch_all_funds_in_batches()
+            # Step 2: Get ALL records from the local fund store (as a columnar snapshot)
+            if snapshot is None:
+                snapshot = self._get_fund_snapshot()
             
-            if not all_funds:
-                print("❌ No funds found in database")
+            if snapshot is None or not len(snapshot):
+                logger.error("❌ No funds found in database")
                 return []
             
-            print(f"📊 Retrieved {len(all_funds)} total funds from database")
+            logger.info("📊 Retrieved %s total funds from database", len(snapshot))
+            funds_total = len(snapshot)
+            if progress:
+                progress(stage='matching_funds', funds_total=funds_total, funds_evaluated=0)
+            
+            with timed('filtering'):
+                # Form continent/country selections are a hard geographic prefilter
+                keep = self._apply_geo_prefilter(snapshot, pitch_data.get('form_data') or {})
 
-            # Step 3: Filter out fund records with poor quality data in relevant fields
-            print("🧹 Step 3: Filtering fund records with poor quality data...")
-            smart_funds = self._filter_poor_quality_fields_from_funds(all_funds, filtered_pitch_data)
-            print(f"✅ Processed fund records with quality field filtering")
-            print(f"🔍 Filtered pitch data: length {len(smart_funds)}")
+                # Step 3: Filter out fund records with poor quality data in relevant fields
+                logger.info("🧹 Step 3: Filtering fund records with poor quality data...")
+                keep &= snapshot.quality_mask(filtered_pitch_data.keys())
+                logger.info("📊 Smart filtering result: %s/%s funds kept", int(keep.sum()), len(snapshot))
+            
+            # Confidence rates depend only on the fund's own columns: score every fund at once
+            with timed('scoring'):
+                scores = snapshot.confidence_scores(filtered_pitch_data.keys())
+                ranked = snapshot.ranked_positions(keep, scores)
+                smart_funds = [snapshot.records[position] for position in ranked]
 
             # Step 4: Compare pitch data with smart fund records
-            matched_funds = self._filter_matched_funds(filtered_pitch_data, smart_funds)
+            # A fund counts as evaluated once it is eliminated or all fields have been compared
+            field_progress = None
+            if progress:
+                field_progress = lambda funds_remaining: progress(funds_evaluated=funds_total - funds_remaining)
+                field_progress(len(smart_funds))
+            with timed('matching'):
+                matched_funds = self._filter_matched_funds(
+                    filtered_pitch_data, smart_funds, progress=field_progress, top_n=top_n,
+                    confidence_rates=scores[ranked].tolist(), snapshot=snapshot
+                )
+            if progress:
+                progress(funds_evaluated=funds_total)
             
-            print(f"✅ Smart filtering complete: {len(matched_funds)} fully matched funds found")
-            print (matched_funds, 'matched_funds=--------------------')
+            logger.info("✅ Smart filtering complete: %s fully matched funds found", len(matched_funds))
+            logger.debug("📊 Semantic cache: %s", self.get_cache_stats())
+            logger.debug("matched_funds: %s", matched_funds)
             return matched_funds
-            
+
+        except LLMUnavailableError:
+            # Surface to the caller: an empty list would read as "no funds match"
+            raise
         except Exception as e:
-            print(f"❌ Error in AI-only search: {e}")
+            logger.error("❌ Error in AI-only search: %s", e)
             return []
     
-    def _fetch_all_funds_in_batches(self) -> List[Dict[str, Any]]:
+    def _get_fund_snapshot(self) -> Optional[FundSnapshot]:
         """
-        Fetch ALL funds from Airtable in batches to avoid timeouts
+        Columnar snapshot of ALL funds in the local fund store (synced from Airtable on demand).
+        Built once per store version; the lookup indexes are built on first use.
         """
-        all_funds = []
-        batch_size = 100
-        
         try:
-            print("🔄 Fetching all records in batches...")
-            
-            # Use pagination to get all records
-            for records in self.table.iterate(page_size=batch_size):
-                batch_funds = []
-                for record in records:
-                    fields = record.get('fields', {})
-                    fund_data = {
-                        'id': record.get('id'),
-                        'website': fields.get('website', ''),
-                        'email': fields.get('Email', ''),
-                        'stage': fields.get('stage', ''),
-                        'sector': fields.get('sector', ''),
-                        'location': fields.get('location', ''),
-                        'check_size': fields.get('check size', ''),
-                        'lead': fields.get('lead', ''),
-                        'investment_theme': fields.get('investment theme', ''),
-                        'stage_confidence': fields.get('stage confidence', ''),
-                        'check_size_confidence': fields.get('check size confidence', ''),
-                        'investment_theme_confidence': fields.get('investment theme confidence', ''),
-                        'location_confidence': fields.get('location confidence', ''),
-                        'lead_confidence': fields.get('lead confidence', ''),
-                        'sector_confidence': fields.get('sector confidence', ''),
-                    }
-                    batch_funds.append(fund_data)
-                
-                all_funds.extend(batch_funds)
-                print(f"📊 Fetched {len(all_funds)} records so far...")
+            with timed('fund_load'):
+                version, all_funds = self.fund_store.get_versioned_funds()
+                if not self.fund_index.is_built:
+                    self.fund_index.build(all_funds)
+                if not self.check_size_index.is_built:
+                    self.check_size_index.build(all_funds)
+                if not self.geo_index.is_built:
+                    self.geo_index.build(all_funds)
                 
-                # Optional: Limit total for testing (remove in production)
-                if len(all_funds) >= 100:  # Limit for testing
-                    print("⚠️ Limited to 5000 records for testing")
-                    break
-            
-            return all_funds
+                with self._snapshot_lock:
+                    if self._fund_snapshot is None or self._fund_snapshot.version != version:
+                        started = time.time()
+                        self._fund_snapshot = FundSnapshot(all_funds, version, self._is_poor_quality_value)
+                        logger.info("📊 Built fund snapshot v%s: %s records in %.2fs", version, len(all_funds), time.time() - started)
+                    return self._fund_snapshot
             
         except Exception as e:
-            print(f"❌ Error fetching all records: {e}")
-            return []
+            logger.error("❌ Error fetching all records: %s", e)
+            return None
+    
+    def sync_funds(self, full: bool = False) -> Dict[str, Any]:
+        """Sync the local fund store with Airtable on demand"""
+        if not self.fund_store:
+            raise RuntimeError("No Airtable table connection available")
+        return self.fund_store.sync(full=full)
+    
+    def start_background_sync(self):
+        """Keep the local fund store current on a background schedule"""
+        if self.fund_store:
+            self.fund_store.start_background_sync()
+    
+    def stop_background_sync(self):
+        if self.fund_store:
+            self.fund_store.stop_background_sync()
+    
+    def snapshot(self) -> Optional[FundSnapshot]:
+        """The current fund snapshot (built on demand), for callers that match many pitches against one version"""
+        return self._get_fund_snapshot()
+    
+    def warm_up(self) -> bool:
+        """Load the fund snapshot ahead of the first request; True when funds are available"""
+        return self._get_fund_snapshot() is not None
+    
+    def is_ready(self) -> bool:
+        """True once a fund snapshot has been built, so matching will not block on a sync"""
+        return self._fund_snapshot is not None
+    
+    def _apply_geo_prefilter(self, snapshot: FundSnapshot, form_data: Dict[str, Any]) -> np.ndarray:
+        """
+        Mask of funds whose location overlaps the continents/countries selected in the form.
+        Funds whose location cannot be resolved offline are kept for the regular matching tiers.
+        """
+        keep = snapshot.all_mask()
+        selections = list(form_data.get('continents') or []) + list(form_data.get('countries') or [])
+        if not selections or not self.geo_index.is_built:
+            return keep
+        
+        selected_nodes = self.geo_index.resolve_selections(selections)
+        if not selected_nodes:
+            logger.warning("⚠️ Could not resolve form locations %s, skipping geo prefilter", selections)
+            return keep
+        
+        keep = snapshot.mask_of(self.geo_index.matching(selected_nodes)) | ~snapshot.mask_of(self.geo_index.resolved_ids())
+        logger.info("🌍 Geo prefilter %s: %s/%s funds kept", selections, int(keep.sum()), len(snapshot))
+        return keep
     
     def _filter_poor_quality_fields_from_pitch_data(self, pitch_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Filter out poor quality field values from the pitch deck data
         Returns pitch deck data with only high-quality field values for AI comparison
         """
-        poor_quality_indicators = [
-            'not identified', 'unknown', 'not available', 'no reliable', 
-            'not a fit', 'location unknown', 'stage unknown', 'sector unknown',
-            'n/a', 'tbd', '', None, 
-        ]
-        
         cleaned_pitch_data = {
             'stage': pitch_data.get('stage', ''),
             'sector': pitch_data.get('sector', ''),
@@ -161,236 +248,338 @@ class FundMatcher:
             'check_size': pitch_data.get('check_size', ''),
         }
         
-        # Create a copy to iterate over while modifying the original
-        fields_to_check = list(cleaned_pitch_data.items())
-        for field, value in fields_to_check:
-            if value:
-                value_str = str(value).lower().strip()
-                # Check if any poor quality indicator is found in the value
-                found_indicator = None
-                for indicator in poor_quality_indicators:
-                    if indicator in value_str:
-                        found_indicator = indicator
-                        break
-                
-                if found_indicator:
-                    # Completely remove the field from the dictionary
-                    del cleaned_pitch_data[field]
-            else:
-                # Remove empty fields from dictionary
-                del cleaned_pitch_data[field]
-        return cleaned_pitch_data
+        # Remove empty fields and fields holding a poor quality indicator
+        return {
+            field: value for field, value in cleaned_pitch_data.items()
+            if value and find_poor_quality_indicator(value) is None
+        }
     
-    def _filter_poor_quality_fields_from_funds(self, all_funds: List[Dict[str, Any]], pitch_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """
-        Filter out fund records that have poor quality data in fields that exist in pitch data
-        Returns smart clean funds records
-        """
+    def _is_poor_quality_value(self, value: Any) -> bool:
+        """Check if a field value is poor quality (same indicator set as the pitch deck filter)"""
+        return is_poor_quality(value)
+    
+    @staticmethod
+    def _normalize_value(value: Any) -> str:
+        """Normalize a field value for cache keys: lowercase, trimmed, single-spaced"""
+        return ' '.join(str(value).lower().split())
+    
+    def _semantic_cache_key(self, pitch_value: str, fund_value: str, field_name: str) -> str:
+        return make_cache_key(
+            SEMANTIC_PROMPT_VERSION,
+            *prompts.prompt_cache_parts(page_text=False),
+            field_name,
+            self._normalize_value(pitch_value),
+            self._normalize_value(fund_value),
+        )
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the semantic verdict cache"""
+        return self.semantic_cache.stats()
+    
+    def _compare_fields_with_ai(self, pitch_value: str, fund_value: str, field_name: str) -> bool:
+        """Compare two field values using AI semantic matching (verdicts are cached)"""
+        cache_key = self._semantic_cache_key(pitch_value, fund_value, field_name)
+        cached = self.semantic_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        smart_funds = []
+        if not self.openai_client:
+            return False
         
-        print(f"🔍 Checking {len(all_funds)} fund records against pitch data fields: {list(pitch_data.keys())}")
+        # A throttled or failing API raises LLMUnavailableError (after retries) rather than
+        # reading as NO_MATCH, which would silently drop funds from the results
+        response = self.openai_client.complete(
+            'semantic',
+            model="gpt-4o-mini",
+            messages=prompts.semantic_messages(field_name, pitch_value, fund_value),
+            max_tokens=10,
+            temperature=0
+        )
         
-        for fund_idx, fund in enumerate(all_funds):
-            fund_name = fund.get('website', f'Fund_{fund_idx}')  # Use website as identifier since no 'name' field
-            should_keep_fund = True
-            poor_fields = []
-            
-            # Check each field that exists in pitch data
-            for pitch_field_name, pitch_field_value in pitch_data.items():
-                # Check if fund has this field and if it has poor quality data
-                if pitch_field_name in fund and fund[pitch_field_name]:
-                    fund_field_value = fund[pitch_field_name]
-                    if self._is_poor_quality_value(fund_field_value):
-                        poor_fields.append(f"{pitch_field_name}: '{fund_field_value}'")
-                        should_keep_fund = False
-                        print(f"  ❌ Poor quality field found in '{fund_name}': {pitch_field_name} = '{fund_field_value}'")
-                        break  # One poor field is enough to reject the fund
-            
-            # Only add fund if ALL relevant fields have good quality data
-            if should_keep_fund:
-                smart_funds.append(fund)
+        result = (response.choices[0].message.content or '').strip().upper()
+        verdict = result == "MATCH"
+        self.semantic_cache.set(cache_key, verdict)
+        return verdict
+    
+    def _compare_field_values_batch_with_ai(self, pitch_value: str, fund_values: List[str], field_name: str) -> Dict[str, bool]:
+        """
+        Compare one pitch value against many distinct fund values using batched AI requests.
+        Returns a verdict table keyed on the normalized fund value (verdicts are cached).
+        """
+        verdicts = {}
+        pending = []
+        for fund_value in fund_values:
+            normalized = self._normalize_value(fund_value)
+            if normalized in verdicts:
+                continue
+            cached = self.semantic_cache.get(self._semantic_cache_key(pitch_value, fund_value, field_name))
+            if cached is not None:
+                verdicts[normalized] = cached
+            else:
+                verdicts[normalized] = False
+                pending.append(fund_value)
         
-        print(f"📊 Smart filtering result: {len(smart_funds)}/{len(all_funds)} funds kept")
-        return smart_funds
+        if not pending or not self.openai_client:
+            return verdicts
         
-    def _is_poor_quality_value(self, value: Any) -> bool:
-        """Check if a field value is poor quality"""
-        if not value:
-            return True
+        # Each batch is one task on the shared LLM scheduler, so a large match run shares the
+        # API fairly with the other requests in this process
+        batch_size = max(1, Config.SEMANTIC_BATCH_SIZE)
+        scheduler = get_llm_scheduler()
+        futures = [
+            scheduler.submit(self._compare_batch_with_ai, pitch_value, pending[start:start + batch_size], field_name)
+            for start in range(0, len(pending), batch_size)
+        ]
+        for future in futures:
+            verdicts.update(future.result())
         
-        poor_quality_indicators = [
-            'not identified', 'unknown', 'not available', 'no reliable', 
-            'not a fit', 'location unknown', 'stage unknown', 'sector unknown',
-            'n/a', 'tbd', 'stage agnostic', 'no themes found',
-            'not available(no reliable check size data found).',
+        return verdicts
     
-        ]
+    def _compare_batch_with_ai(self, pitch_value: str, batch: List[str], field_name: str) -> Dict[str, bool]:
+        """One batched AI request (a single comparison for a one-value batch); verdicts keyed on the normalized fund value"""
+        if len(batch) == 1:
+            return {self._normalize_value(batch[0]): self._compare_fields_with_ai(pitch_value, batch[0], field_name)}
         
-        value_str = str(value).lower().strip()
+        # LLMUnavailableError propagates: single comparisons would hit the same throttled API
+        response = self.openai_client.complete(
+            'semantic_batch',
+            model="gpt-4o-mini",
+            messages=prompts.semantic_batch_messages(field_name, pitch_value, batch),
+            max_tokens=20 + 4 * len(batch),
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+        try:
+            content = response.choices[0].message.content.strip()
+            matches = {int(i) for i in json.loads(content).get('matches', [])}
+        except (AttributeError, TypeError, ValueError) as e:
+            LLM_RETRIES.inc(len(batch), purpose='semantic_batch')
+            logger.warning("⚠️ Batched AI comparison failed for %s, falling back to single comparisons: %s", field_name, e)
+            return {
+                self._normalize_value(fund_value): self._compare_fields_with_ai(pitch_value, fund_value, field_name)
+                for fund_value in batch
+            }
         
-        # Check if value contains any poor quality indicators (substring matching)
-        for indicator in poor_quality_indicators:
-            if indicator in value_str or value_str == '':
-                return True
+        verdicts = {}
+        for i, fund_value in enumerate(batch, 1):
+            verdict = i in matches
+            verdicts[self._normalize_value(fund_value)] = verdict
+            self.semantic_cache.set(self._semantic_cache_key(pitch_value, fund_value, field_name), verdict)
+        return verdicts
+    
+    @staticmethod
+    def _value_keys(pitch_field: str, funds: List[Dict[str, Any]], snapshot: Optional[FundSnapshot]) -> List[str]:
+        """Normalized values (see _normalize_value) of the funds' field, from the snapshot when it stores them"""
+        keys = snapshot.column(snapshot.value_keys, pitch_field, funds) if snapshot is not None else None
+        if keys is None:
+            keys = [FundMatcher._normalize_value(fund.get(pitch_field)) for fund in funds]
+        return keys
+    
+    def _literal_matches(self, pitch_field: str, pitch_value: Any, candidates: List[Dict[str, Any]],
+                         snapshot: Optional[FundSnapshot] = None) -> set:
+        """
+        Ids of candidate funds whose field literally contains the pitch value.
+        Uses the token index when it covers the field, otherwise scans the candidates
+        (reading the snapshot's normalized column when given).
+        """
+        if self.fund_index.is_built and pitch_field in self.fund_index.fields:
+            return self.fund_index.literal_matches(pitch_field, pitch_value)
         
-        return False
+        pitch_str = str(pitch_value).lower().strip()
+        # Use word boundary matching to avoid partial matches like 'us' in 'must'
+        pattern = re.compile(r'\b' + re.escape(pitch_str) + r'\b')
+        fund_strs = snapshot.column(snapshot.normalized, pitch_field, candidates) if snapshot is not None else None
+        if fund_strs is None:
+            fund_strs = [str(fund.get(pitch_field)).lower().strip() for fund in candidates]
+        literal_ids = set()
+        for fund, fund_str in zip(candidates, fund_strs):
+            if pattern.search(fund_str) or pitch_str == fund_str:
+                literal_ids.add(fund['id'])
+        return literal_ids
     
-    def _compare_fields_with_ai(self, pitch_value: str, fund_value: str, field_name: str) -> bool:
-        """Compare two field values using AI semantic matching"""
-        if not self.openai_client:
-            return False
+    def _parsed_matches(self, pitch_field: str, pitch_value: Any) -> Optional[Tuple[Set[str], Set[str]]]:
+        """
+        Resolve a field with a local parser instead of the AI tier.
+        Returns (matching fund ids, fund ids the parser could decide), or None if the
+        field has no parser or the pitch value cannot be (fully) parsed.
+        """
+        if pitch_field == 'check_size' and self.check_size_index.is_built:
+            pitch_interval = parse_check_size(pitch_value)
+            if pitch_interval is None:
+                return None
+            return self.check_size_index.overlapping(pitch_interval), self.check_size_index.parsed_ids()
+        if pitch_field == 'location' and self.geo_index.is_built:
+            pitch_nodes = self.geo_index.resolver.resolve(str(pitch_value))
+            if not pitch_nodes or not self.geo_index.resolver.resolves_fully(str(pitch_value)):
+                return None
+            return self.geo_index.matching(pitch_nodes), self.geo_index.resolved_ids()
+        return None
+    
+    def _filter_matched_funds(self, filtered_pitch_data: Dict[str, Any], all_funds: List[Dict[str, Any]],
+                              progress: Optional[Callable[[int], None]] = None,
+                              top_n: Optional[int] = None,
+                              confidence_rates: Optional[List[float]] = None,
+                              snapshot: Optional[FundSnapshot] = None) -> List[Dict[str, Any]]:
+        """
+        Compare pitch data with fund records field by field,
+        Uses literal matching first, then local parsers, then batched AI matching over the distinct fund values left
+        Only includes funds where ALL compared fields match
+
+        A fund's confidence rate depends only on its own *_confidence columns, so it is known
+        before any comparison runs. Funds are evaluated in descending-score chunks and, when
+        top_n is given, evaluation stops once top_n funds are confirmed: no later fund can rank higher.
+        confidence_rates: precomputed rates aligned with all_funds (computed per fund when omitted)
+        snapshot: the snapshot all_funds came from; its normalized columns replace per-fund normalization
+        progress: optional callback called with the number of funds not yet ruled in or out
+        """
+        logger.info("🔍 Comparing pitch data fields: %s", list(filtered_pitch_data.keys()))
+        logger.info("📊 Processing %s fund records...", len(all_funds))
         
-        try:
-            prompt = f"""
-            Compare these two {field_name} values and determine if they are semantically similar or related:
-            
-            Pitch deck {field_name}: "{pitch_value}"
-            Fund {field_name}: "{fund_value}"
-            
-            Consider these specific matching rules:
-            
-            For LOCATION fields:
-            - "Global" matches ANY location (US, Europe, Asia, etc.)
-            - "Worldwide" matches ANY location
-            - "International" matches ANY location
-            - Geographic regions can match specific countries within them
-            - Country codes (US, UK) match full country names (United States, United Kingdom)
-            
-            For STAGE fields:
-            - "Early stage" includes: seed, pre-seed, series-a
-            - "Late stage" includes: series-b, series-c, series-d, growth
-            - "Growth" matches "expansion" or "scale-up"
-            - Specific stages can match broader categories that contain them
-            
-            For SECTOR fields:
-            - Related industries (fintech matches financial services)
-            - Technology subcategories (AI matches machine learning, artificial intelligence)
-            - Broader categories include specific ones (healthcare includes medtech, biotech)
-            
-            For CHECK_SIZE fields:
-            - Overlapping ranges are matches (1-5M matches 2-10M)
-            - Different formats of same amount ($1M matches $1,000,000)
-            
-            Also consider:
-            - Synonyms and related terms
-            - Industry standard terminology
-            - Abbreviations and full forms
+        if not filtered_pitch_data:
+            logger.warning("⚠️ No fields to compare (all poor quality)")
+            return []
+        
+        if confidence_rates is None:
+            confidence_rates = [self._calculate_confidence_rate(fund, filtered_pitch_data, verbose=False) for fund in all_funds]
+        # Stable sort: equal scores keep database order, exactly as the full sort of all matches would
+        scored_funds = sorted(zip(confidence_rates, all_funds), key=lambda item: item[0], reverse=True)
+        
+        matched_funds = []
+        position = 0
+        chunk_size = max(Config.MATCH_CHUNK_SIZE, top_n or 0, 1)
+        while position < len(scored_funds):
+            if top_n is not None and len(matched_funds) >= top_n:
+                logger.info("⏹️ Top %s confirmed, skipping %s lower-scored funds", top_n, len(scored_funds) - position)
+                break
             
-            Respond with only "MATCH" or "NO_MATCH"
-            """
+            chunk = scored_funds[position:position + chunk_size]
+            position += len(chunk)
+            unevaluated = len(scored_funds) - position
+            chunk_progress = (lambda remaining: progress(unevaluated + remaining)) if progress else None
             
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=10,
-                temperature=0
+            confirmed = self._match_funds_field_by_field(
+                filtered_pitch_data, [fund for _, fund in chunk], progress=chunk_progress, snapshot=snapshot
             )
-            
-            result = response.choices[0].message.content.strip().upper()
-            return result == "MATCH"
-            
-        except Exception as e:
-            print(f"⚠️ AI comparison failed for {field_name}: {e}")
-            return False
+            confirmed_ids = {fund['id'] for fund in confirmed}
+            for confidence_rate, fund in chunk:
+                if fund['id'] in confirmed_ids:
+                    matched_funds.append({
+                        'fund': dict(fund),
+                        'confidence_rate': confidence_rate
+                    })
+            # Later chunks only matter when this one came up short, so grow them to bound the rounds
+            chunk_size *= 2
+        
+        if top_n is not None:
+            matched_funds = matched_funds[:top_n]
+        logger.info("✅ Found %s fully matched funds", len(matched_funds))
+        return matched_funds
     
-    def _filter_matched_funds(self, filtered_pitch_data: Dict[str, Any], all_funds: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _match_funds_field_by_field(self, filtered_pitch_data: Dict[str, Any], candidates: List[Dict[str, Any]],
+                                    progress: Optional[Callable[[int], None]] = None,
+                                    snapshot: Optional[FundSnapshot] = None) -> List[Dict[str, Any]]:
         """
-        Compare pitch data with fund records,
-        Uses literal matching first, then AI matching for non-matches
-        Only includes funds where ALL compared fields match
+        Funds (in input order) matching every pitch field.
+        All fields first go through the cheap tiers (literal index, local parsers), most
+        selective first, so a fund is dropped before any AI call can be spent on it.
+        The AI checks left over then run one field at a time, picking the field with
+        the fewest AI requests per expected rejection (observed across requests).
         """
-        matched_funds = []
-        
-        print(f"🔍 Comparing pitch data fields: {list(filtered_pitch_data.keys())}")
-        print(f"📊 Processing {len(all_funds)} fund records...")
-        
-        for fund_idx, fund in enumerate(all_funds):
-            print(f"\n📋 Checking fund {fund_idx + 1}/{len(all_funds)}: {fund.get('website', 'Unknown')}")
+        local_order = sorted(filtered_pitch_data, key=lambda field: -self.local_field_stats.rejection_rate(field))
+        ai_pending: Dict[str, Set[str]] = {}  # field -> ids of funds only the AI tier can decide
+        for pitch_field in local_order:
+            if not candidates:
+                break
+            pitch_value = filtered_pitch_data[pitch_field]
             
-            all_fields_match = True
-            compared_fields = 0
-            match_fund = {}
+            # Step 1: Literal comparison via the inverted token index
+            with timed('literal_tier'):
+                literal_ids = self._literal_matches(pitch_field, pitch_value, candidates, snapshot)
+            # Step 2: Parsed comparison for fields with a local parser (check size ranges, gazetteer locations)
+            with timed('parsed_tier'):
+                parsed = self._parsed_matches(pitch_field, pitch_value)
             
-            # Check each field in filtered pitch data
-            for pitch_field, pitch_value in filtered_pitch_data.items():
-                fund_value = fund.get(pitch_field)
-                
-                compared_fields += 1
-                field_match = False
-                
-                print(f"  🔍 Comparing {pitch_field}: pitch='{pitch_value}' vs fund='{fund_value}'")
-                
-                # Step 1: Literal comparison (check if fund value contains pitch value as meaningful match)
-                pitch_str = str(pitch_value).lower().strip()
-                fund_str = str(fund_value).lower().strip()
-                
-                # Use word boundary matching to avoid partial matches like 'us' in 'must'
-                
-                pattern = r'\b' + re.escape(pitch_str) + r'\b'
-                if re.search(pattern, fund_str) or pitch_str == fund_str:
-                    field_match = True
-                    print(f"    ✅ LITERAL MATCH on {pitch_field}")
+            kept = []
+            pending_ids = set()
+            parsed_count = 0
+            for fund in candidates:
+                fund_id = fund['id']
+                if fund_id in literal_ids:
+                    kept.append(fund)
+                elif parsed is not None and fund_id in parsed[1]:
+                    parsed_count += 1
+                    if fund_id in parsed[0]:
+                        kept.append(fund)
                 else:
-                    # Step 2: AI semantic comparison
-                    print(f"Trying AI comparison for {pitch_field}...")
-                    if self._compare_fields_with_ai(str(pitch_value), str(fund_value), pitch_field):
-                        field_match = True
-                        print(f"    ✅ AI SEMANTIC MATCH on {pitch_field}")
-                    else:
-                        print(f"    ❌ NO MATCH on {pitch_field}")
-                
-                # If any field doesn't match, this fund is not a match
-                if not field_match:
-                    all_fields_match = False
-                    break  # No need to check remaining fields
+                    pending_ids.add(fund_id)
+                    kept.append(fund)
             
-            # Only add fund if ALL compared fields matched
-            if all_fields_match and compared_fields > 0:
-                confidence_rate = self._calculate_confidence_rate(fund, filtered_pitch_data)
-                match_fund = {
-                    'fund': fund,
-                    'confidence_rate': confidence_rate
-                }
-                matched_funds.append(match_fund)
-
-                print(f"    ✅ FUND MATCH: All {compared_fields} fields matched! Confidence Rate: {confidence_rate:.1f}%")
-            elif compared_fields > 0:
-                print(f"    ❌ FUND REJECTED: Not all fields matched")
-            else:
-                print(f"    ⚠️ FUND SKIPPED: No fields to compare (all poor quality)")
-        matched_funds.sort(key=lambda x: x['confidence_rate'], reverse=True)
-        print(f"\n✅ Found {len(matched_funds)} fully matched funds")
-        print(matched_funds, 'matched_funds=--------------------')
-        return matched_funds
+            self.local_field_stats.record(pitch_field, len(candidates) - len(pending_ids), len(candidates) - len(kept))
+            candidates = kept
+            if pending_ids:
+                ai_pending[pitch_field] = pending_ids
+            logger.debug("  ✅ %s: %s literal, %s parsed, %s left for AI, %s funds still matching",
+                         pitch_field, len(literal_ids), parsed_count, len(pending_ids), len(candidates))
+            if progress:
+                progress(len(candidates))
+        
+        # Step 3: AI semantic comparison, once per distinct fund value, cheapest/most selective field first
+        batch_size = max(1, Config.SEMANTIC_BATCH_SIZE)
+        while candidates and ai_pending:
+            unmatched_by_field = {}
+            for pitch_field, pending_ids in ai_pending.items():
+                unmatched_values = {}  # normalized fund value -> original fund value
+                pending = [fund for fund in candidates if fund['id'] in pending_ids]
+                for fund, key in zip(pending, self._value_keys(pitch_field, pending, snapshot)):
+                    if key not in unmatched_values:
+                        unmatched_values[key] = str(fund.get(pitch_field))
+                unmatched_by_field[pitch_field] = unmatched_values
+            
+            pitch_field = min(
+                unmatched_by_field,
+                key=lambda field: self.ai_field_stats.evaluation_key(
+                    field, -(-len(unmatched_by_field[field]) // batch_size)
+                )
+            )
+            pending_ids = ai_pending.pop(pitch_field)
+            unmatched_values = unmatched_by_field[pitch_field]
+            if not unmatched_values:
+                continue
+            
+            logger.debug("Trying AI comparison for %s on %s distinct values...", pitch_field, len(unmatched_values))
+            with timed('ai_tier'):
+                verdicts = self._compare_field_values_batch_with_ai(
+                    str(filtered_pitch_data[pitch_field]), list(unmatched_values.values()), pitch_field
+                )
+            pending = [fund for fund in candidates if fund['id'] in pending_ids]
+            rejected_ids = {
+                fund['id'] for fund, key in zip(pending, self._value_keys(pitch_field, pending, snapshot))
+                if not verdicts.get(key, False)
+            }
+            kept = [fund for fund in candidates if fund['id'] not in rejected_ids]
+            checked = len(pending)
+            self.ai_field_stats.record(pitch_field, checked, len(candidates) - len(kept))
+            candidates = kept
+            logger.debug("  ✅ %s: %s AI-checked, %s funds still matching", pitch_field, checked, len(candidates))
+            if progress:
+                progress(len(candidates))
+        
+        return candidates
 
-    def _calculate_confidence_rate(self, fund: Dict[str, Any], filtered_pitch_data: Dict[str, Any]) -> float:
+    def _calculate_confidence_rate(self, fund: Dict[str, Any], filtered_pitch_data: Dict[str, Any], verbose: bool = True) -> float:
         """
         Calculate confidence rate based on the confidence values of matched fields
         """
-        confidence_mapping = {
-            'very high': 1.0,
-            'high': 0.8,
-            'medium': 0.6,
-            'low': 0.4,
-            'very low': 0.2
-        }
-
-        field_weights = {
-            'stage': 20,
-            'check_size': 20,
-            'investment_theme': 25,
-            'sector': 15,
-            'location': 10,
-            'lead': 10
-        }
+        confidence_mapping = CONFIDENCE_MAPPING
+        field_weights = FIELD_WEIGHTS
         total_weighted_confidence = 0.0
         total_fields = 6  # Always divide by 6 as per requirement
         
         # Check confidence for each field that exists in pitch data
         for pitch_field in filtered_pitch_data.keys():
             confidence_field = f"{pitch_field}_confidence"
-            confidence_value = fund.get(confidence_field, '').lower().strip()
+            # Every candidate is scored up front now, so tolerate missing/non-string cells
+            confidence_value = str(fund.get(confidence_field) or '').lower().strip()
             field_weight = field_weights.get(pitch_field, 0)
             
             # Convert confidence string to numeric value
@@ -398,9 +587,10 @@ class FundMatcher:
                 confidence_score = confidence_mapping[confidence_value]
                 weighted_score = confidence_score * field_weight
                 total_weighted_confidence += weighted_score
-                print(f"      📊 {pitch_field} confidence: '{confidence_value}' = {confidence_score} × {field_weight} = {weighted_score}")
-            else:
-                print(f"      ❌ {pitch_field} confidence: '{confidence_value}' (unknown value)")
+                if verbose:
+                    logger.debug("      📊 %s confidence: '%s' = %s × %s = %s", pitch_field, confidence_value, confidence_score, field_weight, weighted_score)
+            elif verbose:
+                logger.debug("      ❌ %s confidence: '%s' (unknown value)", pitch_field, confidence_value)
             
         
         # Calculate confidence rate: total_weighted_confidence is already a percentage (0-100)
@@ -410,7 +600,8 @@ class FundMatcher:
         # Ensure confidence rate never exceeds 100%
         confidence_rate = min(confidence_rate, 100.0)
         
-        print(f"      🎯 Final confidence rate: {confidence_rate}%")
+        if verbose:
+            logger.debug("      🎯 Final confidence rate: %s%%", confidence_rate)
         
         return confidence_rate
     def _get_match_quality(self, percentage_score: float) -> str:
@@ -426,20 +617,23 @@ class FundMatcher:
         else:
             return "Poor Match"
     
-    def find_matching_funds(self, pitch_data: Dict[str, Any], top_n: int = 50) -> List[Dict[str, Any]]:
+    def find_matching_funds(self, pitch_data: Dict[str, Any], top_n: int = 50,
+                            progress: Optional[Callable[..., None]] = None,
+                            snapshot: Optional[FundSnapshot] = None) -> List[Dict[str, Any]]:
         """
         Find and rank matching funds by searching through ALL records with smart filtering
         """        
-        print(f"🔍 Starting comprehensive fund matching (searching ALL records)...")
+        logger.info("🔍 Starting comprehensive fund matching (searching ALL records)...")
         
         # Get ALL funds with smart filtering
-        funds = self.get_all_funds_with_smart_filtering(pitch_data)
+        funds = self.get_all_funds_with_smart_filtering(pitch_data, top_n=top_n, progress=progress, snapshot=snapshot)
         
         return funds[:top_n]
     
 
 # Example usage and testing
 if __name__ == "__main__":
+    logging.basicConfig(level=Config.LOG_LEVEL)
     matcher = FundMatcher()
     
     # Test with sample data
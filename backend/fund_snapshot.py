@@ -0,0 +1,133 @@
+"""
+Columnar Fund Snapshot
+Per-request matching work (quality filtering, confidence scoring) done once per
+fund store version as NumPy columns, instead of per fund on every request
+"""
+
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+CONFIDENCE_MAPPING = {
+    'very high': 1.0,
+    'high': 0.8,
+    'medium': 0.6,
+    'low': 0.4,
+    'very low': 0.2
+}
+
+FIELD_WEIGHTS = {
+    'stage': 20,
+    'check_size': 20,
+    'investment_theme': 25,
+    'sector': 15,
+    'location': 10,
+    'lead': 10
+}
+
+# Confidence level code -> score; code 0 is any unknown/missing level
+CONFIDENCE_LEVELS = [None] + list(CONFIDENCE_MAPPING)
+CONFIDENCE_CODES = {level: code for code, level in enumerate(CONFIDENCE_LEVELS) if level}
+CONFIDENCE_SCORES = np.array([0.0] + list(CONFIDENCE_MAPPING.values()), dtype=np.float64)
+
+
+def normalize_cell(value: Any) -> str:
+    """Lowercased, trimmed text of a cell, interned so repeated values share memory"""
+    return sys.intern(str(value).lower().strip())
+
+
+class FundSnapshot:
+    """
+    Immutable view of all funds at one fund store version.
+
+    - records: the fund records, in store order (positions index every column)
+    - normalized[field]: lowercased, trimmed text per fund (the literal tier's form)
+    - value_keys[field]: normalized text with whitespace runs collapsed (the AI tier's and
+      semantic cache's form, see FundMatcher._normalize_value)
+    - confidence_codes[field]: int8 confidence level per fund (see CONFIDENCE_LEVELS)
+    - poor_quality_bits: one bit per field (see field_bits), set when the fund's non-empty value
+      for that field is a poor-quality placeholder; computed once per distinct value at build time
+    """
+
+    def __init__(self, records: Sequence[Any], version: int, is_poor_quality: Callable[[Any], bool],
+                 fields: Iterable[str] = FIELD_WEIGHTS):
+        self.version = version
+        self.records = list(records)
+        self.ids = [record['id'] for record in self.records]
+        self.positions = {fund_id: position for position, fund_id in enumerate(self.ids)}
+        self.fields = list(fields)
+
+        self.field_bits = {field: 1 << bit for bit, field in enumerate(self.fields)}
+        self.normalized: Dict[str, List[str]] = {}
+        self.value_keys: Dict[str, List[str]] = {}
+        self.confidence_codes: Dict[str, np.ndarray] = {}
+        self.poor_quality_bits = np.zeros(len(self.records), dtype=np.uint16)
+        for field in self.fields:
+            raw_values = [record.get(field) for record in self.records]
+            self.normalized[field] = [normalize_cell(value) for value in raw_values]
+            keys: Dict[str, str] = {}
+            self.value_keys[field] = [
+                keys.get(value) or keys.setdefault(value, sys.intern(' '.join(value.split())))
+                for value in self.normalized[field]
+            ]
+            # Field values repeat heavily, so each distinct value is checked only once
+            verdicts: Dict[str, bool] = {}
+            for raw_value, value in zip(raw_values, self.normalized[field]):
+                if raw_value and value not in verdicts:
+                    verdicts[value] = is_poor_quality(raw_value)
+            poor = np.fromiter(
+                (bool(raw_value) and verdicts[value] for raw_value, value in zip(raw_values, self.normalized[field])),
+                dtype=np.bool_, count=len(raw_values)
+            )
+            self.poor_quality_bits[poor] |= self.field_bits[field]
+            self.confidence_codes[field] = np.fromiter(
+                (CONFIDENCE_CODES.get(normalize_cell(record.get(f"{field}_confidence") or ''), 0)
+                 for record in self.records),
+                dtype=np.int8, count=len(self.records)
+            )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, columns: Dict[str, List[str]], field: str, funds: Iterable[Any]) -> Optional[List[str]]:
+        """A stored column's values (normalized / value_keys) for the given records, None if the field is not stored"""
+        values = columns.get(field)
+        if values is None:
+            return None
+        return [values[self.positions[fund['id']]] for fund in funds]
+
+    def all_mask(self) -> np.ndarray:
+        return np.ones(len(self.records), dtype=np.bool_)
+
+    def mask_of(self, fund_ids: Iterable[str]) -> np.ndarray:
+        """Boolean mask selecting the given fund ids"""
+        mask = np.zeros(len(self.records), dtype=np.bool_)
+        positions = [self.positions[fund_id] for fund_id in fund_ids if fund_id in self.positions]
+        if positions:
+            mask[positions] = True
+        return mask
+
+    def quality_mask(self, fields: Iterable[str]) -> np.ndarray:
+        """Funds with no poor-quality value in any of the given fields (empty values are kept)"""
+        field_mask = 0
+        for field in fields:
+            field_mask |= self.field_bits.get(field, 0)
+        return (self.poor_quality_bits & np.uint16(field_mask)) == 0
+
+    def confidence_scores(self, fields: Iterable[str]) -> np.ndarray:
+        """
+        Confidence rate of every fund for a pitch with the given fields, as a float array.
+        Terms are added in field order, so values equal the per-fund calculation exactly.
+        """
+        scores = np.zeros(len(self.records), dtype=np.float64)
+        for field in fields:
+            weight = FIELD_WEIGHTS.get(field, 0)
+            if field in self.confidence_codes:
+                scores += CONFIDENCE_SCORES[self.confidence_codes[field]] * weight
+        return np.minimum(scores, 100.0)
+
+    def ranked_positions(self, mask: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """Positions selected by mask, by descending score; ties keep store order"""
+        positions = np.flatnonzero(mask)
+        return positions[np.argsort(-scores[positions], kind='stable')]
+
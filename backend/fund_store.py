@@ -0,0 +1,385 @@
+"""
+Local Fund Store
+Keeps a SQLite snapshot of the Airtable fund table and syncs it incrementally
+"""
+
+import sys
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from config import Config
+from cache import connect_sqlite
+
+try:
+    import fcntl
+except ImportError:  # no advisory file locks (Windows): every process syncs on its own
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Fund dict key -> Airtable column name
+AIRTABLE_FIELD_MAP = {
+    'website': 'website',
+    'email': 'Email',
+    'stage': 'stage',
+    'sector': 'sector',
+    'location': 'location',
+    'check_size': 'check size',
+    'lead': 'lead',
+    'investment_theme': 'investment theme',
+    'stage_confidence': 'stage confidence',
+    'check_size_confidence': 'check size confidence',
+    'investment_theme_confidence': 'investment theme confidence',
+    'location_confidence': 'location confidence',
+    'lead_confidence': 'lead confidence',
+    'sector_confidence': 'sector confidence',
+}
+
+
+def record_to_fund(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a raw Airtable record into the fund dict used by the matcher"""
+    fields = record.get('fields', {})
+    fund_data = {'id': record.get('id')}
+    for key, column in AIRTABLE_FIELD_MAP.items():
+        fund_data[key] = fields.get(column, '')
+    return fund_data
+
+
+class FundRecord:
+    """
+    Compact, read-only fund record held in memory by the store.
+    Fixed slots instead of a per-fund dict, and string values interned so the
+    handful of distinct stages/confidence levels are shared across all funds.
+    Supports the dict reads the matcher uses (fund['id'], fund.get(field), `in`,
+    dict(fund)) so it can be passed wherever a fund dict was.
+    """
+
+    __slots__ = ('id',) + tuple(AIRTABLE_FIELD_MAP)
+    FIELDS = __slots__
+
+    def __init__(self, fund: Dict[str, Any]):
+        for key in self.FIELDS:
+            value = fund.get(key, '')
+            setattr(self, key, sys.intern(value) if isinstance(value, str) else value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def __repr__(self) -> str:
+        return f"FundRecord({dict(self)!r})"
+
+
+class ProcessLock:
+    """Advisory lock on a file, shared by every process using the same fund store"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None or fcntl is None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if self.held:
+            return True
+        lock_file = open(self.path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class FundStore:
+    """
+    Local copy of the Airtable fund table.
+
+    The first sync pulls every record; later syncs only fetch records whose
+    LAST_MODIFIED_TIME() is newer than the previous sync. A periodic full sync
+    removes records that were deleted in Airtable.
+
+    Every worker process of the app opens the same SQLite file. Syncs are
+    serialized across processes by a file lock, and only the process holding
+    the leader lock polls Airtable in the background; the others reload the
+    records the leader wrote (see refresh()).
+    """
+
+    # Re-fetch a small window before the last sync to absorb clock skew
+    SYNC_OVERLAP_SECONDS = 60
+
+    def __init__(self, table, db_path: Optional[str] = None,
+                 sync_interval: Optional[int] = None,
+                 full_sync_interval: Optional[int] = None):
+        self.table = table
+        self.db_path = db_path or Config.FUND_STORE_PATH
+        self.sync_interval = Config.FUND_SYNC_INTERVAL if sync_interval is None else sync_interval
+        self.full_sync_interval = Config.FUND_FULL_SYNC_INTERVAL if full_sync_interval is None else full_sync_interval
+
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._funds: Optional[Dict[str, FundRecord]] = None
+        # Bumped whenever the snapshot changes so derived structures know to rebuild
+        self.version = 0
+        self._stop_event = threading.Event()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[List[FundRecord], List[str]], None]] = []
+        # last_incremental_sync value the in-memory snapshot reflects
+        self._loaded_sync: Optional[str] = None
+        self._write_lock = ProcessLock(f"{self.db_path}.sync.lock")
+        self._leader_lock = ProcessLock(f"{self.db_path}.leader.lock")
+
+        self._conn = connect_sqlite(self.db_path)
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS funds ("
+                " id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT)"
+            )
+            self._conn.commit()
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self._conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def _load(self) -> Dict[str, FundRecord]:
+        """Load the snapshot from SQLite into memory (rowid keeps Airtable order)"""
+        with self._lock:
+            if self._funds is None:
+                self._loaded_sync = self._get_state('last_incremental_sync')
+                self._funds = self._read_funds()
+                self.version += 1
+            return self._funds
+
+    def _read_funds(self) -> Dict[str, FundRecord]:
+        rows = self._conn.execute("SELECT id, data FROM funds ORDER BY rowid").fetchall()
+        return {fund_id: FundRecord(json.loads(data)) for fund_id, data in rows}
+
+    def refresh(self) -> bool:
+        """
+        Pick up a sync written by another process: reload the records from SQLite
+        and pass the changed and removed ones to the listeners. True if anything changed.
+        """
+        with self._lock:
+            if self._funds is None:
+                return False
+            synced_at = self._get_state('last_incremental_sync')
+            if synced_at == self._loaded_sync:
+                return False
+            funds = self._read_funds()
+            updated = [fund for fund_id, fund in funds.items()
+                       if fund_id not in self._funds or dict(self._funds[fund_id]) != dict(fund)]
+            removed_ids = [fund_id for fund_id in self._funds if fund_id not in funds]
+            self._loaded_sync = synced_at
+            if not updated and not removed_ids and list(funds) == list(self._funds):
+                return False
+            self._funds = funds
+            self.version += 1
+        self._notify(updated, removed_ids)
+        logger.info("🔄 Fund store reloaded from another process's sync: %s updated, %s removed", len(updated), len(removed_ids))
+        return True
+
+    def _notify(self, updated: List[FundRecord], removed_ids: List[str]):
+        for listener in self._listeners:
+            try:
+                listener(updated, removed_ids)
+            except Exception as e:
+                logger.warning("⚠️ Fund store listener failed: %s", e)
+
+    def last_sync_time(self, kind: str = 'incremental') -> Optional[datetime]:
+        with self._lock:
+            value = self._get_state(f'last_{kind}_sync')
+        return datetime.fromisoformat(value) if value else None
+
+    def _is_stale(self, kind: str, interval: int) -> bool:
+        last = self.last_sync_time(kind)
+        if last is None:
+            return True
+        if interval <= 0:
+            return False
+        return datetime.now(timezone.utc) - last > timedelta(seconds=interval)
+
+    def sync(self, full: bool = False, only_if_stale: bool = False) -> Dict[str, Any]:
+        """
+        Bring the local snapshot up to date with Airtable.
+        Returns a summary of what changed.
+        only_if_stale: skip the Airtable fetch when another process synced while we waited for the lock
+        """
+        if not self.table:
+            raise RuntimeError("No Airtable table connection available")
+
+        with self._sync_lock:
+            self._write_lock.acquire()
+            try:
+                if only_if_stale and not full and not self._needs_sync():
+                    self.refresh()
+                    return {'mode': 'skipped', 'updated': 0, 'removed': 0,
+                            'total': len(self._load()), 'duration_seconds': 0.0}
+                return self._sync(full)
+            finally:
+                self._write_lock.release()
+
+    def _sync(self, full: bool) -> Dict[str, Any]:
+        """One sync, under both locks"""
+        # Start from what the previous syncer (possibly another process) wrote
+        self.refresh()
+        last_sync = self.last_sync_time('incremental')
+        full = full or last_sync is None or self._is_stale('full', self.full_sync_interval)
+        started_at = datetime.now(timezone.utc)
+        started = time.time()
+
+        formula = None
+        if not full:
+            since = last_sync - timedelta(seconds=self.SYNC_OVERLAP_SECONDS)
+            formula = f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since.strftime('%Y-%m-%dT%H:%M:%S.000Z')}'))"
+
+        logger.info("🔄 Syncing fund store (%s)...", 'full' if full else 'incremental')
+        fetched = []
+        for records in self.table.iterate(page_size=100, formula=formula):
+            fetched.extend(record_to_fund(record) for record in records)
+
+        with self._lock:
+            funds = self._load()
+            removed_ids = []
+            if full:
+                fetched_ids = {fund['id'] for fund in fetched}
+                removed_ids = [fund_id for fund_id in funds if fund_id not in fetched_ids]
+                if removed_ids:
+                    self._conn.executemany("DELETE FROM funds WHERE id = ?", [(fund_id,) for fund_id in removed_ids])
+                    for fund_id in removed_ids:
+                        del funds[fund_id]
+
+            self._conn.executemany(
+                "INSERT INTO funds (id, data) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                [(fund['id'], json.dumps(fund)) for fund in fetched]
+            )
+            fetched = [FundRecord(fund) for fund in fetched]
+            for fund in fetched:
+                funds[fund['id']] = fund
+            if fetched or removed_ids:
+                self.version += 1
+
+            self._set_state('last_incremental_sync', started_at.isoformat())
+            if full:
+                self._set_state('last_full_sync', started_at.isoformat())
+            self._conn.commit()
+            self._loaded_sync = started_at.isoformat()
+
+        self._notify(fetched, removed_ids)
+
+        summary = {
+            'mode': 'full' if full else 'incremental',
+            'updated': len(fetched),
+            'removed': len(removed_ids),
+            'total': len(funds),
+            'duration_seconds': round(time.time() - started, 3),
+        }
+        logger.info("✅ Fund store synced: %s", summary)
+        return summary
+
+    def add_listener(self, listener: Callable[[List[FundRecord], List[str]], None]):
+        """Register a callback invoked after each sync with (updated funds, removed ids)"""
+        self._listeners.append(listener)
+
+    def get_funds(self) -> List[FundRecord]:
+        """
+        Return all funds from the local snapshot.
+        Syncs on demand when the snapshot is empty, or stale and no background sync is running.
+        """
+        return self.get_versioned_funds()[1]
+
+    def _needs_sync(self) -> bool:
+        """Never synced, or stale and no background sync (here or in the leader process) is running"""
+        if self.last_sync_time('incremental') is None:
+            return True
+        return not self.is_background_sync_running() and self._is_stale('incremental', self.sync_interval)
+
+    def get_versioned_funds(self) -> Tuple[int, List[FundRecord]]:
+        """Like get_funds, plus the snapshot version the list was taken at"""
+        if self._needs_sync() and self.table:
+            try:
+                # Workers starting together wait for the first one's sync instead of repeating it
+                self.sync(only_if_stale=True)
+            except Exception as e:
+                logger.warning("⚠️ Fund store sync failed, serving local snapshot: %s", e)
+
+        with self._lock:
+            funds = list(self._load().values())
+            return self.version, funds
+
+    def is_background_sync_running(self) -> bool:
+        return self._sync_thread is not None and self._sync_thread.is_alive()
+
+    def is_sync_leader(self) -> bool:
+        return self._leader_lock.held
+
+    def start_background_sync(self, interval: Optional[int] = None):
+        """
+        Start a daemon thread that runs incremental syncs every `interval` seconds.
+        Only one process per fund store (the holder of the leader lock) talks to Airtable;
+        in the others the thread reloads what the leader wrote, and takes over if the leader exits.
+        """
+        interval = self.sync_interval if interval is None else interval
+        if interval <= 0 or self.is_background_sync_running() or not self.table:
+            return
+
+        def _run():
+            while not self._stop_event.is_set():
+                try:
+                    if self.is_sync_leader() or self._leader_lock.acquire(blocking=False):
+                        self.sync()
+                    else:
+                        self.refresh()
+                except Exception as e:
+                    logger.warning("⚠️ Background fund sync failed: %s", e)
+                self._stop_event.wait(interval)
+            self._leader_lock.release()
+
+        self._stop_event.clear()
+        self._sync_thread = threading.Thread(target=_run, name='fund-store-sync', daemon=True)
+        self._sync_thread.start()
+        logger.info("✅ Background fund sync started (every %ss)", interval)
+
+    def stop_background_sync(self):
+        self._stop_event.set()
+        if self._sync_thread is not None:
+            self._sync_thread.join(timeout=5)
+            self._sync_thread = None
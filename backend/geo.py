@@ -0,0 +1,219 @@
+"""
+Offline Geo Resolution
+Resolves free-text locations against the bundled gazetteer (geo_data.json)
+into region ids of a city -> state -> country -> region -> continent -> global hierarchy
+"""
+
+import os
+import re
+import json
+import threading
+from functools import lru_cache
+from typing import Dict, List, Any, FrozenSet, Iterable, Optional, Set
+
+GEO_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'geo_data.json')
+
+GLOBAL_NODE = 'global'
+
+# Uppercase country codes (US, UK, DEU) and "City, ST" state codes
+CODE_PATTERN = re.compile(r'(,\s*)?\b([A-Z]{2,3})\b')
+
+# Text allowed between recognised places for a location to count as fully resolved
+FILLER_PATTERN = re.compile(r'[\s,;/|&+().-]+|\b(?:and|or)\b')
+
+
+class GeoResolver:
+    """
+    Maps location text to the most specific gazetteer nodes it mentions.
+    Aliases are matched case-insensitively as whole phrases; two/three-letter
+    codes only when written in uppercase, so "us" in running text is ignored.
+    """
+
+    def __init__(self, data_path: Optional[str] = None):
+        with open(data_path or GEO_DATA_PATH, encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.nodes: Dict[str, Dict[str, Any]] = data['nodes']
+        self._aliases: Dict[str, str] = {}
+        self._country_codes: Dict[str, str] = {}
+        self._state_codes: Dict[str, str] = {}
+        for node_id, node in self.nodes.items():
+            for alias in node.get('aliases', []):
+                self._aliases.setdefault(alias.lower(), node_id)
+            for code in node.get('codes', []):
+                self._country_codes[code] = node_id
+            if 'state_code' in node:
+                self._state_codes[node['state_code']] = node_id
+
+        # Longest alias first so "new york state" wins over "new york"
+        alternation = '|'.join(re.escape(alias) for alias in sorted(self._aliases, key=len, reverse=True))
+        self._alias_pattern = re.compile(r'(?<!\w)(' + alternation + r')(?!\w)')
+
+        self._ancestors: Dict[str, FrozenSet[str]] = {}
+        for node_id in self.nodes:
+            self._ancestors[node_id] = self._compute_ancestors(node_id)
+
+    def _compute_ancestors(self, node_id: str) -> FrozenSet[str]:
+        """Node itself plus every node above it (regions may have several parents)"""
+        seen = set()
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            stack.extend(self.nodes[current]['parents'])
+        return frozenset(seen)
+
+    def ancestors(self, node_id: str) -> FrozenSet[str]:
+        return self._ancestors[node_id]
+
+    def closure(self, node_ids: Iterable[str]) -> Set[str]:
+        """Union of the given nodes and all their ancestors"""
+        result = set()
+        for node_id in node_ids:
+            result |= self._ancestors[node_id]
+        return result
+
+    @lru_cache(maxsize=65536)
+    def resolve(self, text: Any) -> FrozenSet[str]:
+        """Most specific nodes mentioned in the text (cached: field values repeat constantly)"""
+        return self.resolve_uncached(text)
+
+    @lru_cache(maxsize=65536)
+    def resolves_fully(self, text: Any) -> bool:
+        """True when every place the text lists is recognised (only separators are left over)"""
+        original = str(text or '').strip()
+        if not original:
+            return False
+        found = self.resolve(original)
+        if found == frozenset([GLOBAL_NODE]):
+            return True  # matches everything the other parts could add
+        if not found:
+            return False
+
+        def known_code(match: re.Match) -> str:
+            comma, code = match.groups()
+            known = (comma and code in self._state_codes) or code in self._country_codes
+            return ' ' if known else match.group(0)
+
+        leftover = CODE_PATTERN.sub(known_code, original).lower().replace('&', ' and ')
+        leftover = self._alias_pattern.sub(' ', leftover)
+        return not FILLER_PATTERN.sub('', leftover)
+
+    def resolve_uncached(self, text: Any) -> FrozenSet[str]:
+        """Most specific nodes mentioned in the text (empty if nothing is recognised)"""
+        original = str(text or '').strip()
+        if not original:
+            return frozenset()
+
+        found = set()
+        for comma, code in CODE_PATTERN.findall(original):
+            if comma and code in self._state_codes:
+                found.add(self._state_codes[code])
+            elif code in self._country_codes:
+                found.add(self._country_codes[code])
+
+        lowered = original.lower().replace('&', ' and ')
+        for alias in self._alias_pattern.findall(lowered):
+            found.add(self._aliases[alias])
+
+        # "Global" covers every location, whatever else is listed
+        if GLOBAL_NODE in found:
+            return frozenset([GLOBAL_NODE])
+
+        # Drop nodes that are ancestors of another match ("Boston, MA, USA" -> Boston)
+        return frozenset(
+            node_id for node_id in found
+            if not any(node_id != other and node_id in self._ancestors[other] for other in found)
+        )
+
+
+class GeoIndex:
+    """
+    Resolved location nodes per fund, indexed so a pitch location resolves to
+    its matching funds with a few set unions.
+
+    A fund matches when one side's location contains the other's: the fund
+    covers the pitch location (fund node is an ancestor of a pitch node) or the
+    fund sits inside the pitch location (pitch node is an ancestor of a fund node).
+    Funds whose location only partly resolves ("Nordics, Boston" without a
+    Nordics entry) are indexed for matching but not counted as resolved.
+    """
+
+    def __init__(self, resolver: GeoResolver, field: str = 'location'):
+        self.resolver = resolver
+        self.field = field
+        self._lock = threading.RLock()
+        self._fund_nodes: Dict[str, FrozenSet[str]] = {}
+        self._by_node: Dict[str, Set[str]] = {}
+        self._by_ancestor: Dict[str, Set[str]] = {}
+        self._resolved: Set[str] = set()
+        self.is_built = False
+
+    def build(self, funds: Iterable[Dict[str, Any]]):
+        with self._lock:
+            self._fund_nodes = {}
+            self._by_node = {}
+            self._by_ancestor = {}
+            self._resolved = set()
+            for fund in funds:
+                self._add(fund)
+            self.is_built = True
+
+    def update(self, updated_funds: Iterable[Dict[str, Any]], removed_ids: Iterable[str] = ()):
+        with self._lock:
+            if not self.is_built:
+                return
+            for fund_id in removed_ids:
+                self._remove(fund_id)
+            for fund in updated_funds:
+                self._remove(fund['id'])
+                self._add(fund)
+
+    def _add(self, fund: Dict[str, Any]):
+        location = str(fund.get(self.field) or '')
+        nodes = self.resolver.resolve(location)
+        if not nodes:
+            return
+        fund_id = fund['id']
+        self._fund_nodes[fund_id] = nodes
+        if self.resolver.resolves_fully(location):
+            self._resolved.add(fund_id)
+        for node_id in nodes:
+            self._by_node.setdefault(node_id, set()).add(fund_id)
+        for node_id in self.resolver.closure(nodes):
+            self._by_ancestor.setdefault(node_id, set()).add(fund_id)
+
+    def _remove(self, fund_id: str):
+        nodes = self._fund_nodes.pop(fund_id, None)
+        self._resolved.discard(fund_id)
+        if not nodes:
+            return
+        for node_id in nodes:
+            self._by_node.get(node_id, set()).discard(fund_id)
+        for node_id in self.resolver.closure(nodes):
+            self._by_ancestor.get(node_id, set()).discard(fund_id)
+
+    def matching(self, nodes: Iterable[str]) -> Set[str]:
+        """Ids of funds whose resolved location overlaps the given nodes"""
+        nodes = list(nodes)
+        with self._lock:
+            result = set()
+            for node_id in self.resolver.closure(nodes):
+                result |= self._by_node.get(node_id, set())
+            for node_id in nodes:
+                result |= self._by_ancestor.get(node_id, set())
+            return result
+
+    def resolved_ids(self) -> Set[str]:
+        """Ids of funds whose whole location resolved, so a non-match is a real mismatch"""
+        with self._lock:
+            return set(self._resolved)
+
+    def resolve_selections(self, selections: List[str]) -> FrozenSet[str]:
+        """Resolve form continent/country selections into one node set"""
+        nodes = set()
+        for selection in selections or []:
+            nodes |= self.resolver.resolve(str(selection))
+        return frozenset(nodes)
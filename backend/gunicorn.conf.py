@@ -0,0 +1,42 @@
+"""
+Production server settings: gunicorn 'app:create_app()' (run from backend/)
+Each worker process builds its own parser, matcher, fund snapshot and caches;
+threads within a worker share them. Tune with the environment variables below.
+
+Workers share state through the SQLite files under data/: analysis jobs are
+written to the job store, so any worker answers /api/jobs/<id> and its event
+stream, and only one worker polls Airtable for the fund store. /api/metrics is
+per worker: scrape each worker (or run one) to see the whole server.
+"""
+
+import os
+import multiprocessing
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# Threaded workers: requests spend most of their time waiting on OpenAI, so threads are cheap concurrency
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count())))
+# Keep above MAX_CONCURRENT_REQUESTS + MAX_EVENT_STREAMS so polls, probes and 503s are always answered
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+
+# No preload: services start threads and pools that must not be created before the fork
+preload_app = False
+
+# A large deck with many LLM calls can take minutes
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 120))  # in-flight requests finish on SIGTERM
+keepalive = 5
+
+# No max_requests recycling: a restarted worker would take its running analysis jobs with it.
+# Memory-heavy PDF extraction runs in the recycled process pool (PDF_EXTRACTION_TASKS_PER_CHILD).
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def worker_exit(server, worker):
+    """Drain background jobs and pools once the worker has stopped serving requests"""
+    from app import shutdown_services
+    shutdown_services(wait=True)
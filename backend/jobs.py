@@ -0,0 +1,282 @@
+"""
+Deck Analysis Jobs
+Bounded worker pool that runs uploads in the background and tracks their progress.
+Job state is written through to a SQLite store shared by every worker process,
+so any worker can answer status and event-stream requests for any job.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Union
+from cache import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+
+class JobStore:
+    """Latest state of every job, keyed by job id, in a SQLite file all workers open"""
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " owner_pid INTEGER NOT NULL,"
+            " status TEXT NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " state TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def save(self, state: Dict[str, Any], version: int, owner_pid: int):
+        """Write a job's state; a failed write only delays what other workers see"""
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, owner_pid, status, version, updated_at, state) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET owner_pid = excluded.owner_pid, status = excluded.status, "
+                    "version = excluded.version, updated_at = excluded.updated_at, state = excluded.state",
+                    (state['job_id'], owner_pid, state['status'], version, state['updated_at'],
+                     json.dumps(state, default=str))
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("Job %s state not stored: %s", state['job_id'], e)
+                self._conn.rollback()
+
+    def load(self, job_id: str) -> Optional[tuple]:
+        """(state, version, owner pid) of a job, or None if unknown"""
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT state, version, owner_pid FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning("Job %s state not loaded: %s", job_id, e)
+                return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def purge(self, finished_before: float):
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (*FINISHED_STATUSES, finished_before)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("Finished jobs not purged: %s", e)
+                self._conn.rollback()
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Job:
+    """State of one background analysis, updated by the worker and read by pollers/streams"""
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.progress: Dict[str, Any] = {}
+        self.partial_result: Optional[Dict[str, Any]] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.version = 0
+        self._store = store
+        self._changed = threading.Condition()
+        if store is not None:
+            store.save(self._state(), self.version, os.getpid())
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = time.time()
+        if self._store is not None:
+            self._store.save(self._state(), self.version, os.getpid())
+        self._changed.notify_all()
+
+    def update_progress(self, **updates):
+        """Progress callback handed to the parser and matcher"""
+        with self._changed:
+            self.progress.update(updates)
+            self._touch()
+
+    def set_partial_result(self, partial_result: Dict[str, Any]):
+        with self._changed:
+            self.partial_result = partial_result
+            self._touch()
+
+    def set_status(self, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self._changed:
+            self.status = status
+            if result is not None:
+                self.result = result
+            if error is not None:
+                self.error = error
+            self._touch()
+
+    def wait_for_change(self, last_version: int, timeout: float) -> int:
+        """Block until the job changes past last_version (or timeout); returns the current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version > last_version, timeout=timeout)
+            return self.version
+
+    def _state(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'progress': dict(self.progress),
+            'partial_result': self.partial_result,
+            'result': self.result,
+            'error': self.error,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._changed:
+            return self._state()
+
+
+class StoredJob:
+    """
+    A job run by another worker process, read from the job store.
+    Waiting for a change polls the store every `poll_interval` seconds.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, poll_interval: float):
+        self.id = job_id
+        self._store = store
+        self._poll_interval = poll_interval
+        self._state: Dict[str, Any] = {}
+        self.version = -1
+
+    def refresh(self) -> bool:
+        """Reload the job; False once it is gone from the store"""
+        entry = self._store.load(self.id)
+        if entry is None:
+            return False
+        self._state, self.version, owner_pid = entry
+        if not self.is_finished and not _process_alive(owner_pid):
+            # The worker running it exited (crash or restart) without finishing the job
+            self._state.update(status='failed', error='The server restarted while analyzing, please resubmit',
+                               updated_at=time.time())
+            self.version += 1
+            self._store.save(self._state, self.version, owner_pid)
+        return True
+
+    @property
+    def status(self) -> str:
+        return self._state.get('status', 'queued')
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def wait_for_change(self, last_version: int, timeout: float) -> int:
+        deadline = time.monotonic() + timeout
+        while True:
+            self.refresh()
+            remaining = deadline - time.monotonic()
+            if self.version > last_version or remaining <= 0:
+                return self.version
+            time.sleep(min(self._poll_interval, remaining))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._state)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobManager:
+    """
+    Runs jobs on a fixed-size thread pool. Submissions beyond max_pending
+    queued-or-running jobs in this process are refused, and finished jobs are
+    forgotten after `retention` seconds. With a store, jobs run elsewhere are
+    readable too (see StoredJob).
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, retention: int,
+                 store: Optional[JobStore] = None, poll_interval: float = 0.5):
+        self.max_pending = max_pending
+        self.retention = retention
+        self.store = store
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='deck-job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _purge_finished(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.is_finished and job.updated_at < cutoff]:
+            del self._jobs[job_id]
+        if self.store is not None:
+            self.store.purge(cutoff)
+
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args, **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs); its return value becomes the job result"""
+        with self._lock:
+            self._purge_finished()
+            pending = sum(1 for job in self._jobs.values() if not job.is_finished)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} jobs already pending")
+            job = Job(self.store)
+            self._jobs[job.id] = job
+
+        def _run():
+            if job.is_finished:
+                return  # failed by shutdown() before it started
+            job.set_status('running')
+            try:
+                job.set_status('completed', result=fn(job, *args, **kwargs))
+            except Exception as e:
+                print(f"❌ Job {job.id} failed: {e}")
+                job.set_status('failed', error=str(e))
+
+        self._executor.submit(_run)
+        return job
+
+    def get(self, job_id: str) -> Optional[Union[Job, StoredJob]]:
+        """A job of this process, or one another worker process runs (read from the store)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.store is None:
+            return job
+        stored = StoredJob(self.store, job_id, self.poll_interval)
+        return stored if stored.refresh() else None
+
+    def shutdown(self, wait: bool = True):
+        """Stop taking work: queued jobs are failed, running jobs finish when wait is set"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            queued = [job for job in self._jobs.values() if job.status == 'queued']
+        for job in queued:
+            job.set_status('failed', error='Server shutting down, please resubmit')
+        if wait:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,296 @@
+"""
+Shared LLM Client
+One pooled OpenAI client per process, used by deck parsing and fund matching alike.
+Every request passes a global request/token budget and an adaptive (AIMD)
+concurrency limit, and is retried with jittered backoff that honours the
+API's rate-limit headers.
+"""
+
+import re
+import time
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+import openai
+from openai import DefaultHttpxClient, OpenAI
+from config import Config
+from metrics import LLM_RETRIES, llm_usage, record_llm_call, register_collector
+from transport import wrap_openai_transport
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limited, timed out, conflict, server errors
+RETRIABLE_STATUS = {408, 409, 429}
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_SECONDS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+class LLMUnavailableError(Exception):
+    """The LLM request failed after all retries (rate limited, timing out or erroring)"""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in an OpenAI reset header such as '1s', '6m0s' or '250ms'"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _DURATION_SECONDS[unit] for number, unit in parts)
+
+
+def retry_after_seconds(headers: Any) -> Optional[float]:
+    """How long the API asked us to wait: retry-after-ms, retry-after, or the exhausted limit's reset time"""
+    if headers is None:
+        return None
+    if headers.get('retry-after-ms'):
+        try:
+            return float(headers['retry-after-ms']) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    resets = [
+        parse_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+        for kind in ('requests', 'tokens')
+        if headers.get(f'x-ratelimit-remaining-{kind}') == '0'
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def estimate_request_tokens(messages: Iterable[Dict[str, Any]], max_tokens: Optional[int]) -> int:
+    """Rough prompt + completion tokens (~4 characters per token), for budgeting before the call"""
+    prompt_chars = sum(len(str(message.get('content', ''))) for message in messages)
+    return prompt_chars // 4 + 1 + (max_tokens or 0)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on LLM requests in flight: each success below the latency target
+    adds 1/limit (about +1 per round trip of the whole window); a 429, a timeout
+    or a slow response multiplies the limit by `backoff`.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float,
+                 latency_target: float, backoff: float = 0.5):
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self, latency: float):
+        if self.latency_target and latency > self.latency_target:
+            self.on_congestion()
+            return
+        with self._condition:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_congestion(self):
+        with self._condition:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+
+
+class RateBudget:
+    """
+    Requests-per-minute and tokens-per-minute token buckets shared by every LLM
+    caller in the process (0 disables a bucket). The API's own rate-limit
+    headers can pause the budget until the provider's window resets.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int):
+        """Block until one request and `tokens` tokens are available, then take them"""
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)  # an oversized request waits for a full bucket, not forever
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                waits = [self._paused_until - now]
+                if self.requests_per_minute and self._requests < 1:
+                    waits.append((1 - self._requests) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._tokens < tokens:
+                    waits.append((tokens - self._tokens) * 60 / self.tokens_per_minute)
+                wait = max(waits)
+                if wait <= 0:
+                    break
+                self._condition.wait(min(wait, 1.0))
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+
+    def pause(self, seconds: float):
+        """Hold every caller back for `seconds` (the provider told us its limit is exhausted)"""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe_headers(self, headers: Any):
+        wait = retry_after_seconds(headers)
+        if wait:
+            self.pause(wait)
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def pooled_http_client() -> httpx.Client:
+    """Keep-alive connection pool (HTTP/2 when the h2 package is installed) under the record/replay layer"""
+    transport = httpx.HTTPTransport(
+        http2=Config.OPENAI_HTTP2 and _h2_available(),
+        limits=httpx.Limits(
+            max_connections=Config.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.OPENAI_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.OPENAI_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return DefaultHttpxClient(
+        transport=wrap_openai_transport(transport),
+        timeout=httpx.Timeout(Config.OPENAI_TIMEOUT, connect=10.0),
+    )
+
+
+class LLMClient:
+    """Chat completions through the shared pool, limiter, budget and retry policy"""
+
+    def __init__(self):
+        # Retries are ours, so they go back through the limiter and the budget
+        self.client = OpenAI(api_key=Config.OPENAI_API_KEY, base_url=Config.OPENAI_BASE_URL,
+                             http_client=pooled_http_client(), max_retries=0)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=Config.LLM_CONCURRENCY_INITIAL,
+            minimum=Config.LLM_CONCURRENCY_MIN,
+            maximum=Config.LLM_CONCURRENCY_MAX,
+            latency_target=Config.LLM_LATENCY_TARGET,
+        )
+        self.budget = RateBudget(Config.LLM_REQUESTS_PER_MINUTE, Config.LLM_TOKENS_PER_MINUTE)
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, but never sooner than the server asked"""
+        delay = random.uniform(0, min(Config.LLM_RETRY_MAX_DELAY, Config.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, Config.LLM_RETRY_BASE_DELAY))
+        return delay
+
+    def complete(self, purpose: str, **kwargs):
+        """
+        chat.completions.create(**kwargs), counted under `purpose`.
+        Raises LLMUnavailableError once retries are exhausted or the error is not retriable.
+        """
+        estimated_tokens = estimate_request_tokens(kwargs.get('messages', []), kwargs.get('max_tokens'))
+        attempts = Config.LLM_MAX_RETRIES + 1
+        for attempt in range(attempts):
+            retry_after = None
+            self.budget.acquire(estimated_tokens)
+            with self.limiter.slot():
+                started = time.perf_counter()
+                try:
+                    raw = self.client.chat.completions.with_raw_response.create(**kwargs)
+                    response = raw.parse()
+                except openai.APIStatusError as e:
+                    record_llm_call(purpose, error=e)
+                    retry_after = retry_after_seconds(e.response.headers)
+                    if e.status_code == 429:
+                        self.limiter.on_congestion()
+                        self.budget.pause(retry_after if retry_after is not None else Config.LLM_RETRY_BASE_DELAY)
+                    if e.status_code not in RETRIABLE_STATUS and e.status_code < 500:
+                        raise LLMUnavailableError(f"OpenAI rejected the {purpose} request ({e.status_code}): {e}") from e
+                    error = e
+                except openai.APIConnectionError as e:
+                    # Includes timeouts: treated as congestion as well
+                    record_llm_call(purpose, error=e)
+                    self.limiter.on_congestion()
+                    error = e
+                else:
+                    latency = time.perf_counter() - started
+                    self.limiter.on_success(latency)
+                    self.budget.observe_headers(raw.headers)
+                    record_llm_call(purpose, response)
+                    usage = llm_usage(response)
+                    logger.debug("LLM %s call: %s prompt tokens (%s cached), %s completion tokens, %.2fs",
+                                 purpose, usage.get('prompt'), usage.get('cached'), usage.get('completion'), latency)
+                    return response
+            if attempt + 1 < attempts:
+                LLM_RETRIES.inc(purpose=purpose)
+                time.sleep(self._backoff(attempt, retry_after))
+        raise LLMUnavailableError(f"OpenAI {purpose} request failed after {attempts} attempts: {error}") from error
+
+    def collect_metrics(self) -> List[str]:
+        return [
+            '# HELP pitchdeck_llm_concurrency_limit Current adaptive limit on LLM requests in flight',
+            '# TYPE pitchdeck_llm_concurrency_limit gauge',
+            f'pitchdeck_llm_concurrency_limit {self.limiter.limit:g}',
+            '# HELP pitchdeck_llm_in_flight LLM requests currently in flight',
+            '# TYPE pitchdeck_llm_in_flight gauge',
+            f'pitchdeck_llm_in_flight {self.limiter.in_flight}',
+        ]
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """The process-wide LLM client, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+            register_collector(_client.collect_metrics)
+        return _client
@@ -0,0 +1,233 @@
+"""
+LLM Work Scheduler
+Page analyses and fund comparisons are submitted here as tasks and run on one
+shared worker pool in weighted-fair order, so a single large deck or match run
+cannot starve the other requests in the process.
+
+Each (priority class, trace id) pair is a flow with its own FIFO queue. Flows are
+served by start-time fair queuing: a task's finish tag advances its flow by
+1/weight of its class, and the queued head with the smallest tag runs next.
+At most the shared client's adaptive concurrency limit of tasks run at once.
+"""
+
+import time
+import itertools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from config import Config
+from llm_client import get_llm_client
+from metrics import LLM_QUEUE_WAIT_SECONDS, current_trace_id, register_collector
+
+PRIORITY_CLASSES = ('interactive', 'batch', 'background')
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar('llm_priority', default='interactive')
+
+
+@contextmanager
+def llm_priority(name: str) -> Iterator[None]:
+    """Run the block's LLM tasks in the given priority class"""
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"LLM priority must be one of {PRIORITY_CLASSES}, got {name!r}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class _Task:
+    __slots__ = ('fn', 'args', 'future', 'context', 'priority', 'finish_tag', 'seq', 'enqueued_at')
+
+    def __init__(self, fn: Callable[..., Any], args: Tuple[Any, ...], priority: str, finish_tag: float, seq: int):
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+        # Run in a copy of the submitter's context so log records keep its trace id
+        self.context = contextvars.copy_context()
+        self.priority = priority
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.enqueued_at = time.perf_counter()
+
+
+class _Flow:
+    __slots__ = ('tasks', 'last_finish')
+
+    def __init__(self):
+        self.tasks: Deque[_Task] = deque()
+        self.last_finish = 0.0
+
+
+class LLMScheduler:
+    """
+    Weighted fair queuing of LLM tasks over a shared worker pool.
+    capacity: how many tasks may run at once, read at every dispatch
+    """
+
+    def __init__(self, workers: int, weights: Dict[str, float], capacity: Callable[[], int]):
+        self.workers = max(1, workers)
+        self.weights = weights
+        self.capacity = capacity
+        self.running = 0
+        self._flows: Dict[Tuple[str, str], _Flow] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+        self._local = threading.local()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, priority: Optional[str] = None,
+               flow: Optional[str] = None) -> Future:
+        """
+        Queue fn(*args) and return its Future.
+        priority defaults to the caller's llm_priority(); flow to the caller's trace id.
+        """
+        priority = priority or current_priority()
+        if getattr(self._local, 'is_worker', False):
+            # A task submitting more work would wait on the pool it occupies; run it inline
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("LLM scheduler is shut down")
+            key = (priority, flow or current_trace_id())
+            state = self._flows.get(key)
+            if state is None:
+                state = self._flows[key] = _Flow()
+            start = max(self._virtual_time, state.last_finish)
+            state.last_finish = start + 1.0 / self.weights.get(priority, 1.0)
+            task = _Task(fn, args, priority, state.last_finish, next(self._seq))
+            state.tasks.append(task)
+            self._start_workers()
+            self._condition.notify()
+        return task.future
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f'llm-scheduler-{len(self._threads)}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_task(self) -> Optional[_Task]:
+        """Block until a task may run; None once shut down and drained"""
+        with self._condition:
+            while True:
+                if self._flows and self.running < max(1, self.capacity()):
+                    key, state = min(self._flows.items(),
+                                     key=lambda item: (item[1].tasks[0].finish_tag, item[1].tasks[0].seq))
+                    task = state.tasks.popleft()
+                    if not state.tasks:
+                        del self._flows[key]
+                    self._virtual_time = max(self._virtual_time, task.finish_tag - 1.0 / self.weights.get(task.priority, 1.0))
+                    self.running += 1
+                    return task
+                if self._closed and not self._flows:
+                    return None
+                # Timed wait: the capacity can grow without anyone notifying
+                self._condition.wait(0.5)
+
+    def _work(self):
+        self._local.is_worker = True
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            LLM_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - task.enqueued_at, priority=task.priority)
+            try:
+                if task.future.set_running_or_notify_cancel():
+                    try:
+                        task.future.set_result(task.context.run(task.fn, *task.args))
+                    except BaseException as e:
+                        task.future.set_exception(e)
+            finally:
+                with self._condition:
+                    self.running -= 1
+                    self._condition.notify_all()
+
+    def queue_depths(self) -> Dict[str, Dict[str, int]]:
+        """Queued tasks and flows per priority class"""
+        depths = {priority: {'tasks': 0, 'flows': 0} for priority in PRIORITY_CLASSES}
+        with self._condition:
+            for (priority, _), state in self._flows.items():
+                entry = depths.setdefault(priority, {'tasks': 0, 'flows': 0})
+                entry['tasks'] += len(state.tasks)
+                entry['flows'] += 1
+        return depths
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        with self._condition:
+            self._closed = True
+            if cancel_futures:
+                for state in self._flows.values():
+                    for task in state.tasks:
+                        task.future.cancel()
+                self._flows.clear()
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def collect_metrics(self) -> List[str]:
+        depths = self.queue_depths()
+        lines = [
+            '# HELP pitchdeck_llm_queue_depth LLM tasks waiting in the scheduler',
+            '# TYPE pitchdeck_llm_queue_depth gauge',
+        ]
+        lines += [f'pitchdeck_llm_queue_depth{{priority="{p}"}} {d["tasks"]}' for p, d in sorted(depths.items())]
+        lines += [
+            '# HELP pitchdeck_llm_queue_flows Requests (flows) with LLM tasks waiting in the scheduler',
+            '# TYPE pitchdeck_llm_queue_flows gauge',
+        ]
+        lines += [f'pitchdeck_llm_queue_flows{{priority="{p}"}} {d["flows"]}' for p, d in sorted(depths.items())]
+        lines += [
+            '# HELP pitchdeck_llm_tasks_running LLM tasks currently running',
+            '# TYPE pitchdeck_llm_tasks_running gauge',
+            f'pitchdeck_llm_tasks_running {self.running}',
+        ]
+        return lines
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """The process-wide scheduler, created on first use, running up to the shared client's limit"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            limiter = get_llm_client().limiter
+            _scheduler = LLMScheduler(
+                workers=Config.LLM_CONCURRENCY_MAX,
+                weights={
+                    'interactive': Config.LLM_WEIGHT_INTERACTIVE,
+                    'batch': Config.LLM_WEIGHT_BATCH,
+                    'background': Config.LLM_WEIGHT_BACKGROUND,
+                },
+                capacity=lambda: int(limiter.limit),
+            )
+            register_collector(_scheduler.collect_metrics)
+        return _scheduler
+
+
+def shutdown_llm_scheduler(wait: bool = True):
+    """Stop the workers; queued tasks are cancelled, running ones finish"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown(wait=wait, cancel_futures=True)
+            _scheduler = None
@@ -0,0 +1,229 @@
+"""
+Metrics and Tracing
+Process-wide counters and stage timers rendered in the Prometheus text format,
+plus a per-request trace id carried in a context variable
+"""
+
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers a cached lookup up to a multi-minute deck
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Tokens per request; covers a one-word verdict up to a packed multi-page prompt
+TOKEN_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+_trace_id: contextvars.ContextVar[str] = contextvars.ContextVar('trace_id', default='-')
+
+
+def new_trace_id(trace_id: Optional[str] = None) -> str:
+    """Start a trace for the current request/job (reusing an incoming id when given)"""
+    trace_id = trace_id or uuid.uuid4().hex[:16]
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def current_trace_id() -> str:
+    return _trace_id.get()
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds %(trace_id)s to every log record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        return True
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value:g}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", f"{bound:g}")])} {count:g}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", "+Inf")])} {series[-2]:g}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {series[-2]:g}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]:.6f}')
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'pitchdeck_stage_duration_seconds', 'Wall time per pipeline stage', ['stage']
+)
+LLM_CALLS = Counter(
+    'pitchdeck_llm_calls_total', 'OpenAI requests by purpose and outcome', ['purpose', 'outcome']
+)
+LLM_TOKENS = Counter(
+    'pitchdeck_llm_tokens_total', 'OpenAI tokens by purpose and kind (prompt/cached/completion; cached is part of prompt)', ['purpose', 'kind']
+)
+LLM_CALL_TOKENS = Histogram(
+    'pitchdeck_llm_call_tokens', 'Tokens per OpenAI request by purpose and kind (prompt/cached/completion)',
+    ['purpose', 'kind'], buckets=TOKEN_BUCKETS
+)
+LLM_RETRIES = Counter(
+    'pitchdeck_llm_retries_total', 'LLM work redone after a failed or incomplete request', ['purpose']
+)
+HTTP_REQUESTS = Counter(
+    'pitchdeck_http_requests_total', 'HTTP requests by endpoint and status', ['endpoint', 'status']
+)
+HTTP_REJECTED = Counter(
+    'pitchdeck_http_rejected_total', 'Requests refused with 503 because the worker was at its concurrency limit', ['endpoint']
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'pitchdeck_http_request_duration_seconds', 'Time to produce the HTTP response (streamed bodies excluded)', ['endpoint']
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    'pitchdeck_llm_queue_wait_seconds', 'Time LLM tasks waited in the scheduler before running', ['priority']
+)
+TRANSPORT_REQUESTS = Counter(
+    'pitchdeck_transport_requests_total', 'Requests through the record/replay transport by outcome', ['service', 'outcome']
+)
+
+_metrics = [STAGE_SECONDS, LLM_CALLS, LLM_TOKENS, LLM_CALL_TOKENS, LLM_RETRIES, LLM_QUEUE_WAIT_SECONDS, HTTP_REQUESTS, HTTP_REJECTED, HTTP_REQUEST_SECONDS, TRANSPORT_REQUESTS]
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def register_collector(collector: Callable[[], Iterable[str]]):
+    """Add a callable producing extra exposition lines at scrape time (e.g. cache stats)"""
+    _collectors.append(collector)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a block as one observation of the given stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def timed_iter(iterable: Iterable[Any], stage: str) -> Iterator[Any]:
+    """
+    Pass items through, timing only the work done producing them (not the
+    consumer's work between items); recorded as one observation when exhausted.
+    """
+    elapsed = 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+
+
+def llm_usage(response: Any) -> Dict[str, int]:
+    """Prompt, cached prompt (served from the provider's prompt cache) and completion tokens of a response"""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return {}
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return {
+        'prompt': getattr(usage, 'prompt_tokens', 0) or 0,
+        'cached': getattr(details, 'cached_tokens', 0) or 0,
+        'completion': getattr(usage, 'completion_tokens', 0) or 0,
+    }
+
+
+def record_llm_call(purpose: str, response: Any = None, error: Optional[BaseException] = None):
+    """Count one OpenAI request and, when the response reports usage, its tokens (totals and per call)"""
+    LLM_CALLS.inc(purpose=purpose, outcome='error' if error is not None else 'ok')
+    for kind, tokens in llm_usage(response).items():
+        LLM_TOKENS.inc(tokens, purpose=purpose, kind=kind)
+        LLM_CALL_TOKENS.observe(tokens, purpose=purpose, kind=kind)
+
+
+def cache_stats_collector(caches: Dict[str, Any]) -> Callable[[], Iterable[str]]:
+    """Collector exposing TwoLevelCache.stats() for each named cache"""
+    def collect() -> Iterable[str]:
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        for metric, key, kind, documentation in (
+            ('pitchdeck_cache_hits_total', 'hits', 'counter', 'Cache hits (memory or disk)'),
+            ('pitchdeck_cache_misses_total', 'misses', 'counter', 'Cache misses'),
+            ('pitchdeck_cache_hit_ratio', 'hit_rate', 'gauge', 'Cache hit ratio since process start'),
+            ('pitchdeck_cache_memory_entries', 'memory_entries', 'gauge', 'Entries held in the in-process LRU'),
+            ('pitchdeck_cache_disk_errors_total', 'disk_errors', 'counter', 'SQLite errors treated as misses or skipped writes'),
+        ):
+            yield f'# HELP {metric} {documentation}'
+            yield f'# TYPE {metric} {kind}'
+            for name, values in sorted(stats.items()):
+                yield f'{metric}{_format_labels(("cache",), (name,))} {float(values.get(key, 0) or 0):g}'
+    return collect
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            lines.extend(collector())
+        except Exception as e:
+            lines.append(f'# collector failed: {e}')
+    return '\n'.join(lines) + '\n'
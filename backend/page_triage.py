@@ -0,0 +1,68 @@
+"""
+Page Triage
+Cheap local scoring of extracted deck pages so low-information pages
+("Thank you", "Appendix", logo-only pages) are not sent to the LLM
+"""
+
+import re
+from typing import Dict, Optional
+from geo import GeoResolver
+
+CURRENCY_PATTERN = re.compile(
+    r'[$€£¥₹]\s?\d|\b\d+(?:[.,]\d+)?\s?(?:k|m|mm|bn|b|million|billion|thousand)\b|\b(?:usd|eur|gbp)\b',
+    re.IGNORECASE
+)
+STAGE_PATTERN = re.compile(
+    r'\b(?:pre-?seed|seed|series [a-e]|bridge round|growth stage|raising|fundraise|funding round|the ask|investment)\b',
+    re.IGNORECASE
+)
+CONTACT_PATTERN = re.compile(
+    r'\b[\w.+-]+@[\w-]+\.[\w.]+\b|\bhttps?://\S+|\bwww\.\S+|\b[\w-]+\.(?:com|io|ai|co|health|bio|tech|org|net)\b',
+    re.IGNORECASE
+)
+SECTOR_PATTERN = re.compile(
+    r'\b(?:fintech|healthtech|medtech|biotech|edtech|saas|b2b|b2c|marketplace|platform|digital health|'
+    r'pharma|insurtech|cleantech|climate|ai|machine learning|blockchain|e-?commerce|investors?|lead)\b',
+    re.IGNORECASE
+)
+BOILERPLATE_PATTERN = re.compile(
+    r'^\W*(?:thank you|thanks|questions\??|q\s?&\s?a|appendix|agenda|contents|table of contents|confidential)\W*$',
+    re.IGNORECASE
+)
+
+_geo_resolver: Optional[GeoResolver] = None
+
+
+def _get_geo_resolver() -> GeoResolver:
+    global _geo_resolver
+    if _geo_resolver is None:
+        _geo_resolver = GeoResolver()
+    return _geo_resolver
+
+
+def score_page(content: str) -> Dict[str, int]:
+    """Count investment-relevant signals on a page"""
+    return {
+        'currency': len(CURRENCY_PATTERN.findall(content)),
+        'stage': len(STAGE_PATTERN.findall(content)),
+        'contact': len(CONTACT_PATTERN.findall(content)),
+        'sector': len(SECTOR_PATTERN.findall(content)),
+        'location': len(_get_geo_resolver().resolve_uncached(content)),
+    }
+
+
+def should_analyze(content: str, page_number: int, min_words: int) -> bool:
+    """
+    Decide whether a page is worth an LLM call.
+    The first page is always analyzed (it usually carries the company name);
+    other pages are skipped only when they are short or boilerplate and show no signals.
+    """
+    if page_number == 1:
+        return True
+
+    text = content.strip()
+    if BOILERPLATE_PATTERN.match(text):
+        return False
+    if sum(score_page(text).values()) > 0:
+        return True
+    return len(text.split()) >= min_words
@@ -0,0 +1,188 @@
+"""
+Process-Pool PDF Extraction
+Runs pdfplumber's CPU-bound layout analysis in a shared pool of worker processes
+"""
+
+import io
+import os
+import signal
+import threading
+import tempfile
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Union
+import PyPDF2
+import pdfplumber
+from config import Config
+
+PdfSource = Union[str, bytes]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def open_source(source: PdfSource):
+    """pdfplumber and PyPDF2 accept a path or a file-like object"""
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _init_worker(memory_limit_mb: int):
+    """Cap each worker's address space so one pathological deck cannot exhaust the host"""
+    if memory_limit_mb > 0:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+def extract_page_range(source: PdfSource, start: int, end: int, page_timeout: int) -> List[Dict[str, str]]:
+    """
+    Worker task: extract pages [start, end) with pdfplumber.
+    A page that times out, runs out of memory or fails falls back to PyPDF2.
+    """
+    pages_content = []
+    fallback_reader = None
+    use_alarm = page_timeout > 0 and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_page_timeout)
+
+    with pdfplumber.open(open_source(source)) as pdf:
+        for page_index in range(start, end):
+            try:
+                if use_alarm:
+                    signal.alarm(page_timeout)
+                try:
+                    text = pdf.pages[page_index].extract_text()
+                finally:
+                    if use_alarm:
+                        signal.alarm(0)
+            except Exception:
+                # Includes PageTimeout and MemoryError from the worker's address-space cap
+                if fallback_reader is None:
+                    fallback_reader = PyPDF2.PdfReader(open_source(source))
+                text = fallback_reader.pages[page_index].extract_text()
+
+            if text:
+                pages_content.append({
+                    'page_number': page_index + 1,
+                    'content': text.strip()
+                })
+            # Drop cached layout objects so memory stays flat across the range
+            pdf.pages[page_index].flush_cache()
+    return pages_content
+
+
+def _extract_range_with_pypdf2(source: PdfSource, start: int, end: int) -> List[Dict[str, str]]:
+    reader = PyPDF2.PdfReader(open_source(source))
+    pages_content = []
+    for page_index in range(start, end):
+        text = reader.pages[page_index].extract_text()
+        if text:
+            pages_content.append({
+                'page_number': page_index + 1,
+                'content': text.strip()
+            })
+    return pages_content
+
+
+def count_pages(source: PdfSource) -> int:
+    return len(PyPDF2.PdfReader(open_source(source)).pages)
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all requests in this process, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(Config.PDF_EXTRACTION_MEMORY_LIMIT_MB,),
+                max_tasks_per_child=Config.PDF_EXTRACTION_TASKS_PER_CHILD or None,
+            )
+        return _pool
+
+
+def shutdown_extraction_pool(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+def iter_pages_in_pool(source: PdfSource, page_count: int) -> Iterator[Dict[str, str]]:
+    """
+    Spread page ranges across the shared pool and yield pages in order
+    as soon as each range (and every range before it) is done.
+    """
+    pool = get_extraction_pool()
+    pages_per_task = max(1, Config.PDF_PAGES_PER_TASK)
+    page_timeout = Config.PDF_EXTRACTION_PAGE_TIMEOUT
+
+    # Workers get a path, not the bytes: an in-memory upload is written to disk once
+    # instead of being pickled into every range task
+    temp_path = None
+    if isinstance(source, (bytes, bytearray)):
+        fd, temp_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(source)
+    task_source = temp_path or source
+
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    futures = [pool.submit(extract_page_range, task_source, start, end, page_timeout) for start, end in ranges]
+    try:
+        for (start, end), future in zip(ranges, futures):
+            try:
+                pages = future.result()
+            except Exception as e:
+                # Worker crashed or the pool broke: extract this range in-process with PyPDF2
+                if isinstance(e, BrokenProcessPool):
+                    shutdown_extraction_pool(wait=False)
+                print(f"⚠️ Pool extraction failed for pages {start + 1}-{end}, using PyPDF2: {e}")
+                try:
+                    pages = _extract_range_with_pypdf2(source, start, end)
+                except Exception as fallback_error:
+                    raise Exception(f"Failed to extract text from PDF: {str(fallback_error)}")
+            yield from pages
+    finally:
+        for future in futures:
+            future.cancel()
+        if temp_path:
+            _remove_when_done(temp_path, futures)
+
+
+def _remove_when_done(path: str, futures: List[Future]):
+    """Delete the file once every future has finished (a running task may still be reading it)"""
+    lock = threading.Lock()
+    remaining = [len(futures)]
+
+    def _remove():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _on_done(_future: Future):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            _remove()
+
+    if not futures:
+        _remove()
+    for future in futures:
+        future.add_done_callback(_on_done)
@@ -1,162 +1,134 @@
 import PyPDF2
 import pdfplumber
-from openai import OpenAI
 import json
 import re
-from typing import Dict, List, Optional
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 from config import Config
+from cache import TwoLevelCache, make_cache_key
+import pdf_extraction
+from pdf_extraction import PdfSource
+from page_triage import should_analyze
+from metrics import LLM_RETRIES, timed, timed_iter
+from llm_client import LLMUnavailableError, get_llm_client
+from llm_scheduler import get_llm_scheduler
+import prompts
+
+logger = logging.getLogger(__name__)
+
+# Fields returned for every analyzed page
+PAGE_FIELDS = [
+    "company_name", "company_website", "company_email", "sector", "location",
+    "stage", "check_size", "lead", "investment_theme"
+]
+
+# Bump when extraction or consolidation changes so cached deck results are not reused
+DECK_CACHE_VERSION = 'v1'
+
+# Bump when the page analysis prompt changes so cached page analyses are not reused
+PAGE_PROMPT_VERSION = 'v1'
 
 class PitchDeckParser:
     def __init__(self):
         if not Config.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY not found. Please set it in your .env file.")
         self.client = None
+        self.result_cache = TwoLevelCache(
+            'deck_results',
+            db_path=Config.DECK_CACHE_PATH,
+            max_entries=Config.DECK_CACHE_SIZE,
+            ttl=Config.DECK_CACHE_TTL,
+            max_disk_entries=Config.DECK_CACHE_DISK_SIZE,
+        )
+        self.page_cache = TwoLevelCache(
+            'page_analyses',
+            db_path=Config.PAGE_CACHE_PATH,
+            max_entries=Config.PAGE_CACHE_SIZE,
+            ttl=Config.PAGE_CACHE_TTL,
+            max_disk_entries=Config.PAGE_CACHE_DISK_SIZE,
+        )
     
     def _get_client(self):
         if self.client is None:
-            self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+            self.client = get_llm_client()
         return self.client
         
-    def extract_text_from_pdf(self, pdf_path: str) -> List[Dict[str, str]]:
-        """Extract text from each page of the PDF"""
-        pages_content = []
+    def iter_pages_from_pdf(self, pdf_source: PdfSource) -> Iterator[Dict[str, str]]:
+        """
+        Yield text from each page as soon as it is extracted.
+        pdf_source is a file path or the PDF's bytes.
+        Uses pdfplumber for better text extraction, falling back to PyPDF2 per page.
+        Large decks are laid out in the shared extraction process pool when it is enabled.
+        """
+        if Config.PDF_EXTRACTION_WORKERS > 0:
+            try:
+                page_count = pdf_extraction.count_pages(pdf_source)
+            except Exception:
+                page_count = 0
+            if page_count >= Config.PDF_PROCESS_POOL_MIN_PAGES:
+                yield from pdf_extraction.iter_pages_in_pool(pdf_source, page_count)
+                return
+        
+        pdf = None
+        fallback_reader = None
+        
+        def get_fallback_reader():
+            nonlocal fallback_reader
+            if fallback_reader is None:
+                fallback_reader = PyPDF2.PdfReader(pdf_extraction.open_source(pdf_source))
+            return fallback_reader
         
         try:
-            # Use pdfplumber for better text extraction
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    text = page.extract_text()
-                    if text:
-                        pages_content.append({
-                            'page_number': page_num,
-                            'content': text.strip()
-                        })
-        except Exception as e:
-            # Fallback to PyPDF2 if pdfplumber fails
             try:
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page_num, page in enumerate(pdf_reader.pages, 1):
-                        text = page.extract_text()
-                        if text:
-                            pages_content.append({
-                                'page_number': page_num,
-                                'content': text.strip()
-                            })
-            except Exception as fallback_error:
-                raise Exception(f"Failed to extract text from PDF: {str(fallback_error)}")
+                pdf = pdfplumber.open(pdf_extraction.open_source(pdf_source))
+                page_count = len(pdf.pages)
+            except Exception:
+                # pdfplumber cannot open the document: PyPDF2 handles every page
+                pdf = None
+                try:
+                    page_count = len(get_fallback_reader().pages)
+                except Exception as fallback_error:
+                    raise Exception(f"Failed to extract text from PDF: {str(fallback_error)}")
+            
+            for page_index in range(page_count):
+                try:
+                    if pdf is None:
+                        raise RuntimeError("pdfplumber unavailable for this document")
+                    text = pdf.pages[page_index].extract_text()
+                except Exception:
+                    # Fallback to PyPDF2 for this page only
+                    try:
+                        text = get_fallback_reader().pages[page_index].extract_text()
+                    except Exception as fallback_error:
+                        raise Exception(f"Failed to extract text from PDF: {str(fallback_error)}")
                 
-        return pages_content
+                if text:
+                    yield {
+                        'page_number': page_index + 1,
+                        'content': text.strip()
+                    }
+        finally:
+            if pdf is not None:
+                pdf.close()
+    
+    def extract_text_from_pdf(self, pdf_source: PdfSource) -> List[Dict[str, str]]:
+        """Extract text from each page of the PDF"""
+        return list(self.iter_pages_from_pdf(pdf_source))
     
     def analyze_page_content(self, page_content: str, page_number: int) -> Dict:
         """Use OpenAI to analyze a single page and extract investment information"""
-        
-        system_prompt = """You are an expert investment analyst. Analyze the provided pitch deck page content and extract ONLY the following specific investment information:
-
-        Extract ONLY these fields if present:
-        - company_name: Company name if mentioned
-        - company_website: Company website URL or domain if mentioned  
-        - company_email: Company contact email if mentioned
-        - sector: Industry sector or vertical (FinTech, HealthTech, EdTech, etc.)
-        - location: Company location or headquarters (countries, cities, regions)
-        - stage: Investment stage (Pre-seed, Seed, Series A, Series B, Series C, etc.)
-        - check_size: Investment amount or funding goal (in USD)
-        - lead: Lead investor type or investment firm mentioned. Use one of these categories:
-          * "Lead Investor" - if they lead investment rounds
-          * "Co-Investor" - if they co-invest alongside other firms
-          * "Both (Lead & Co-Investor)" - if they can do both roles
-          * Specific firm name if mentioned (e.g., "Acme Ventures")
-          * "Unknown" if not specified
-        - investment_theme: Primary investment theme or focus area. Choose the MOST RELEVANT single theme or maximum 2 themes.
-        
-          **STANDARDIZED HEALTHCARE THEMES (use these exact terms):**
-          * Digital Health: AI in Healthcare, Remote Patient Monitoring, Digital Therapeutics, Telemedicine & Virtual Care, Health & Wellness Apps
-          * MedTech: Medical Devices, Imaging & Diagnostics, Surgical Robotics, Wearable Health Devices
-          * Biotech & Pharma: Precision Medicine, Gene Therapy, Drug Discovery & Development, Biomanufacturing
-          * Healthcare Services & Delivery: Value-Based Care, Mental & Behavioral Health, Elder Care & Aging Tech, Women's Health & FemTech
-          * Healthcare IT & Infrastructure: Interoperability & EHR, Data Analytics & AI, Cybersecurity for Healthcare, Clinical Workflow Automation
-          * Insurance & Fintech in Healthcare: Value-Based Payment Models, AI in Underwriting, Healthcare Revenue Cycle Management
-          * Longevity & Emerging Trends: Longevity & Anti-Aging, Psychedelic Medicine, Regenerative Medicine
-          
-          **OTHER TECHNOLOGY THEMES:**
-          * FinTech, EdTech, B2B SaaS, AI/ML, Cybersecurity, E-commerce, Mobile Apps
-          
-          **INDUSTRY THEMES:**
-          * CleanTech, AgTech, FoodTech, Supply Chain, Manufacturing, Energy
-          
-          **EMERGING THEMES:**
-          * Web3, Blockchain, AR/VR, Robotics, Climate Tech
-          
-          IMPORTANT: Use only 1-2 most specific and relevant themes. For healthcare companies, use the standardized healthcare themes above.
-          Good: "Digital Health" or "MedTech" or "FinTech, B2B SaaS"
-          Bad: "Digital Health, AI, Healthcare Services, Analytics" (too many overlapping themes)
-        
-        Return ONLY a valid JSON object with the extracted information. If information is not found, use null for that field.
-        Do not include any explanatory text, only the JSON response.
-        
-        Example responses:
-        {
-            "company_name": "HealthTech Solutions",
-            "company_website": "www.healthtechsolutions.com",
-            "company_email": "contact@healthtechsolutions.com",
-            "sector": "HealthTech",
-            "location": "Boston, MA",
-            "stage": "Series A",
-            "check_size": "$5M",
-            "lead": "Lead Investor",
-            "investment_theme": "Digital Health"
-        }
-        
-        {
-            "company_name": "BioMed Innovations",
-            "company_website": "www.biomedinnovations.com",
-            "company_email": "info@biomedinnovations.com",
-            "sector": "Biotechnology",
-            "location": "San Diego, CA",
-            "stage": "Seed",
-            "check_size": "$2M",
-            "lead": "Co-Investor",
-            "investment_theme": "Biotech & Pharma"
-        }
-        
-        {
-            "company_name": "MedDevice Corp",
-            "company_website": "www.meddevicecorp.com",
-            "company_email": "info@meddevicecorp.com",
-            "sector": "Medical Technology",
-            "location": "Minneapolis, MN",
-            "stage": "Series B",
-            "check_size": "$15M",
-            "lead": "Both (Lead & Co-Investor)",
-            "investment_theme": "MedTech"
-        }"""
-        
-        user_prompt = f"""Analyze this pitch deck page content and extract investment information:
-
-        Page {page_number} Content:
-        {page_content}
-        
-        IMPORTANT: For investment_theme, identify the PRIMARY theme only (maximum 2 themes). Focus on:
-        - Use the STANDARDIZED HEALTHCARE THEMES for healthcare companies (Digital Health, MedTech, Biotech & Pharma, Healthcare Services & Delivery, Healthcare IT & Infrastructure, Insurance & Fintech in Healthcare, Longevity & Emerging Trends)
-        - For non-healthcare: use Technology, Industry, or Emerging themes
-        - Avoid redundant or overlapping themes
-        - Be concise and specific
-        
-        Examples of GOOD themes: "Digital Health", "MedTech", "FinTech", "B2B SaaS"
-        Examples of BAD themes: "Digital Health, AI, Healthcare Services, Analytics" (too verbose and overlapping)
-        
-        Extract the investment information as JSON:"""
-        
         try:
-            response = self._get_client().chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=500
-            )
+            with timed('page_llm'):
+                response = self._get_client().complete(
+                    'page',
+                    model="gpt-4o-mini",
+                    messages=prompts.page_messages(page_content, page_number),
+                    temperature=0.1,
+                    max_tokens=500,
+                    timeout=Config.PAGE_ANALYSIS_TIMEOUT
+                )
             
             content = response.choices[0].message.content.strip()
             
@@ -174,6 +146,175 @@ class PitchDeckParser:
         except Exception as e:
             return {"error": f"OpenAI API error: {str(e)}"}
     
+    @staticmethod
+    def _page_cache_key(content: str) -> str:
+        # Whitespace differences between deck versions should not defeat the cache
+        return make_cache_key(PAGE_PROMPT_VERSION, *prompts.prompt_cache_parts(), ' '.join(content.split()))
+    
+    def _store_page_analysis(self, page: Dict, analysis: Dict):
+        if isinstance(analysis, dict) and 'error' not in analysis:
+            self.page_cache.set(self._page_cache_key(page['content']), analysis)
+    
+    def _prefilter_pages(self, pages_content: Iterable[Dict], ready: List[Dict]) -> Iterator[Dict]:
+        """
+        Pass through only the pages that still need the LLM.
+        Pages answered by the page cache, or skipped by triage, are appended to `ready`.
+        """
+        for page in pages_content:
+            cached = self.page_cache.get(self._page_cache_key(page['content']))
+            if cached is not None:
+                ready.append({"page_number": page['page_number'], "analysis": cached})
+            elif Config.PAGE_TRIAGE_ENABLED and not should_analyze(page['content'], page['page_number'], Config.PAGE_TRIAGE_MIN_WORDS):
+                print(f"⏭️ Skipping low-information page {page['page_number']}")
+                ready.append({"page_number": page['page_number'], "analysis": {"skipped": "low-information page"}})
+            else:
+                yield page
+    
+    def _analyze_page_safely(self, page: Dict) -> Dict:
+        """Analyze one page, turning any failure into an error result for that page only"""
+        try:
+            analysis = self.analyze_page_content(page['content'], page['page_number'])
+            self._store_page_analysis(page, analysis)
+        except Exception as e:
+            analysis = {"error": f"Page analysis failed: {str(e)}"}
+        return {
+            "page_number": page['page_number'],
+            "analysis": analysis
+        }
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Local token count (see prompts.count_tokens)"""
+        return prompts.count_tokens(text)
+    
+    def _pack_pages(self, pages_content: Iterable[Dict]) -> Iterator[List[Dict]]:
+        """Greedily group consecutive pages into packs that fit the packed token budget"""
+        current = []
+        current_tokens = 0
+        for page in pages_content:
+            page_tokens = self._estimate_tokens(prompts.prepare_page_text(page['content'])) + 10  # page marker overhead
+            if current and (current_tokens + page_tokens > Config.PACKED_PAGE_TOKEN_BUDGET
+                            or len(current) >= Config.PACKED_MAX_PAGES):
+                yield current
+                current = []
+                current_tokens = 0
+            current.append(page)
+            current_tokens += page_tokens
+        if current:
+            yield current
+    
+    def analyze_pages_packed(self, pages: List[Dict]) -> List[Dict]:
+        """
+        Analyze several pages in one request and return per-page results.
+        Pages missing from the response (or a failed request) fall back to per-page analysis.
+        """
+        if len(pages) == 1:
+            return [self._analyze_page_safely(pages[0])]
+        
+        page_results = {}
+        try:
+            with timed('packed_page_llm'):
+                response = self._get_client().complete(
+                    'packed_pages',
+                    model="gpt-4o-mini",
+                    messages=prompts.packed_page_messages(pages),
+                    temperature=0.1,
+                    max_tokens=200 * len(pages) + 100,
+                    response_format={"type": "json_object"},
+                    timeout=Config.PAGE_ANALYSIS_TIMEOUT * 2
+                )
+            content = response.choices[0].message.content.strip()
+            for entry in json.loads(content).get('pages', []):
+                if isinstance(entry, dict) and 'page_number' in entry:
+                    page_results[int(entry['page_number'])] = {
+                        field: entry.get(field) for field in PAGE_FIELDS
+                    }
+            for page in pages:
+                if page['page_number'] in page_results:
+                    self._store_page_analysis(page, page_results[page['page_number']])
+        except LLMUnavailableError as e:
+            # Already retried; splitting into per-page calls would only add load to a throttled API
+            print(f"⚠️ Packed analysis unavailable for pages {[page['page_number'] for page in pages]}: {e}")
+            return [
+                {"page_number": page['page_number'], "analysis": {"error": f"OpenAI API error: {e}"}}
+                for page in pages
+            ]
+        except Exception as e:
+            print(f"⚠️ Packed analysis failed for pages {[page['page_number'] for page in pages]}: {e}")
+        
+        missing = [page for page in pages if page['page_number'] not in page_results]
+        if missing:
+            LLM_RETRIES.inc(len(missing), purpose='packed_pages')
+        
+        results = []
+        for page in pages:
+            if page['page_number'] in page_results:
+                results.append({
+                    "page_number": page['page_number'],
+                    "analysis": page_results[page['page_number']]
+                })
+            else:
+                results.append(self._analyze_page_safely(page))
+        return results
+    
+    @staticmethod
+    def _reporting_page_progress(analyze_pack: Callable[[List[Dict]], List[Dict]], ready: List[Dict],
+                                 progress: Callable[..., None]) -> Callable[[List[Dict]], List[Dict]]:
+        """Wrap a pack analyzer so every finished pack reports the running pages_analyzed count"""
+        lock = threading.Lock()
+        analyzed_count = 0
+        
+        def analyze_and_report(pack: List[Dict]) -> List[Dict]:
+            nonlocal analyzed_count
+            results = analyze_pack(pack)
+            with lock:
+                analyzed_count += len(results)
+                progress(pages_analyzed=len(ready) + analyzed_count)
+            return results
+        return analyze_and_report
+    
+    def analyze_pages(self, pages_content: Iterable[Dict], mode: Optional[str] = None,
+                      progress: Optional[Callable[..., None]] = None) -> List[Dict]:
+        """
+        Analyze pages concurrently, returning results in page order.
+        Pages may be a stream: each page (or pack) is submitted as soon as it is yielded,
+        so analysis overlaps with extraction of later pages. Cached and low-information
+        pages never reach the LLM.
+        mode: 'per_page' (one request per page) or 'packed' (several pages per request)
+        progress: optional callback, called as progress(pages_analyzed=n) as pages finish
+        """
+        ready = []
+        pages_content = self._prefilter_pages(pages_content, ready)
+        
+        mode = mode or Config.PAGE_EXTRACTION_MODE
+        if mode == 'packed':
+            packs = self._pack_pages(pages_content)
+            analyze_pack = self.analyze_pages_packed
+        else:
+            packs = ([page] for page in pages_content)
+            analyze_pack = lambda pack: [self._analyze_page_safely(pack[0])]
+        
+        if progress:
+            analyze_pack = self._reporting_page_progress(analyze_pack, ready, progress)
+        
+        # Packs go to the shared LLM scheduler as they arrive, at most PAGE_ANALYSIS_CONCURRENCY
+        # of this deck's at a time; futures are collected in submission (page) order
+        scheduler = get_llm_scheduler()
+        max_in_flight = max(1, Config.PAGE_ANALYSIS_CONCURRENCY)
+        futures, in_flight = [], set()
+        for pack in packs:
+            if len(in_flight) >= max_in_flight:
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            future = scheduler.submit(analyze_pack, pack)
+            futures.append(future)
+            in_flight.add(future)
+        pack_results = [future.result() for future in futures]
+        
+        analyzed = [result for results in pack_results for result in results]
+        if progress:
+            progress(pages_analyzed=len(ready) + len(analyzed))
+        return sorted(ready + analyzed, key=lambda result: result['page_number'])
+    
     def consolidate_information(self, pages_analysis: List[Dict]) -> Dict:
         """Consolidate information from all pages into a final summary"""
         
@@ -203,7 +344,7 @@ class PitchDeckParser:
             page_data = page_info.get('analysis', {})
             page_number = page_info.get('page_number', i + 1)
             
-            print(f"📄 Processing page {page_number}: {page_data}")  # Debug log
+            logger.debug("📄 Processing page %s: %s", page_number, page_data)
             
             if isinstance(page_data, dict) and "error" not in page_data:
                 for key, value in page_data.items():
@@ -213,14 +354,14 @@ class PitchDeckParser:
                             'page_number': page_number,
                             'is_latest': page_number == len(pages_analysis)  # Mark if this is from the last page
                         })
-                        print(f"  ➕ Added {key}: '{value}' from page {page_number}")
+                        logger.debug("  ➕ Added %s: '%s' from page %s", key, value, page_number)
         
         # Smart selection: prioritize latest pages and current mentions
         for field, candidates in field_candidates.items():
             if not candidates:
                 continue
                 
-            print(f"🔍 Field '{field}' candidates: {candidates}")  # Debug log
+            logger.debug("🔍 Field '%s' candidates: %s", field, candidates)
                 
             best_candidate = None
             
@@ -229,37 +370,76 @@ class PitchDeckParser:
             if current_mentions:
                 # Among current mentions, pick the latest page
                 best_candidate = max(current_mentions, key=lambda x: x['page_number'])
-                print(f"✅ '{field}': Chose CURRENT mention: {best_candidate}")
+                logger.debug("✅ '%s': Chose CURRENT mention: %s", field, best_candidate)
             else:
                 # Priority 2: Latest page with non-null value
                 best_candidate = max(candidates, key=lambda x: x['page_number'])
-                print(f"✅ '{field}': Chose LATEST page: {best_candidate}")
+                logger.debug("✅ '%s': Chose LATEST page: %s", field, best_candidate)
             
             if best_candidate:
                 consolidated[field] = best_candidate['value']
         
         return consolidated
     
-    def parse_pitch_deck(self, pdf_path: str) -> Dict:
-        """Main method to parse pitch deck and extract investment information"""
+    @staticmethod
+    def _deck_cache_settings() -> List:
+        """Every setting that changes which pages reach the LLM or what it is asked"""
+        settings = [
+            PAGE_PROMPT_VERSION,
+            Config.PAGE_EXTRACTION_MODE,
+            Config.PAGE_TRIAGE_ENABLED,
+            Config.PAGE_TRIAGE_MIN_WORDS if Config.PAGE_TRIAGE_ENABLED else None,
+        ]
+        if Config.PAGE_EXTRACTION_MODE == 'packed':
+            settings += [Config.PACKED_PAGE_TOKEN_BUDGET, Config.PACKED_MAX_PAGES]
+        if Config.PAGE_EXTRACTION_MODE == 'packed' or prompts.prompt_mode() == 'compact':
+            # Token counts decide pack boundaries and where compact page text is cut
+            settings.append(Config.TOKENIZER_ENCODING)
+        return settings + list(prompts.prompt_cache_parts())
+    
+    def _deck_cache_key(self, content_hash: str) -> str:
+        # Extraction settings change the result, so they are part of the key
+        return make_cache_key(DECK_CACHE_VERSION, content_hash, *self._deck_cache_settings())
+    
+    @staticmethod
+    def _report_extracted(pages: Iterable[Dict], progress: Callable[..., None]) -> Iterator[Dict]:
+        for pages_extracted, page in enumerate(pages, 1):
+            progress(pages_extracted=pages_extracted)
+            yield page
+    
+    def parse_pitch_deck(self, pdf_source: PdfSource, content_hash: Optional[str] = None,
+                         progress: Optional[Callable[..., None]] = None) -> Dict:
+        """
+        Main method to parse pitch deck and extract investment information.
+        pdf_source is a file path or the PDF's bytes; when content_hash (SHA-256 of the bytes)
+        is given, consolidated results are cached by it so a re-upload skips extraction.
+        progress: optional callback receiving stage / pages_extracted / pages_analyzed updates
+        """
         try:
-            # Extract text from PDF
-            pages_content = self.extract_text_from_pdf(pdf_path)
+            if content_hash:
+                cached = self.result_cache.get(self._deck_cache_key(content_hash))
+                if cached is not None:
+                    print(f"♻️ Deck result cache hit for {content_hash[:12]}")
+                    if progress:
+                        progress(stage='parsing_cached')
+                    return dict(cached)
             
-            if not pages_content:
-                return {"error": "No text content found in PDF"}
+            # Stream pages from the PDF straight into concurrent analysis (results stay in page order)
+            pages = timed_iter(self.iter_pages_from_pdf(pdf_source), 'extract')
+            if progress:
+                progress(stage='analyzing_pages', pages_extracted=0, pages_analyzed=0)
+                pages = self._report_extracted(pages, progress)
+            with timed('page_analysis'):
+                pages_analysis = self.analyze_pages(pages, progress=progress)
             
-            # Analyze each page
-            pages_analysis = []
-            for page in pages_content:
-                analysis = self.analyze_page_content(page['content'], page['page_number'])
-                pages_analysis.append({
-                    "page_number": page['page_number'],
-                    "analysis": analysis
-                })
+            if not pages_analysis:
+                return {"error": "No text content found in PDF"}
             
             # Consolidate information
-            final_result = self.consolidate_information(pages_analysis)
+            with timed('consolidate'):
+                final_result = self.consolidate_information(pages_analysis)
+            if content_hash and not any('error' in page['analysis'] for page in pages_analysis):
+                self.result_cache.set(self._deck_cache_key(content_hash), dict(final_result))
             return final_result
             
         except Exception as e:
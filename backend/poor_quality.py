@@ -0,0 +1,85 @@
+"""
+Poor-Quality Value Detection
+Recognises placeholder field values ("Unknown", "N/A", "TBD", ...) with one
+Aho-Corasick automaton over the configured indicator set, in a single pass per value
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+from config import Config
+
+
+class MultiPatternMatcher:
+    """
+    Aho-Corasick automaton: finds whether any of a set of substrings occurs in a
+    text in one left-to-right pass, however many patterns there are.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted({pattern for pattern in patterns if pattern})
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]  # a pattern ending at this state (or via its fail chain)
+
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state] = pattern
+
+        # Breadth-first failure links; a state inherits the output of its fail state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def find_first(self, text: str) -> Optional[str]:
+        """The first indicator found in the text (by end position), or None"""
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+    def search(self, text: str) -> bool:
+        return self.find_first(text) is not None
+
+
+_matcher: Optional[MultiPatternMatcher] = None
+
+
+def get_matcher() -> MultiPatternMatcher:
+    """Automaton over Config.POOR_QUALITY_INDICATORS, built on first use"""
+    global _matcher
+    if _matcher is None:
+        _matcher = MultiPatternMatcher(indicator.lower() for indicator in Config.POOR_QUALITY_INDICATORS)
+    return _matcher
+
+
+def find_poor_quality_indicator(value: Any) -> Optional[str]:
+    """The indicator that marks the value as poor quality, or None if it looks usable"""
+    return get_matcher().find_first(str(value).lower().strip())
+
+
+def is_poor_quality(value: Any) -> bool:
+    """Empty values and values containing any configured indicator are poor quality"""
+    if not value:
+        return True
+    value_str = str(value).lower().strip()
+    return value_str == '' or get_matcher().search(value_str)
@@ -0,0 +1,362 @@
+"""
+Prompt Layer
+Builds the messages for page analysis and semantic comparison in one of two modes:
+
+- full: the original verbose prompts
+- compact: one static system prompt per task, byte-identical on every call (single
+  page, packed pages, single and batched comparisons alike) so it forms a prefix the
+  provider's prompt cache can reuse; the field taxonomy is kept in compact form, only
+  the variable part goes in the user message, and page text is condensed to
+  PAGE_TEXT_TOKEN_BUDGET tokens
+"""
+
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from config import Config
+
+try:
+    import tiktoken
+except ImportError:  # optional: token counts fall back to ~4 characters per token
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+PROMPT_MODES = ('full', 'compact')
+
+Message = Dict[str, str]
+
+# --- full mode ----------------------------------------------------------------
+
+PAGE_ANALYSIS_SYSTEM_PROMPT = """You are an expert investment analyst. Analyze the provided pitch deck page content and extract ONLY the following specific investment information:
+
+        Extract ONLY these fields if present:
+        - company_name: Company name if mentioned
+        - company_website: Company website URL or domain if mentioned  
+        - company_email: Company contact email if mentioned
+        - sector: Industry sector or vertical (FinTech, HealthTech, EdTech, etc.)
+        - location: Company location or headquarters (countries, cities, regions)
+        - stage: Investment stage (Pre-seed, Seed, Series A, Series B, Series C, etc.)
+        - check_size: Investment amount or funding goal (in USD)
+        - lead: Lead investor type or investment firm mentioned. Use one of these categories:
+          * "Lead Investor" - if they lead investment rounds
+          * "Co-Investor" - if they co-invest alongside other firms
+          * "Both (Lead & Co-Investor)" - if they can do both roles
+          * Specific firm name if mentioned (e.g., "Acme Ventures")
+          * "Unknown" if not specified
+        - investment_theme: Primary investment theme or focus area. Choose the MOST RELEVANT single theme or maximum 2 themes.
+        
+          **STANDARDIZED HEALTHCARE THEMES (use these exact terms):**
+          * Digital Health: AI in Healthcare, Remote Patient Monitoring, Digital Therapeutics, Telemedicine & Virtual Care, Health & Wellness Apps
+          * MedTech: Medical Devices, Imaging & Diagnostics, Surgical Robotics, Wearable Health Devices
+          * Biotech & Pharma: Precision Medicine, Gene Therapy, Drug Discovery & Development, Biomanufacturing
+          * Healthcare Services & Delivery: Value-Based Care, Mental & Behavioral Health, Elder Care & Aging Tech, Women's Health & FemTech
+          * Healthcare IT & Infrastructure: Interoperability & EHR, Data Analytics & AI, Cybersecurity for Healthcare, Clinical Workflow Automation
+          * Insurance & Fintech in Healthcare: Value-Based Payment Models, AI in Underwriting, Healthcare Revenue Cycle Management
+          * Longevity & Emerging Trends: Longevity & Anti-Aging, Psychedelic Medicine, Regenerative Medicine
+          
+          **OTHER TECHNOLOGY THEMES:**
+          * FinTech, EdTech, B2B SaaS, AI/ML, Cybersecurity, E-commerce, Mobile Apps
+          
+          **INDUSTRY THEMES:**
+          * CleanTech, AgTech, FoodTech, Supply Chain, Manufacturing, Energy
+          
+          **EMERGING THEMES:**
+          * Web3, Blockchain, AR/VR, Robotics, Climate Tech
+          
+          IMPORTANT: Use only 1-2 most specific and relevant themes. For healthcare companies, use the standardized healthcare themes above.
+          Good: "Digital Health" or "MedTech" or "FinTech, B2B SaaS"
+          Bad: "Digital Health, AI, Healthcare Services, Analytics" (too many overlapping themes)
+        
+        Return ONLY a valid JSON object with the extracted information. If information is not found, use null for that field.
+        Do not include any explanatory text, only the JSON response.
+        
+        Example responses:
+        {
+            "company_name": "HealthTech Solutions",
+            "company_website": "www.healthtechsolutions.com",
+            "company_email": "contact@healthtechsolutions.com",
+            "sector": "HealthTech",
+            "location": "Boston, MA",
+            "stage": "Series A",
+            "check_size": "$5M",
+            "lead": "Lead Investor",
+            "investment_theme": "Digital Health"
+        }
+        
+        {
+            "company_name": "BioMed Innovations",
+            "company_website": "www.biomedinnovations.com",
+            "company_email": "info@biomedinnovations.com",
+            "sector": "Biotechnology",
+            "location": "San Diego, CA",
+            "stage": "Seed",
+            "check_size": "$2M",
+            "lead": "Co-Investor",
+            "investment_theme": "Biotech & Pharma"
+        }
+        
+        {
+            "company_name": "MedDevice Corp",
+            "company_website": "www.meddevicecorp.com",
+            "company_email": "info@meddevicecorp.com",
+            "sector": "Medical Technology",
+            "location": "Minneapolis, MN",
+            "stage": "Series B",
+            "check_size": "$15M",
+            "lead": "Both (Lead & Co-Investor)",
+            "investment_theme": "MedTech"
+        }"""
+
+PACKED_PAGES_INSTRUCTIONS = """
+
+        MULTI-PAGE MODE: You will receive several pages at once, each starting with a "=== Page N ===" marker.
+        Analyze every page independently using only that page's content, exactly as you would a single page.
+        Return ONLY a JSON object of the form {"pages": [{"page_number": N, ...fields}, ...]} with one entry per page, in page order."""
+
+# Shared by single and batched semantic comparison prompts
+SEMANTIC_MATCHING_RULES = """Consider these specific matching rules:
+            
+            For LOCATION fields:
+            - "Global" matches ANY location (US, Europe, Asia, etc.)
+            - "Worldwide" matches ANY location
+            - "International" matches ANY location
+            - Geographic regions can match specific countries within them
+            - Country codes (US, UK) match full country names (United States, United Kingdom)
+            
+            For STAGE fields:
+            - "Early stage" includes: seed, pre-seed, series-a
+            - "Late stage" includes: series-b, series-c, series-d, growth
+            - "Growth" matches "expansion" or "scale-up"
+            - Specific stages can match broader categories that contain them
+            
+            For SECTOR fields:
+            - Related industries (fintech matches financial services)
+            - Technology subcategories (AI matches machine learning, artificial intelligence)
+            - Broader categories include specific ones (healthcare includes medtech, biotech)
+            
+            For CHECK_SIZE fields:
+            - Overlapping ranges are matches (1-5M matches 2-10M)
+            - Different formats of same amount ($1M matches $1,000,000)
+            
+            Also consider:
+            - Synonyms and related terms
+            - Industry standard terminology
+            - Abbreviations and full forms"""
+
+# --- compact mode -------------------------------------------------------------
+
+COMPACT_PAGE_SYSTEM_PROMPT = """You are an investment analyst extracting facts from pitch deck pages. Reply with minified JSON only; use null for anything the page does not state.
+
+Fields:
+company_name
+company_website: URL or domain
+company_email
+sector: industry or vertical, e.g. FinTech, HealthTech, EdTech
+location: headquarters city, country or region
+stage: Pre-seed, Seed, Series A, Series B, Series C, ...
+check_size: amount raised or sought, in USD, e.g. "$5M"
+lead: "Lead Investor", "Co-Investor", "Both (Lead & Co-Investor)", a named firm, or "Unknown"
+investment_theme: the 1-2 most specific themes below, exact wording; healthcare companies use a Healthcare theme
+
+Themes:
+Healthcare: Digital Health (AI in healthcare, remote monitoring, digital therapeutics, telemedicine, wellness apps) | MedTech (devices, imaging & diagnostics, surgical robotics, wearables) | Biotech & Pharma (precision medicine, gene therapy, drug discovery, biomanufacturing) | Healthcare Services & Delivery (value-based care, mental health, elder care, women's health) | Healthcare IT & Infrastructure (EHR & interoperability, health data & AI, healthcare cybersecurity, clinical workflow) | Insurance & Fintech in Healthcare (value-based payment, AI underwriting, revenue cycle) | Longevity & Emerging Trends (anti-aging, psychedelic medicine, regenerative medicine)
+Technology: FinTech | EdTech | B2B SaaS | AI/ML | Cybersecurity | E-commerce | Mobile Apps
+Industry: CleanTech | AgTech | FoodTech | Supply Chain | Manufacturing | Energy
+Emerging: Web3 | Blockchain | AR/VR | Robotics | Climate Tech
+Good: "Digital Health"; "FinTech, B2B SaaS". Bad: "Digital Health, AI, Healthcare Services, Analytics".
+
+One page: {"company_name":...,"company_website":...,"company_email":...,"sector":...,"location":...,"stage":...,"check_size":...,"lead":...,"investment_theme":...}
+Pages marked "=== Page N ===": {"pages":[{"page_number":N,...same fields}]}, one entry per page in order, each using only its own page's text."""
+
+COMPACT_SEMANTIC_SYSTEM_PROMPT = """You decide whether fund criteria values are semantically similar or related to a pitch deck value.
+
+Rules:
+location: Global, Worldwide and International match any location; regions match countries within them; codes match names (US = United States, UK = United Kingdom)
+stage: Early stage = pre-seed, seed, series-a; Late stage = series-b, series-c, series-d, growth; Growth = expansion, scale-up; a specific stage matches a broader category containing it
+sector: related industries match (fintech ~ financial services); subcategories match (AI ~ machine learning); broader categories include specific ones (healthcare includes medtech, biotech)
+check_size: overlapping ranges match (1-5M ~ 2-10M); the same amount in another format matches ($1M = $1,000,000)
+Also accept synonyms, industry terminology, abbreviations and full forms.
+
+One fund value: reply MATCH or NO_MATCH.
+Numbered fund values: reply {"matches":[numbers of the matching values]}."""
+
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+_SPACES = re.compile(r'[ \t\f\v]+')
+_CUT_MARKER = '\n[...]\n'
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def prompt_mode() -> str:
+    mode = (Config.PROMPT_MODE or 'full').lower()
+    if mode not in PROMPT_MODES:
+        raise ValueError(f"PROMPT_MODE must be one of {PROMPT_MODES}, got {mode!r}")
+    return mode
+
+
+def prompt_cache_parts(page_text: bool = True) -> Tuple[str, ...]:
+    """
+    Extra cache key parts for LLM answers, so switching to compact prompts (or changing
+    the page budget) does not reuse answers given to other prompts. Empty in full mode,
+    keeping existing cache entries valid.
+    """
+    if prompt_mode() == 'compact':
+        return ('compact', str(Config.PAGE_TEXT_TOKEN_BUDGET)) if page_text else ('compact',)
+    return ()
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    _encoding = tiktoken.get_encoding(Config.TOKENIZER_ENCODING)
+                except Exception as e:  # e.g. the encoding file cannot be downloaded
+                    _encoding_failed = True
+                    logger.warning("⚠️ Tokenizer %s unavailable, estimating tokens: %s", Config.TOKENIZER_ENCODING, e)
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Local token count: exact with tiktoken installed, else ~4 characters per token"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _truncate_tokens(text: str, tokens: int, from_end: bool = False) -> str:
+    encoding = _get_encoding()
+    if encoding is not None:
+        encoded = encoding.encode(text, disallowed_special=())
+        return encoding.decode(encoded[-tokens:] if from_end else encoded[:tokens])
+    chars = tokens * 4
+    return text[-chars:] if from_end else text[:chars]
+
+
+def condense_page_text(text: str, budget: Optional[int] = None) -> str:
+    """
+    Page text within `budget` tokens: whitespace collapsed and repeated lines
+    (headers, footers, slide furniture) dropped first, then the middle cut,
+    keeping the opening (titles, names) and the last fifth (contact details).
+    """
+    budget = Config.PAGE_TEXT_TOKEN_BUDGET if budget is None else budget
+    seen = set()
+    lines = []
+    for line in _BLANK_LINES.sub('\n', text).split('\n'):
+        line = _SPACES.sub(' ', line).strip()
+        if not line or line.lower() in seen:
+            continue
+        seen.add(line.lower())
+        lines.append(line)
+    condensed = '\n'.join(lines)
+    if budget <= 0 or count_tokens(condensed) <= budget:
+        return condensed
+    tail_tokens = budget // 5
+    head_tokens = max(0, budget - tail_tokens - count_tokens(_CUT_MARKER))
+    return (_truncate_tokens(condensed, head_tokens) + _CUT_MARKER
+            + _truncate_tokens(condensed, tail_tokens, from_end=True))
+
+
+def prepare_page_text(text: str) -> str:
+    """Page text as it will be sent: condensed in compact mode, unchanged in full mode"""
+    return condense_page_text(text) if prompt_mode() == 'compact' else text
+
+
+def page_messages(page_content: str, page_number: int) -> List[Message]:
+    if prompt_mode() == 'compact':
+        return [
+            {"role": "system", "content": COMPACT_PAGE_SYSTEM_PROMPT},
+            {"role": "user", "content": prepare_page_text(page_content)},
+        ]
+    system_prompt = PAGE_ANALYSIS_SYSTEM_PROMPT
+
+    user_prompt = f"""Analyze this pitch deck page content and extract investment information:
+
+        Page {page_number} Content:
+        {page_content}
+        
+        IMPORTANT: For investment_theme, identify the PRIMARY theme only (maximum 2 themes). Focus on:
+        - Use the STANDARDIZED HEALTHCARE THEMES for healthcare companies (Digital Health, MedTech, Biotech & Pharma, Healthcare Services & Delivery, Healthcare IT & Infrastructure, Insurance & Fintech in Healthcare, Longevity & Emerging Trends)
+        - For non-healthcare: use Technology, Industry, or Emerging themes
+        - Avoid redundant or overlapping themes
+        - Be concise and specific
+        
+        Examples of GOOD themes: "Digital Health", "MedTech", "FinTech", "B2B SaaS"
+        Examples of BAD themes: "Digital Health, AI, Healthcare Services, Analytics" (too verbose and overlapping)
+        
+        Extract the investment information as JSON:"""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def packed_page_messages(pages: List[Dict]) -> List[Message]:
+    """One request for several pages, each introduced by a "=== Page N ===" marker"""
+    pages_text = "\n\n".join(
+        f"=== Page {page['page_number']} ===\n{prepare_page_text(page['content'])}" for page in pages
+    )
+    if prompt_mode() == 'compact':
+        return [
+            {"role": "system", "content": COMPACT_PAGE_SYSTEM_PROMPT},
+            {"role": "user", "content": pages_text},
+        ]
+    system_prompt = PAGE_ANALYSIS_SYSTEM_PROMPT + PACKED_PAGES_INSTRUCTIONS
+    user_prompt = f"""Analyze each of these pitch deck pages and extract investment information per page:
+
+        {pages_text}
+        
+        IMPORTANT: For investment_theme, identify the PRIMARY theme only (maximum 2 themes), using the STANDARDIZED HEALTHCARE THEMES for healthcare companies.
+        
+        Return the per-page investment information as JSON:"""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def semantic_messages(field_name: str, pitch_value: str, fund_value: str) -> List[Message]:
+    if prompt_mode() == 'compact':
+        return [
+            {"role": "system", "content": COMPACT_SEMANTIC_SYSTEM_PROMPT},
+            {"role": "user", "content": f'Pitch deck {field_name}: "{pitch_value}"\nFund {field_name}: "{fund_value}"'},
+        ]
+    prompt = f"""
+            Compare these two {field_name} values and determine if they are semantically similar or related:
+            
+            Pitch deck {field_name}: "{pitch_value}"
+            Fund {field_name}: "{fund_value}"
+            
+            {SEMANTIC_MATCHING_RULES}
+            
+            Respond with only "MATCH" or "NO_MATCH"
+            """
+    return [{"role": "user", "content": prompt}]
+
+
+def semantic_batch_messages(field_name: str, pitch_value: str, fund_values: List[str]) -> List[Message]:
+    if prompt_mode() == 'compact':
+        numbered = "\n".join(f'{i}. "{value}"' for i, value in enumerate(fund_values, 1))
+        return [
+            {"role": "system", "content": COMPACT_SEMANTIC_SYSTEM_PROMPT},
+            {"role": "user", "content": f'Pitch deck {field_name}: "{pitch_value}"\nFund {field_name} values:\n{numbered}'},
+        ]
+    numbered_values = "\n".join(f'            {i}. "{value}"' for i, value in enumerate(fund_values, 1))
+    prompt = f"""
+            Compare the pitch deck {field_name} value with each numbered fund {field_name} value and determine which are semantically similar or related:
+            
+            Pitch deck {field_name}: "{pitch_value}"
+            
+            Fund {field_name} values:
+{numbered_values}
+            
+            {SEMANTIC_MATCHING_RULES}
+            
+            Respond with only a JSON object of the form {{"matches": [numbers of the matching fund values]}}
+            """
+    return [{"role": "user", "content": prompt}]
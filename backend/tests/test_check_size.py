@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from check_size import INFINITY, CheckSizeIndex, parse_check_size
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('$1-5M, Europe focus', (1e6, 5e6)),
+    ('1-5M, Europe focus', (1e6, 5e6)),
+    ('2M per decade', (2e6, 2e6)),
+    ('EUR 1-5M', (1.08e6, 5.4e6)),
+    ('€2M', (2.16e6, 2.16e6)),
+    ('us$500k', (5e5, 5e5)),
+])
+def test_currency_codes_only_match_whole_words(text, expected):
+    assert parse_check_size(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('$2M', (2e6, 2e6)),
+    ('1-5M', (1e6, 5e6)),
+    ('$500K–$3M', (5e5, 3e6)),
+    ('$250,000 - $1,000,000', (2.5e5, 1e6)),
+    ('1.5 million', (1.5e6, 1.5e6)),
+    ('up to $2M', (0.0, 2e6)),
+    ('$10M+', (1e7, INFINITY)),
+    ('£1M', (1.27e6, 1.27e6)),
+])
+def test_parse_check_size(text, expected):
+    assert parse_check_size(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('text', [None, '', 'Not available', 'flexible', '5', '1, 2 or 3M', 'Series A'])
+def test_parse_check_size_rejects_unclear_text(text):
+    assert parse_check_size(text) is None
+
+
+def test_overlapping_matches_a_full_scan():
+    rng = random.Random(7)
+    funds = []
+    for i in range(300):
+        low = rng.choice([0.1, 0.25, 0.5, 1, 2, 5, 10]) * 1e6
+        funds.append({'id': f'rec{i}', 'check_size': rng.choice([
+            f'${low:,.0f}', f'${low:,.0f} - ${low * rng.randint(2, 10):,.0f}',
+            f'up to ${low:,.0f}', f'${low:,.0f}+', 'Not available', '',
+        ])})
+    index = CheckSizeIndex()
+    index.build(funds)
+    intervals = {fund['id']: parse_check_size(fund['check_size']) for fund in funds}
+    assert index.parsed_ids() == {fund_id for fund_id, interval in intervals.items() if interval is not None}
+
+    for low, high in [(0, 1e5), (1e6, 1e6), (5e5, 3e6), (2e7, INFINITY), (0, INFINITY)]:
+        expected = {
+            fund_id for fund_id, interval in intervals.items()
+            if interval is not None and interval[0] <= high and interval[1] >= low
+        }
+        assert index.overlapping((low, high)) == expected
+
+
+def test_overlapping_follows_updates():
+    index = CheckSizeIndex()
+    index.build([{'id': 'a', 'check_size': '$1-2M'}, {'id': 'b', 'check_size': '$5M'}])
+    index.update([{'id': 'a', 'check_size': '$10M'}], removed_ids=['b'])
+    assert index.overlapping((1e6, 6e6)) == set()
+    assert index.overlapping((1e7, 1e7)) == {'a'}
@@ -0,0 +1,51 @@
+import re
+
+import pytest
+
+from fund_index import FundTokenIndex
+
+FUND_VALUES = [
+    'Seed, Series A', 'Pre-Seed', 'series a', 'Fintech & Insurtech', 'B2B SaaS', 'SaaS/B2B',
+    'US, Europe', 'Must have traction', 'New York City', 'new york', 'C++ tooling', '$1-5M',
+    '1-5M', 'AI / ML', 'AI', 'health-tech', 'Healthtech', '  Climate  ', '', 'None', '-', '...',
+]
+
+PITCH_VALUES = [
+    'seed', 'Series A', 'series', 'fintech', 'Fintech & Insurtech', 'b2b saas', 'saas', 'US', 'us',
+    'new york', 'york city', 'c++', '1-5m', '$1-5M', 'ai', 'AI / ML', 'ml', 'health', 'health-tech',
+    'climate', '-', '...', 'none', 'A', 'insurtech',
+]
+
+
+def regex_scan(funds, field, pitch_value):
+    """The literal tier before the index: a word-boundary regex over every fund"""
+    pitch_str = str(pitch_value).lower().strip()
+    pattern = r'\b' + re.escape(pitch_str) + r'\b'
+    matched = set()
+    for fund in funds:
+        fund_str = str(fund.get(field)).lower().strip()
+        if re.search(pattern, fund_str) or pitch_str == fund_str:
+            matched.add(fund['id'])
+    return matched
+
+
+@pytest.fixture(scope='module')
+def funds():
+    return [{'id': f'rec{i}', 'sector': value} for i, value in enumerate(FUND_VALUES)] + [{'id': 'missing'}]
+
+
+@pytest.mark.parametrize('pitch_value', PITCH_VALUES)
+def test_literal_matches_equal_the_regex_scan(funds, pitch_value):
+    index = FundTokenIndex(['sector'])
+    index.build(funds)
+    assert index.literal_matches('sector', pitch_value) == regex_scan(funds, 'sector', pitch_value)
+
+
+def test_literal_matches_follow_updates(funds):
+    index = FundTokenIndex(['sector'])
+    index.build(funds)
+    changed = [{'id': 'rec0', 'sector': 'Growth'}, {'id': 'new', 'sector': 'Seed'}]
+    index.update(changed, removed_ids=['rec1'])
+    current = [fund for fund in funds if fund['id'] not in ('rec0', 'rec1')] + changed
+    for pitch_value in ('seed', 'growth', 'pre-seed'):
+        assert index.literal_matches('sector', pitch_value) == regex_scan(current, 'sector', pitch_value)
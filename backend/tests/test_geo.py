@@ -0,0 +1,63 @@
+import pytest
+
+from geo import GLOBAL_NODE, GeoIndex, GeoResolver
+
+
+@pytest.fixture(scope='module')
+def resolver():
+    return GeoResolver()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Boston', {'city:boston'}),
+    ('Boston, MA, USA', {'city:boston'}),
+    ('Berlin, Germany', {'city:berlin'}),
+    ('US & UK', {'country:us', 'country:gb'}),
+    ('US, Europe', {'country:us', 'continent:europe'}),
+    ('Europe or North America', {'continent:europe', 'continent:north_america'}),
+    ('Global, Boston', {GLOBAL_NODE}),
+    ('Focus on trust and us', set()),
+    ('', set()),
+    (None, set()),
+])
+def test_resolve(resolver, text, expected):
+    assert resolver.resolve(text) == frozenset(expected)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Boston, MA', True),
+    ('San Francisco / New York', True),
+    ('Global, Mars', True),
+    ('Baltics, Boston', False),
+    ('Boston-based', False),
+    ('Mars', False),
+    ('', False),
+])
+def test_resolves_fully(resolver, text, expected):
+    assert resolver.resolves_fully(text) is expected
+
+
+def test_index_matches_containment_both_ways(resolver):
+    index = GeoIndex(resolver)
+    index.build([
+        {'id': 'europe', 'location': 'Europe'},
+        {'id': 'berlin', 'location': 'Berlin'},
+        {'id': 'boston', 'location': 'Boston'},
+        {'id': 'global', 'location': 'Global'},
+        {'id': 'unknown', 'location': 'Mars'},
+    ])
+    assert index.matching(resolver.resolve('Germany')) == {'europe', 'berlin', 'global'}
+    assert index.matching(resolver.resolve('Europe')) == {'europe', 'berlin', 'global'}
+    assert index.matching(resolver.resolve('USA')) == {'boston', 'global'}
+
+
+def test_partly_resolved_funds_are_left_undecided(resolver):
+    index = GeoIndex(resolver)
+    index.build([{'id': 'partial', 'location': 'Baltics, Boston'}, {'id': 'boston', 'location': 'Boston'}])
+    # A pitch in Estonia must not count as a mismatch for the partly resolved fund
+    assert index.matching(resolver.resolve('Estonia')) == set()
+    assert index.resolved_ids() == {'boston'}
+
+    index.update([{'id': 'partial', 'location': 'Tallinn, Boston'}], removed_ids=['boston'])
+    assert index.resolved_ids() == {'partial'}
+    assert index.matching(resolver.resolve('Estonia')) == {'partial'}
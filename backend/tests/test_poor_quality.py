@@ -0,0 +1,48 @@
+import pytest
+
+from poor_quality import MultiPatternMatcher, find_poor_quality_indicator, is_poor_quality
+
+# Indicator list of the substring loop the automaton replaced
+BASELINE_INDICATORS = [
+    'not identified', 'unknown', 'not available', 'no reliable',
+    'not a fit', 'location unknown', 'stage unknown', 'sector unknown',
+    'n/a', 'tbd', 'stage agnostic', 'no themes found',
+    'not available(no reliable check size data found).',
+]
+
+VALUES = [
+    'Seed', 'Series A', 'Unknown', 'Location unknown', '  N/A ', 'n/a', 'TBD', 'tbd.', 'Stage agnostic',
+    'Not available(no reliable check size data found).', 'No themes found', 'Not a fit for us',
+    'Not identified', 'Berlin', 'Fintech, Not Available', 'unknownst', 'notavailable', 'nota fit',
+    'San Francisco', 'Known unknowns', '$1-5M', 'n / a', 'Global', 'not identifie',
+]
+
+
+def baseline_is_poor_quality(value):
+    if not value:
+        return True
+    value_str = str(value).lower().strip()
+    for indicator in BASELINE_INDICATORS:
+        if indicator in value_str or value_str == '':
+            return True
+    return False
+
+
+@pytest.mark.parametrize('value', VALUES + ['', None, '   ', 0])
+def test_is_poor_quality_equals_the_substring_loop(value):
+    assert is_poor_quality(value) == baseline_is_poor_quality(value)
+
+
+@pytest.mark.parametrize('value', VALUES)
+def test_find_poor_quality_indicator_equals_the_substring_loop(value):
+    indicator = find_poor_quality_indicator(value)
+    assert (indicator is not None) == baseline_is_poor_quality(value)
+    if indicator is not None:
+        assert indicator in str(value).lower().strip()
+
+
+def test_matcher_finds_overlapping_patterns():
+    matcher = MultiPatternMatcher(['he', 'she', 'his', 'hers'])
+    assert matcher.find_first('ushers') == 'she'
+    assert matcher.find_first('ahis') == 'his'
+    assert matcher.find_first('hxrs') is None
@@ -0,0 +1,264 @@
+"""
+Record/Replay HTTP Transport
+Sits under the OpenAI (httpx) and Airtable (pyairtable/requests) clients.
+
+- passthrough: clients talk to the network exactly as before (nothing installed)
+- record: requests go to the network and every response is saved to a cassette store
+- replay: responses are served from the cassette store, offline, with recorded or
+  configured latency; an unrecorded request fails like a connection error
+"""
+
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import http.client
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from config import Config
+from cache import connect_sqlite
+from metrics import TRANSPORT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+MODES = ('passthrough', 'record', 'replay')
+
+# Headers describing the wire encoding of the original body; stored bodies are already decoded
+_WIRE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+# Request parts that change on every run but do not change the answer; blanked before keying
+_VOLATILE_PATTERNS = [
+    (re.compile(r"DATETIME_PARSE\('[^']*'\)"), "DATETIME_PARSE('*')"),  # incremental fund sync cut-off
+]
+
+
+class CassetteMiss(LookupError):
+    """Replay mode received a request that was never recorded"""
+
+
+def _canonical_body(body: Optional[bytes]) -> str:
+    if not body:
+        return ''
+    text = body.decode('utf-8', 'replace') if isinstance(body, bytes) else str(body)
+    try:
+        return json.dumps(json.loads(text), sort_keys=True, separators=(',', ':'))
+    except ValueError:
+        return text
+
+
+def request_key(service: str, method: str, url: str, body: Optional[bytes]) -> str:
+    """
+    Cassette key for a request: method, path, sorted query and canonical JSON body.
+    Scheme, host and headers (credentials) are left out, so a cassette recorded
+    against the real API replays against any endpoint URL.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    raw = '\n'.join([service, method.upper(), parts.path, query, _canonical_body(body)])
+    for pattern, replacement in _VOLATILE_PATTERNS:
+        raw = pattern.sub(replacement, raw)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _storable_headers(headers) -> Dict[str, str]:
+    return {name: value for name, value in headers.items() if name.lower() not in _WIRE_HEADERS}
+
+
+class CassetteStore:
+    """Recorded request/response pairs in SQLite, keyed by request_key"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cassette ("
+            " key TEXT PRIMARY KEY,"
+            " service TEXT NOT NULL,"
+            " method TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " request_body BLOB,"
+            " status INTEGER NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " latency REAL NOT NULL,"
+            " recorded_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[int, Dict[str, str], bytes, float]]:
+        """(status, headers, body, latency seconds) of a recorded response, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, latency FROM cassette WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, latency = row
+        return status, json.loads(headers), bytes(body), latency
+
+    def put(self, key: str, service: str, method: str, url: str, request_body: Optional[bytes],
+            status: int, headers: Dict[str, str], body: bytes, latency: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO cassette (key, service, method, url, request_body, status, headers, body, latency, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET status = excluded.status, headers = excluded.headers, "
+                "body = excluded.body, latency = excluded.latency, recorded_at = excluded.recorded_at",
+                (key, service, method, url, request_body, status, json.dumps(headers), body, latency, time.time())
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cassette").fetchone()[0]
+
+
+def replay_delay(recorded_latency: float) -> float:
+    """
+    Seconds to wait before serving a replayed response: the recorded latency
+    (scaled by HTTP_REPLAY_LATENCY_SCALE), or a fixed HTTP_REPLAY_LATENCY.
+    """
+    if Config.HTTP_REPLAY_LATENCY == 'recorded':
+        return recorded_latency * Config.HTTP_REPLAY_LATENCY_SCALE
+    return float(Config.HTTP_REPLAY_LATENCY)
+
+
+class RecordReplayTransport(httpx.BaseTransport):
+    """httpx transport for the OpenAI client"""
+
+    def __init__(self, service: str, store: CassetteStore, mode: str,
+                 inner: Optional[httpx.BaseTransport] = None):
+        self.service = service
+        self.store = store
+        self.mode = mode
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        key = request_key(self.service, request.method, str(request.url), body)
+
+        if self.mode == 'replay':
+            entry = self.store.get(key)
+            if entry is None:
+                TRANSPORT_REQUESTS.inc(service=self.service, outcome='miss')
+                raise httpx.ConnectError(
+                    f"No recorded response for {request.method} {request.url.path}", request=request
+                ) from CassetteMiss(key)
+            status, headers, content, latency = entry
+            time.sleep(replay_delay(latency))
+            TRANSPORT_REQUESTS.inc(service=self.service, outcome='replayed')
+            return httpx.Response(status, headers=headers, content=content, request=request)
+
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        latency = time.perf_counter() - started
+        headers = _storable_headers(response.headers)
+        self.store.put(key, self.service, request.method, str(request.url), body,
+                       response.status_code, headers, content, latency)
+        TRANSPORT_REQUESTS.inc(service=self.service, outcome='recorded')
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self):
+        self.inner.close()
+
+
+class RecordReplayAdapter(HTTPAdapter):
+    """requests adapter for the pyairtable session; keeps the session's retry policy"""
+
+    def __init__(self, service: str, store: CassetteStore, mode: str, **kwargs):
+        super().__init__(**kwargs)
+        self.service = service
+        self.store = store
+        self.mode = mode
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+        key = request_key(self.service, request.method, request.url, body)
+
+        if self.mode == 'replay':
+            entry = self.store.get(key)
+            if entry is None:
+                TRANSPORT_REQUESTS.inc(service=self.service, outcome='miss')
+                raise requests.exceptions.ConnectionError(
+                    f"No recorded response for {request.method} {urlsplit(request.url).path}", request=request
+                ) from CassetteMiss(key)
+            status, headers, content, latency = entry
+            time.sleep(replay_delay(latency))
+            TRANSPORT_REQUESTS.inc(service=self.service, outcome='replayed')
+            return self._replayed_response(request, status, headers, content)
+
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        content = response.content
+        self.store.put(key, self.service, request.method, request.url, body, response.status_code,
+                       _storable_headers(response.headers), content, time.perf_counter() - started)
+        TRANSPORT_REQUESTS.inc(service=self.service, outcome='recorded')
+        return response
+
+    def _replayed_response(self, request: requests.PreparedRequest, status: int,
+                           headers: Dict[str, str], content: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.reason = http.client.responses.get(status, '')
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+
+_store: Optional[CassetteStore] = None
+_store_lock = threading.Lock()
+
+
+def transport_mode() -> str:
+    mode = (Config.HTTP_TRANSPORT_MODE or 'passthrough').lower()
+    if mode not in MODES:
+        raise ValueError(f"HTTP_TRANSPORT_MODE must be one of {MODES}, got {mode!r}")
+    return mode
+
+
+def get_cassette_store() -> CassetteStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CassetteStore(Config.HTTP_CASSETTE_PATH)
+        return _store
+
+
+def wrap_openai_transport(inner: httpx.BaseTransport) -> httpx.BaseTransport:
+    """The OpenAI client's pooled transport, under the record/replay layer unless in passthrough"""
+    mode = transport_mode()
+    if mode == 'passthrough':
+        return inner
+    logger.info("📼 OpenAI transport in %s mode (%s)", mode, Config.HTTP_CASSETTE_PATH)
+    return RecordReplayTransport('openai', get_cassette_store(), mode, inner=inner)
+
+
+def install_airtable_transport(api: Any):
+    """Mount the record/replay adapter on a pyairtable Api's session (no-op in passthrough)"""
+    mode = transport_mode()
+    if mode == 'passthrough':
+        return
+    session = api.session
+    existing = session.get_adapter('https://')
+    adapter = RecordReplayAdapter('airtable', get_cassette_store(), mode,
+                                  max_retries=getattr(existing, 'max_retries', 0))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    logger.info("📼 Airtable transport in %s mode (%s)", mode, Config.HTTP_CASSETTE_PATH)
@@ -14,10 +14,95 @@ interface FormData {
   pitchDeck: File | null;
 }
 
+interface JobProgress {
+  stage?: string;
+  pages_extracted?: number;
+  pages_analyzed?: number;
+  funds_total?: number;
+  funds_evaluated?: number;
+}
+
+interface JobSnapshot {
+  job_id: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  progress: JobProgress;
+  partial_result: any;
+  result?: any;
+  error?: string | null;
+}
+
+const API_BASE_URL = 'http://89.117.60.99:5000';
+
+// Human-readable line for the submit button while a job runs
+const describeProgress = (job: JobSnapshot): string => {
+  const progress = job.progress || {};
+  if (job.status === 'queued') {
+    return 'Waiting in queue...';
+  }
+  if (progress.stage === 'matching_funds') {
+    return `Matching funds (${progress.funds_evaluated ?? 0}/${progress.funds_total ?? 0} evaluated)...`;
+  }
+  if (progress.stage === 'analyzing_pages') {
+    return `Analyzing pages (${progress.pages_analyzed ?? 0}/${progress.pages_extracted ?? 0} extracted)...`;
+  }
+  return 'Processing Application...';
+};
+
+const POLL_INTERVAL_MS = 2000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Poll a job's status until it finishes; network errors and busy responses are retried
+const pollJob = async (statusUrl: string, onProgress: (job: JobSnapshot) => void): Promise<JobSnapshot> => {
+  while (true) {
+    let job: JobSnapshot | null = null;
+    let notFound = false;
+    try {
+      const response = await fetch(`${API_BASE_URL}${statusUrl}`);
+      notFound = response.status === 404;
+      if (response.ok) {
+        job = await response.json();
+      }
+    } catch (error) {
+      console.warn('Job status poll failed, retrying:', error);
+    }
+    if (notFound) {
+      throw new Error('Analysis job not found, please resubmit');
+    }
+    if (job && (job.status === 'completed' || job.status === 'failed')) {
+      return job;
+    }
+    if (job) {
+      onProgress(job);
+    }
+    await sleep(POLL_INTERVAL_MS);
+  }
+};
+
+// Follow a job's Server-Sent Events stream until it finishes, polling status_url if the stream drops
+const waitForJob = (eventsUrl: string, statusUrl: string, onProgress: (job: JobSnapshot) => void): Promise<JobSnapshot> =>
+  new Promise((resolve, reject) => {
+    const source = new EventSource(`${API_BASE_URL}${eventsUrl}`);
+    source.addEventListener('progress', (event) => {
+      onProgress(JSON.parse((event as MessageEvent).data));
+    });
+    source.addEventListener('done', (event) => {
+      source.close();
+      resolve(JSON.parse((event as MessageEvent).data));
+    });
+    source.onerror = () => {
+      // The stream is refused when the server is busy and drops on network hiccups;
+      // the job keeps running either way, so follow it by polling instead
+      source.close();
+      pollJob(statusUrl, onProgress).then(resolve, reject);
+    };
+  });
+
 export default function Home() {
   const [isSubmitted, setIsSubmitted] = useState(false);
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [analysisResult, setAnalysisResult] = useState<any>(null);
+  const [progressMessage, setProgressMessage] = useState<string | null>(null);
 
   const handleSubmit = async (formData: FormData) => {
     setIsSubmitting(true);
@@ -38,21 +123,31 @@ export default function Home() {
       submitData.append('continents', JSON.stringify(formData.continents));
       submitData.append('countries', JSON.stringify(formData.countries));
       
-      // Submit to backend
-      const response = await fetch('http://89.117.60.99:5000/api/upload-pitch-deck', {
+      // Queue the analysis job on the backend
+      const response = await fetch(`${API_BASE_URL}/api/jobs`, {
         method: 'POST',
         body: submitData,
       });
       
-      const result = await response.json();
+      const queued = await response.json();
+      
+      if (!response.ok || !queued.success) {
+        throw new Error(queued.error || 'Failed to analyze pitch deck');
+      }
+      
+      // Follow live progress until the job finishes
+      setProgressMessage('Waiting in queue...');
+      const job = await waitForJob(queued.events_url, queued.status_url, (update) => {
+        setProgressMessage(describeProgress(update));
+      });
       
-      if (response.ok && result.success) {
+      if (job.status === 'completed' && job.result) {
         // Store the analysis result for display
-        console.log('Analysis result received:', result.data);
-        setAnalysisResult(result.data);
+        console.log('Analysis result received:', job.result);
+        setAnalysisResult(job.result);
         setIsSubmitted(true);
       } else {
-        throw new Error(result.error || 'Failed to analyze pitch deck');
+        throw new Error(job.error || 'Failed to analyze pitch deck');
       }
       
     } catch (error) {
@@ -61,6 +156,7 @@ export default function Home() {
       alert(`Error: ${errorMessage}`);
     } finally {
       setIsSubmitting(false);
+      setProgressMessage(null);
     }
   };
 
@@ -95,6 +191,7 @@ export default function Home() {
         <UploadForm 
           onSubmit={handleSubmit} 
           isSubmitting={isSubmitting} 
+          progressMessage={progressMessage}
         />
       )}
     </div>
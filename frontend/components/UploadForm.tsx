@@ -16,9 +16,10 @@ interface FormData {
 interface UploadFormProps {
   onSubmit: (formData: FormData) => Promise<void>;
   isSubmitting: boolean;
+  progressMessage?: string | null;
 }
 
-export default function UploadForm({ onSubmit, isSubmitting }: UploadFormProps) {
+export default function UploadForm({ onSubmit, isSubmitting, progressMessage }: UploadFormProps) {
   const [formData, setFormData] = useState<FormData>({
     companyName: '',
     stage: '',
@@ -161,7 +162,7 @@ export default function UploadForm({ onSubmit, isSubmitting }: UploadFormProps)
                   {isSubmitting ? (
                     <>
                       <div className="w-5 h-5 border-2 border-white/30 border-t-white rounded-full animate-spin"></div>
-                      Processing Application...
+                      {progressMessage || 'Processing Application...'}
                     </>
                   ) : (
                     <>